@@ -72,3 +72,18 @@ def impl(context):
 @when('there are two skill formsets showing')
 def impl(context):
     context.execute_steps('when I click on add skill')
+
+@when('I choose "{selection}" from the "{field_name}" autocomplete')
+def impl(context, selection, field_name):
+
+    SKILL_FORMSET = {
+        'first skill name': 'id_skill-0-skill_name',
+        'second skill name': 'id_skill-1-skill_name',
+    }
+
+    # Leave the field blank
+    if selection == '---------':
+        return
+
+    context.browser.find_by_id(SKILL_FORMSET[field_name]).fill(selection)
+    context.browser.find_link_by_text(selection).first.click()
@@ -53,9 +53,9 @@ Feature: Update Profile
         And I enter "<link 1 url>" into the "first url" field
         And I enter "<link 2 anchor>" into the "second anchor" field
         And I enter "<link 2 url>" into the "second url" field
-        And I select "<skill 1 name>" from the "first skill name" dropdown
+        And I choose "<skill 1 name>" from the "first skill name" autocomplete
         And I select "<skill 1 proficiency>" from the "first skill proficiency" dropdown
-        And I select "<skill 2 name>" from the "second skill name" dropdown
+        And I choose "<skill 2 name>" from the "second skill name" autocomplete
         And I select "<skill 2 proficiency>" from the "second skill proficiency" dropdown
         And I submit the form
         Then I see "<message>"
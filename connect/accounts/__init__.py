@@ -0,0 +1 @@
+default_app_config = 'connect.accounts.apps.AccountsConfig'
@@ -1,13 +1,21 @@
+from django.conf.urls import url
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils.translation import ugettext_lazy as _
 
 from connect.accounts.models import (
-    AbuseReport, CustomUser, Role, LinkBrand,
-    Skill, UserLink, UserSkill
+    AbuseReport, ActivationToken, CustomUser, Role, LinkBrand,
+    Skill, SkillAlias, UserLink, UserSkill
+)
+from connect.accounts.exports import iter_member_data
+from connect.accounts.forms import (
+    CustomUserChangeForm, CustomUserCreationForm, SkillAdminForm,
+    SkillAliasAdminForm
 )
-from connect.accounts.forms import CustomUserChangeForm, CustomUserCreationForm
 
 
 User = get_user_model()
@@ -24,6 +32,16 @@ class UserAbuseReportInline(admin.StackedInline):
     verbose_name = _('Abuse Report')
 
 
+class ActivationTokenInline(admin.TabularInline):
+    model = ActivationToken
+    extra = 0
+    fields = ('purpose', 'created_datetime', 'expires_datetime')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+
 class UserSkillInline(admin.TabularInline):
     model = UserSkill
     extra = 1
@@ -37,7 +55,6 @@ class CustomUserAdmin(UserAdmin):
                                              'application_comments',
                                              'moderator',
                                              'moderator_decision',
-                                             'auth_token',
                                              'auth_token_is_used')}),
         (_('Important dates'), {'fields': ('applied_datetime',
                                            'decision_datetime',
@@ -46,6 +63,7 @@ class CustomUserAdmin(UserAdmin):
         (_('Permissions'), {'fields': ('is_active', 'is_closed', 'is_staff',
                                        'is_superuser', 'is_moderator',
                                        'groups', 'user_permissions')}),
+        (_('Moderation'), {'fields': ('notification_frequency',)}),
         (_('Roles'), {'fields': ('roles',)}),
 
     )
@@ -60,11 +78,51 @@ class CustomUserAdmin(UserAdmin):
     search_fields = ('email', 'full_name')
     ordering = ('email',)
 
-    inlines = (UserSkillInline, UserLinkInline, UserAbuseReportInline)
+    inlines = (UserSkillInline, UserLinkInline, UserAbuseReportInline,
+               ActivationTokenInline)
+
+    def get_urls(self):
+        urls = [
+            url(r'^(\d+)/export/$',
+                self.admin_site.admin_view(self.export_data),
+                name='accounts_customuser_export'),
+        ]
+        return urls + super(CustomUserAdmin, self).get_urls()
+
+    def export_data(self, request, user_id):
+        """
+        Download the data held about a user (e.g. for a data request),
+        streamed as JSON rather than loaded in full.
+        """
+        user = get_object_or_404(User, pk=user_id)
+
+        if not self.has_change_permission(request, user):
+            raise PermissionDenied
+
+        response = StreamingHttpResponse(iter_member_data(user),
+                                         content_type='application/json')
+        response['Content-Disposition'] = \
+            'attachment; filename="member-{}.json"'.format(user.pk)
+
+        return response
 
 admin.site.register(CustomUser, CustomUserAdmin)
 
+
+class SkillAliasInline(admin.TabularInline):
+    model = SkillAlias
+    form = SkillAliasAdminForm
+    extra = 1
+
+
+class SkillAdmin(admin.ModelAdmin):
+    form = SkillAdminForm
+    search_fields = ('name', 'aliases__name')
+    inlines = (SkillAliasInline,)
+
+
+admin.site.register(Skill, SkillAdmin)
+
 # Register Preferences brands and skills
 admin.site.register(Role)
 admin.site.register(LinkBrand)
-admin.site.register(Skill)
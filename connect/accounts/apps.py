@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class AccountsConfig(AppConfig):
+    name = 'connect.accounts'
+    label = 'accounts'
+
+    def ready(self):
+        # Register signal handlers
+        from connect.accounts import signals  # NoQA
@@ -0,0 +1,116 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+from connect.utils import bump_version_stamp, get_version_stamp
+
+
+PERMISSIONS_VERSION_KEY = 'accounts:permissions_version'
+USER_VERSION_KEY = 'accounts:user_version:{}'
+USER_KEY = 'accounts:user:{}'
+
+
+class CachedPermissionsBackend(ModelBackend):
+    """
+    ModelBackend that keeps users' permissions in a per-process cache, so
+    that they are not queried again on every request.
+
+    Cached permissions are stamped with a global permissions version kept
+    in the USER_CACHE_ALIAS cache (shared by all processes), which is
+    changed whenever groups, permissions or users' groups or permissions
+    change (see connect.accounts.signals). They are also reloaded after
+    `permissions_timeout` seconds, in case a change was missed. Without a
+    shared cache, permissions are not cached across requests.
+    """
+    max_entries = 10000
+    permissions_timeout = 5 * 60
+
+    _permissions = {}
+    _lock = threading.Lock()
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous() \
+           or obj is not None:
+            return set()
+
+        if not hasattr(user_obj, '_perm_cache'):
+            version = get_version_stamp(PERMISSIONS_VERSION_KEY,
+                                        using=settings.USER_CACHE_ALIAS)
+            key = (user_obj.pk, user_obj.is_superuser)
+            cached = self._permissions.get(key)
+            now = time.monotonic()
+
+            if version is not None and cached and cached[0] == version \
+               and cached[1] > now:
+                user_obj._perm_cache = set(cached[2])
+            else:
+                permissions = super(
+                    CachedPermissionsBackend, self
+                ).get_all_permissions(user_obj)
+
+                if version is not None:
+                    with self._lock:
+                        if len(self._permissions) >= self.max_entries:
+                            self._permissions.clear()
+                        self._permissions[key] = (
+                            version, now + self.permissions_timeout,
+                            frozenset(permissions))
+
+        return user_obj._perm_cache
+
+
+class CachedUserBackend(CachedPermissionsBackend):
+    """
+    Backend that also serves request.user from the USER_CACHE_ALIAS cache
+    (which should be shared by all worker processes), so that the user is
+    not loaded from the database on every request.
+
+    Cached users are stamped with a per-user version, which is changed
+    whenever the user is saved or deleted (see connect.accounts.signals),
+    including when they are banned, close their account or change their
+    password. The version is read before the user is loaded, so a user
+    saved in the meantime is never served from the cache afterwards.
+    """
+    user_cache_timeout = 60 * 60
+
+    def get_user(self, user_id):
+        cache = caches[settings.USER_CACHE_ALIAS]
+        version_key = USER_VERSION_KEY.format(user_id)
+        user_key = USER_KEY.format(user_id)
+
+        cached = cache.get_many([version_key, user_key])
+        version = cached.get(version_key)
+        entry = cached.get(user_key)
+
+        if version is not None and entry is not None and entry[0] == version:
+            return entry[1]
+
+        if version is None:
+            version = get_version_stamp(version_key,
+                                        using=settings.USER_CACHE_ALIAS)
+
+        user = super(CachedUserBackend, self).get_user(user_id)
+
+        if user is not None:
+            cache.set(user_key, (version, user), self.user_cache_timeout)
+
+        return user
+
+
+def invalidate_user(user_id):
+    """
+    Make every process reload the user from the database on next use.
+    """
+    bump_version_stamp(USER_VERSION_KEY.format(user_id),
+                       using=settings.USER_CACHE_ALIAS)
+
+
+def invalidate_permissions():
+    """
+    Make every process reload users' permissions on next use.
+    """
+    bump_version_stamp(PERMISSIONS_VERSION_KEY,
+                       using=settings.USER_CACHE_ALIAS)
@@ -0,0 +1,97 @@
+import itertools
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from connect.accounts.models import AbuseReport, UserLink, UserSkill
+from connect.moderation.models import ModerationLogArchive, ModerationLogMsg
+from connect.moderation.utils import get_month_start, iter_log_archives
+
+
+PROFILE_FIELDS = (
+    'id', 'email', 'full_name', 'bio', 'date_joined', 'last_login',
+    'is_active', 'is_closed', 'registration_method', 'application_comments',
+    'applied_datetime', 'moderator_decision', 'decision_datetime',
+    'activated_datetime',
+)
+
+
+def encode(data):
+    return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+def iter_json_list(rows):
+    """
+    Yield a JSON list of the rows piece by piece, iterating over them (e.g.
+    with a queryset's iterator()) rather than loading all of them.
+    """
+    yield '['
+
+    for i, row in enumerate(rows):
+        yield (',' if i else '') + encode(row)
+
+    yield ']'
+
+
+def iter_archived_moderation_log(user):
+    """
+    Yield the rows of the archived moderation log about a member, oldest
+    first, reading one month's archive at a time. Nothing is logged about a
+    member before they join, so earlier archives are skipped.
+    """
+    archives = ModerationLogArchive.objects.filter(
+        month__gte=get_month_start(user.date_joined).date()
+    ).order_by('month')
+
+    for archive in iter_log_archives(archives):
+        # Archives are stored newest first
+        logs = [log for log in archive.iter_logs()
+                if log.pertains_to_id == user.id]
+
+        for log in reversed(logs):
+            yield {'msg_datetime': log.msg_datetime,
+                   'msg_type': log.msg_type,
+                   'comment': log.comment}
+
+
+def iter_member_data(user):
+    """
+    Yield a JSON document holding the data we keep about a member: their
+    profile, skills, links, the abuse reports they filed and the
+    moderation log about them (including archived logs).
+    """
+    profile = {field: getattr(user, field) for field in PROFILE_FIELDS}
+    profile['roles'] = list(user.roles.values_list('name', flat=True))
+
+    moderation_log = ModerationLogMsg.objects.filter(
+        pertains_to=user
+    ).order_by('msg_datetime').values('msg_datetime', 'msg_type', 'comment')
+
+    sections = (
+        ('skills', UserSkill.objects.filter(user=user)
+                                    .order_by('skill__name')
+                                    .values('skill__name', 'proficiency')
+                                    .iterator()),
+        ('links', UserLink.objects.filter(user=user)
+                                  .order_by('anchor')
+                                  .values('anchor', 'url')
+                                  .iterator()),
+        ('abuse_reports_filed', AbuseReport.objects
+            .filter(logged_by=user)
+            .order_by('logged_datetime')
+            .values('logged_datetime', 'logged_against__full_name',
+                    'abuse_comment', 'moderator_decision')
+            .iterator()),
+        ('moderation_log', itertools.chain(
+            iter_archived_moderation_log(user), moderation_log.iterator())),
+    )
+
+    yield '{"profile": ' + encode(profile)
+
+    for name, rows in sections:
+        yield ', ' + encode(name) + ': '
+
+        for chunk in iter_json_list(rows):
+            yield chunk
+
+    yield '}'
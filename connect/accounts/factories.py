@@ -5,7 +5,8 @@ from django.contrib.auth.models import Group
 from django.utils import timezone
 
 from connect.accounts.models import (
-    AbuseReport, CustomUser, LinkBrand, Skill, Role, UserLink, UserSkill
+    AbuseReport, ActivationToken, CustomUser, LinkBrand, Skill, SkillAlias,
+    Role, UserLink, UserSkill
 )
 
 
@@ -31,12 +32,20 @@ class UserFactory(factory.django.DjangoModelFactory):
     email = factory.Sequence(lambda n: 'user.{}@test.test'.format(n))
     password = make_password('pass')
     registration_method = CustomUser.INVITED
-    auth_token = factory.Sequence(lambda n: 'token{}'.format(n))
     auth_token_is_used = True
     is_active = True
     is_closed = False
     last_login = timezone.now()
 
+    @factory.post_generation
+    def auth_token(self, create, extracted, **kwargs):
+        """
+        Where an 'auth_token' is defined, issue it to this user.
+        """
+        if create and extracted:
+            self.auth_token = ActivationToken.objects.issue(
+                self, ActivationToken.INVITATION, token=extracted)
+
     @factory.post_generation
     def groups(self, create, extracted, **kwargs):
         """
@@ -87,11 +96,20 @@ class InvitedPendingFactory(factory.django.DjangoModelFactory):
     moderator = factory.SubFactory(UserFactory)
     moderator_decision = CustomUser.PRE_APPROVED
     decision_datetime = timezone.now()
-    auth_token = factory.Sequence(lambda n: 'invitedtoken{}'.format(n))
     auth_token_is_used = False
     is_active = False
     last_login = timezone.now()
 
+    @factory.post_generation
+    def auth_token(self, create, extracted, **kwargs):
+        """
+        Issue an invitation token to this user, using 'auth_token' if
+        it is defined.
+        """
+        if create:
+            self.auth_token = ActivationToken.objects.issue(
+                self, ActivationToken.INVITATION, token=extracted)
+
 
 class RequestedPendingFactory(factory.django.DjangoModelFactory):
     """
@@ -124,6 +142,14 @@ class SkillFactory(factory.django.DjangoModelFactory):
     name = factory.Sequence(lambda n: 'skill{}'.format(n))
 
 
+class SkillAliasFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = SkillAlias
+
+    name = factory.Sequence(lambda n: 'alias{}'.format(n))
+    skill = factory.SubFactory(SkillFactory)
+
+
 class UserSkillFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = UserSkill
@@ -7,21 +7,45 @@ from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.sites.models import Site
 from django.contrib.sites.shortcuts import get_current_site
+from django.core.urlresolvers import reverse, reverse_lazy
+from django.db.models import Q
 from django.template import loader
 from django.utils.encoding import force_bytes
+from django.utils.html import format_html
 from django.utils.http import urlsafe_base64_encode
 from django.utils.safestring import mark_safe
 from django.utils.translation import ugettext_lazy as _
 
-from connect.accounts.models import CustomUser, Role, Skill, UserSkill
+from connect.accounts.models import (
+    CustomUser, Role, Skill, SkillAlias, UserLink, UserSkill
+)
+from connect.accounts.skills import skill_index
 from connect.accounts.utils import (
-    get_user, invite_user_to_reactivate_account, validate_email_availability
+    get_user, invite_user_to_reactivate_account, normalize_email,
+    normalize_skill_name, validate_email_availability
 )
 
 
 User = get_user_model()
 
 
+class EmailAvailabilityInput(forms.EmailInput):
+    """
+    Email input that warns when the address entered is already registered,
+    without waiting for the form to be submitted (see main.js).
+    Set a 'data-current' attribute to skip the check for an unchanged email.
+    """
+    def __init__(self, attrs=None):
+        final_attrs = {
+            'data-availability-url': reverse_lazy(
+                'accounts:email-availability'),
+        }
+        if attrs:
+            final_attrs.update(attrs)
+
+        super(EmailAvailabilityInput, self).__init__(final_attrs)
+
+
 @parsleyfy
 class CustomPasswordResetForm(forms.Form):
     """
@@ -49,7 +73,7 @@ class CustomPasswordResetForm(forms.Form):
         from django.core.mail import send_mail
         email = self.cleaned_data["email"]
         active_users = User._default_manager.filter(
-            email__iexact=email, is_active=True)
+            email_normalized=normalize_email(email), is_active=True)
 
         for user in active_users:
             # Make sure that no email is sent to a user that actually has
@@ -107,6 +131,55 @@ class CustomUserCreationForm(UserCreationForm):
         fields = ("email",)
 
 
+def validate_skill_name(name, skill_id):
+    """
+    Ensure a skill (or alias) name is not a variant spelling of a skill
+    other than `skill_id`, so that near-duplicate skills are not created.
+    """
+    existing = skill_index.canonicalize(name)
+
+    if existing and existing[0] != skill_id:
+        raise forms.ValidationError(
+            _('"%(name)s" is already recorded as the skill "%(skill)s".'),
+            params={'name': name, 'skill': existing[1]},
+            code='duplicate_skill_name')
+
+
+class SkillAdminForm(forms.ModelForm):
+    class Meta:
+        model = Skill
+        fields = ('name',)
+
+    def clean_name(self):
+        name = self.cleaned_data['name']
+        validate_skill_name(name, self.instance.pk)
+
+        return name
+
+
+class SkillAliasAdminForm(forms.ModelForm):
+    class Meta:
+        model = SkillAlias
+        fields = ('skill', 'name')
+
+    def clean_name(self):
+        name = self.cleaned_data['name']
+        skill = self.cleaned_data.get('skill')
+        validate_skill_name(name,
+                            skill.pk if skill else self.instance.skill_id)
+
+        # Variants of an alias of the same skill pass the check above
+        if SkillAlias.objects.filter(
+            normalized_name=normalize_skill_name(name)
+        ).exclude(pk=self.instance.pk).exists():
+            raise forms.ValidationError(
+                _('"%(name)s" is already recorded as an alias.'),
+                params={'name': name},
+                code='duplicate_alias')
+
+        return name
+
+
 class CustomUserChangeForm(UserChangeForm):
     """A form for updating users. Includes all the fields on
     the user, but replaces the password field with admin's
@@ -137,6 +210,7 @@ class RequestInvitationForm(forms.Form):
     )
 
     email = forms.EmailField(
+        widget=EmailAvailabilityInput,
         error_messages={
             'required': _('Please enter your email address.'),
             'invalid': _('Please enter a valid email address.')
@@ -270,13 +344,54 @@ class BaseSkillFormSet(BaseFormSet):
                     )
 
 
+class SkillAutocompleteWidget(forms.HiddenInput):
+    """
+    Hidden input holding the skill id, preceded by a text input that
+    looks up skill names from the skill autocomplete endpoint.
+    Avoids rendering every skill as an <option> in each formset row.
+    """
+    def render(self, name, value, attrs=None):
+        hidden_input = super(SkillAutocompleteWidget, self).render(
+            name, value, attrs)
+        final_attrs = self.build_attrs(attrs, name=name)
+
+        text_input = format_html(
+            '<input type="text" id="{}_name" class="skill-autocomplete" '
+            'value="{}" placeholder="{}" data-url="{}" />',
+            final_attrs.get('id', name),
+            skill_index.get_name(value) or '',
+            _('Start typing a skill...'),
+            reverse('accounts:skill-autocomplete'))
+
+        return text_input + hidden_input
+
+
+class SkillChoiceField(forms.ModelChoiceField):
+    """
+    Skill field validated against the in-memory skill index, so that
+    a formset does not query the database once per skill row.
+    """
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+
+        name = skill_index.get_name(value)
+
+        if name is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice')
+
+        return Skill(id=int(value), name=name)
+
+
 @parsleyfy
 class SkillForm(forms.Form):
     """
     Form for individual user skills
     """
     skills = Skill.objects.all()
-    skill = forms.ModelChoiceField(queryset=skills, required=False)
+    skill = SkillChoiceField(queryset=skills, required=False,
+                             widget=SkillAutocompleteWidget)
 
     proficiency = forms.ChoiceField(choices=UserSkill.PROFICIENCY_CHOICES,
                                     required=False)
@@ -347,6 +462,92 @@ class LinkForm(forms.Form):
         required=False)
 
 
+class ProfileSkillForm(SkillForm):
+    """
+    Form for adding or updating a single user skill, or removing it when
+    no proficiency is given.
+    """
+    def clean(self):
+        cleaned_data = super(ProfileSkillForm, self).clean()
+
+        if 'skill' in cleaned_data and not cleaned_data['skill']:
+            raise forms.ValidationError(
+                _('All skills must have a skill name.'),
+                code='missing_skill'
+            )
+
+        return cleaned_data
+
+
+class ProfileLinkForm(LinkForm):
+    """
+    Form for adding or updating a single user link, or removing it when
+    an existing link is given no anchor or URL.
+    """
+    link = forms.IntegerField(required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        self.instance = None
+        super(ProfileLinkForm, self).__init__(*args, **kwargs)
+
+    def clean_link(self):
+        link_id = self.cleaned_data['link']
+
+        if link_id:
+            try:
+                self.instance = UserLink.objects.get(id=link_id,
+                                                     user=self.user)
+            except UserLink.DoesNotExist:
+                raise forms.ValidationError(_('Link does not exist.'),
+                                            code='invalid_link')
+
+        return link_id
+
+    def clean(self):
+        """
+        Adds validation to check that the link has both an anchor and URL,
+        and that neither is used by another of the user's links.
+        """
+        cleaned_data = super(ProfileLinkForm, self).clean()
+
+        if self.errors:
+            return cleaned_data
+
+        anchor = cleaned_data['anchor']
+        url = cleaned_data['url']
+
+        if not anchor and not url:
+            if not self.instance:
+                raise forms.ValidationError(
+                    _('All links must have an anchor and URL.'),
+                    code='missing_link'
+                )
+        elif not anchor:
+            raise forms.ValidationError(
+                _('All links must have an anchor.'),
+                code='missing_anchor'
+            )
+        elif not url:
+            raise forms.ValidationError(
+                _('All links must have a URL.'),
+                code='missing_URL'
+            )
+        else:
+            other_links = UserLink.objects.filter(user=self.user)
+
+            if self.instance:
+                other_links = other_links.exclude(id=self.instance.id)
+
+            if other_links.filter(Q(anchor=anchor) | Q(url=url)).exists():
+                raise forms.ValidationError(
+                    _('Links must have unique anchors and URLs.'),
+                    code='duplicate_links'
+                )
+
+        return cleaned_data
+
+
 class RoleModelMultipleChoiceField(forms.ModelMultipleChoiceField):
     def label_from_instance(self, obj):
         label = "<strong>{}</strong> ({})".format(obj.name, obj.description)
@@ -358,9 +559,16 @@ class ProfileForm(forms.Form):
     """
     Form for user to update their own profile details
     (excluding skills and links which are handled by separate formsets)
+
+    Pass the list of 'roles' if it has already been fetched, to build the
+    role choices from it rather than querying for them again.
+    Pass 'only' to restrict the form to some of its fields, when a single
+    section of the profile is being updated.
     """
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
+        roles = kwargs.pop('roles', None)
+        only = kwargs.pop('only', None)
         super(ProfileForm, self).__init__(*args, **kwargs)
 
         self.fields['full_name'] = forms.CharField(
@@ -382,13 +590,24 @@ class ProfileForm(forms.Form):
             }),
             required=False)
 
-        roles = Role.objects.all()
         self.fields['roles'] = RoleModelMultipleChoiceField(
             initial=self.user.roles.all(),
-            queryset=roles,
+            queryset=Role.objects.all(),
             widget=forms.CheckboxSelectMultiple(),
             required=False)
 
+        if roles is not None:
+            role_field = self.fields['roles']
+            role_field.choices = [
+                (role.pk, role_field.label_from_instance(role))
+                for role in roles
+            ]
+
+        if only is not None:
+            for name in list(self.fields):
+                if name not in only:
+                    del self.fields[name]
+
 
 @parsleyfy
 class UpdateEmailForm(forms.Form):
@@ -401,8 +620,9 @@ class UpdateEmailForm(forms.Form):
 
         self.fields['email'] = forms.EmailField(
             initial=self.user.email,
-            widget=forms.EmailInput(attrs={
-                'placeholder': _('Email')
+            widget=EmailAvailabilityInput(attrs={
+                'placeholder': _('Email'),
+                'data-current': self.user.email,
             }),
             error_messages={
                 'required': _('Please enter your new email address.'),
@@ -420,7 +640,7 @@ class UpdateEmailForm(forms.Form):
     def clean_email(self):
         email = self.cleaned_data['email']
 
-        if email != self.user.email:
+        if normalize_email(email) != self.user.email_normalized:
             validate_email_availability(email)
 
         return email
@@ -505,3 +725,22 @@ class CloseAccountForm(forms.Form):
             )
         else:
             pass
+
+
+@parsleyfy
+class NotificationSettingsForm(forms.Form):
+    """
+    Form for a moderator to choose when they are notified about new
+    applications and abuse reports
+    """
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super(NotificationSettingsForm, self).__init__(*args, **kwargs)
+
+        self.fields['notification_frequency'] = forms.ChoiceField(
+            choices=self.user.NOTIFICATION_CHOICES,
+            initial=self.user.notification_frequency,
+            widget=forms.RadioSelect,
+            error_messages={
+                'required': _('Please choose when to be notified.')
+            })
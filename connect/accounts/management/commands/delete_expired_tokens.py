@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from connect.accounts.models import ActivationToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired activation tokens, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, dest='batch_size',
+                            default=1000,
+                            help='Number of tokens to delete at a time')
+
+    def handle(self, *args, **options):
+        deleted = ActivationToken.objects.delete_expired(
+            batch_size=options['batch_size'])
+
+        self.stdout.write('Deleted {} expired token(s).'.format(deleted))
@@ -0,0 +1,392 @@
+import csv
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.sites.models import Site
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import reverse
+from django.core.validators import URLValidator, validate_email
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import ugettext as _
+
+from connect.accounts.models import (
+    ActivationToken, LinkBrand, Role, UserLink, UserSkill
+)
+from connect.accounts.skills import skill_index
+from connect.accounts.utils import (
+    clear_email_registered_cache, get_host, normalize_email
+)
+from connect.moderation.models import ModerationLogMsg
+from connect.moderation.utils import log_moderator_events
+from connect.utils import send_connect_emails
+
+
+User = get_user_model()
+
+
+def read_csv(f):
+    """
+    Yield members from a CSV file with 'email', 'full_name' and optional
+    'bio', 'roles' ('Role;Role'), 'skills' ('Skill:proficiency;...') and
+    'links' ('Anchor|URL;...') columns.
+    """
+    for row in csv.DictReader(f):
+        yield {
+            'email': row.get('email', ''),
+            'full_name': row.get('full_name', ''),
+            'bio': row.get('bio', ''),
+            'roles': split_list(row.get('roles')),
+            'skills': [item.rsplit(':', 1) if ':' in item else [item, '']
+                       for item in split_list(row.get('skills'))],
+            'links': [item.split('|', 1) if '|' in item else ['', item]
+                      for item in split_list(row.get('links'))],
+        }
+
+
+def read_jsonl(f):
+    """
+    Yield members from a file with one JSON object per line, using the
+    same keys as the CSV format, with lists for 'roles', objects with
+    'skill' and 'proficiency' for 'skills' and objects with 'anchor' and
+    'url' for 'links'. Values of the wrong type are reported as 'errors'.
+    """
+    for line in f:
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+
+        if not isinstance(row, dict):
+            yield {'email': '', 'full_name': '', 'bio': '', 'roles': [],
+                   'skills': [], 'links': [], 'errors': ['invalid JSON']}
+            continue
+
+        member = {'errors': []}
+
+        for key in ('email', 'full_name', 'bio'):
+            member[key] = row.get(key) or ''
+            if not isinstance(member[key], str):
+                member['errors'].append('invalid {}'.format(
+                    key.replace('_', ' ')))
+                member[key] = ''
+
+        for key, item_type in (('roles', str), ('skills', dict),
+                               ('links', dict)):
+            member[key] = row.get(key) or []
+            if not is_list_of(member[key], item_type):
+                member['errors'].append('invalid {}'.format(key))
+                member[key] = []
+
+        member['skills'] = [
+            [str(item.get('skill') or ''), item.get('proficiency') or '']
+            for item in member['skills']]
+        member['links'] = [
+            [str(item.get('anchor') or ''), str(item.get('url') or '')]
+            for item in member['links']]
+
+        yield member
+
+
+def is_list_of(value, item_type):
+    return isinstance(value, list) and all(isinstance(item, item_type)
+                                           for item in value)
+
+
+def split_list(value):
+    return [item.strip() for item in (value or '').split(';')
+            if item.strip()]
+
+
+class Command(BaseCommand):
+    help = ('Import members, with their roles, skills and links, from a CSV '
+            'or JSONL file. Members are created as invited users who have '
+            'not yet activated their account, and are emailed their '
+            'invitation. Rows whose email is already registered are '
+            'skipped, so an interrupted import can be resumed by running it '
+            'again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument('--moderator', dest='moderator',
+                            help='Email of the moderator inviting the members')
+        parser.add_argument('--format', dest='format',
+                            choices=('csv', 'jsonl'),
+                            help='File format (defaults to the extension)')
+        parser.add_argument('--batch-size', type=int, dest='batch_size',
+                            default=500,
+                            help='Number of rows to create at a time')
+        parser.add_argument('--start-row', type=int, dest='start_row',
+                            default=1,
+                            help='First row to import, to resume a run '
+                                 'without reading earlier rows again')
+        parser.add_argument('--no-invite', action='store_false',
+                            dest='invite', default=True,
+                            help='Do not email invitations yet. Members are '
+                                 'kept (rather than removed by '
+                                 'sweep_unactivated_users) until they are '
+                                 'reinvited from the moderation section.')
+
+    def handle(self, *args, **options):
+        if not options['moderator']:
+            raise CommandError('Please specify the inviting moderator.')
+
+        try:
+            self.moderator = User.objects.get(
+                email_normalized=normalize_email(options['moderator']),
+                is_moderator=True)
+        except User.DoesNotExist:
+            raise CommandError('Unknown moderator: {}'.format(
+                options['moderator']))
+
+        file_format = options['format'] or options['path'].rsplit('.', 1)[-1]
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError('Please specify the file format.')
+
+        # Reference data is loaded once, so rows are validated without
+        # querying the database
+        self.existing_emails = set(
+            User.objects.values_list('email_normalized', flat=True)
+                        .iterator())
+        self.roles = {
+            role.name.casefold(): role.id for role in Role.objects.all()
+        }
+        self.brands = dict(LinkBrand.objects.values_list('domain', 'id'))
+        self.proficiencies = {}
+        for value, label in UserSkill.PROFICIENCY_CHOICES:
+            if value:
+                self.proficiencies[str(value)] = value
+                self.proficiencies[str(label).casefold()] = value
+
+        self.unusable_password = make_password(None)
+        self.invite = options['invite']
+        self.site = Site.objects.get_current()
+        self.validate_url = URLValidator()
+
+        self.created = self.skipped = self.failed = 0
+        self.started = time.time()
+        row_number = 0
+
+        with open(options['path'], newline='', encoding='utf-8') as f:
+            reader = read_csv(f) if file_format == 'csv' else read_jsonl(f)
+            batch = []
+
+            for row_number, row in enumerate(reader, 1):
+                if row_number < options['start_row']:
+                    continue
+
+                member = self.validate_row(row_number, row)
+
+                if member:
+                    batch.append(member)
+
+                if len(batch) >= options['batch_size']:
+                    self.create_members(batch)
+                    self.report_progress(row_number)
+                    batch = []
+
+            if batch:
+                self.create_members(batch)
+
+        self.report_progress(row_number)
+        self.stdout.write('Done: {} created, {} skipped, {} failed.'.format(
+            self.created, self.skipped, self.failed))
+
+    def validate_row(self, row_number, row):
+        """
+        Return the member described by the row, ready to be created,
+        or None if the row is a duplicate or invalid.
+        """
+        email = normalize_email(row['email'] or '')
+        full_name = (row['full_name'] or '').strip()
+        errors = list(row.get('errors', []))
+
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append('invalid email')
+
+        if not full_name or len(full_name) > 100:
+            errors.append('invalid full name')
+
+        if not errors and email in self.existing_emails:
+            self.skipped += 1
+            return None
+
+        role_ids = set()
+        for name in row['roles']:
+            role_id = self.roles.get(name.casefold())
+            if role_id is None:
+                errors.append('unknown role "{}"'.format(name))
+            else:
+                role_ids.add(role_id)
+
+        skills = {}
+        for name, proficiency in row['skills']:
+            skill = skill_index.canonicalize(name)
+            if skill is None:
+                errors.append('unknown skill "{}"'.format(name))
+                continue
+
+            proficiency = str(proficiency).strip().casefold()
+            if proficiency:
+                value = self.proficiencies.get(proficiency)
+            else:
+                value = UserSkill.BEGINNER
+
+            if value is None:
+                errors.append('unknown proficiency "{}"'.format(proficiency))
+                continue
+
+            skills[skill[0]] = max(value, skills.get(skill[0], value))
+
+        # Links without an anchor are named after their host
+        links = []
+        anchors, urls = set(), set()
+        for anchor, url in row['links']:
+            url = url.strip()
+            try:
+                self.validate_url(url)
+            except ValidationError:
+                errors.append('invalid link "{}"'.format(url))
+                continue
+
+            anchor = anchor.strip()[:100] or get_host(url)
+            if anchor in anchors or url in urls:
+                continue
+
+            anchors.add(anchor)
+            urls.add(url)
+            links.append((anchor, url))
+
+        if errors:
+            self.failed += 1
+            self.stderr.write('Row {}: {}'.format(row_number,
+                                                  ', '.join(errors)))
+            return None
+
+        self.existing_emails.add(email)
+
+        return {
+            'email': email,
+            'full_name': full_name,
+            'bio': row['bio'] or '',
+            'role_ids': role_ids,
+            'skills': skills,
+            'links': links,
+        }
+
+    def create_members(self, batch):
+        """
+        Create a batch of members and their roles, skills and links with
+        one insert per table, in a single transaction, and queue their
+        invitations. Members who are not invited yet have no decision
+        date, so that they are not removed as stale invitations.
+        """
+        now = timezone.now()
+        decision_datetime = now if self.invite else None
+
+        users = [
+            User(email=member['email'],
+                 email_normalized=member['email'],
+                 full_name=member['full_name'],
+                 bio=member['bio'],
+                 password=self.unusable_password,
+                 is_active=False,
+                 registration_method=User.INVITED,
+                 moderator=self.moderator,
+                 moderator_decision=User.PRE_APPROVED,
+                 decision_datetime=decision_datetime,
+                 date_joined=now,
+                 last_login=now)
+            for member in batch
+        ]
+
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+
+            # bulk_create() does not set primary keys, so look them up
+            users = {
+                user.email_normalized: user
+                for user in User.objects.filter(
+                    email_normalized__in=[m['email'] for m in batch])
+            }
+
+            user_roles = []
+            user_skills = []
+            user_links = []
+
+            for member in batch:
+                user_id = users[member['email']].id
+
+                user_roles.extend(
+                    User.roles.through(customuser_id=user_id,
+                                       role_id=role_id)
+                    for role_id in member['role_ids'])
+
+                user_skills.extend(
+                    UserSkill(user_id=user_id, skill_id=skill_id,
+                              proficiency=proficiency)
+                    for skill_id, proficiency in member['skills'].items())
+
+                for anchor, url in member['links']:
+                    host = get_host(url)
+                    user_links.append(
+                        UserLink(user_id=user_id, anchor=anchor, url=url,
+                                 host=host, icon_id=self.brands.get(host)))
+
+            User.roles.through.objects.bulk_create(user_roles)
+            UserSkill.objects.bulk_create(user_skills)
+            UserLink.objects.bulk_create(user_links)
+
+            if self.invite:
+                self.invite_members([users[m['email']] for m in batch])
+
+        # bulk_create() does not send post_save, which would normally do this
+        clear_email_registered_cache(*[m['email'] for m in batch])
+
+        self.created += len(batch)
+
+    def invite_members(self, users):
+        """
+        Issue the new members their invitation tokens and queue the emails
+        inviting them to activate their account.
+        """
+        tokens = ActivationToken.objects.issue_many(
+            users, ActivationToken.INVITATION)
+
+        log_moderator_events(
+            msg_type=ModerationLogMsg.INVITATION,
+            users=users,
+            moderator=self.moderator,
+            comment=_('{} invited {} imported members').format(
+                self.moderator.get_full_name(), len(users)))
+
+        urls = {
+            user.id: 'http://{}{}'.format(
+                self.site.domain,
+                reverse('accounts:activate-account', args=[token]))
+            for user, token in zip(users, tokens)
+        }
+        send_connect_emails(
+            subject=_('Welcome to {}').format(self.site.name),
+            template='moderation/emails/invite_new_user.html',
+            recipients=users,
+            sender=self.moderator,
+            site=self.site,
+            urls=urls)
+
+    def report_progress(self, row_number):
+        elapsed = time.time() - self.started
+        rate = self.created / elapsed if elapsed else 0
+
+        self.stdout.write(
+            'Row {}: {} created, {} skipped, {} failed '
+            '({:.0f} members/s)'.format(row_number, self.created,
+                                        self.skipped, self.failed, rate))
@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from connect.accounts.models import Skill, SkillAlias
+from connect.accounts.skills import merge_skills
+from connect.accounts.utils import normalize_skill_name
+
+
+class Command(BaseCommand):
+    help = ('Merge duplicate skills, reassigning members\' skills and keeping '
+            'the duplicate names as aliases. Without arguments, merges skills '
+            'whose names only differ by case, spacing or punctuation, or '
+            'match an alias of another skill.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*',
+                            help='Names of the skills to merge')
+        parser.add_argument('--into', dest='into',
+                            help='Name of the skill to merge into')
+        parser.add_argument('--dry-run', action='store_true', dest='dry_run',
+                            default=False,
+                            help='Report merges without applying them')
+
+    def handle(self, *args, **options):
+        if options['into']:
+            if not options['names']:
+                raise CommandError('Please specify the skills to merge.')
+
+            groups = [self.get_named_group(options['into'], options['names'])]
+        elif options['names']:
+            raise CommandError('Please specify a skill to merge into.')
+        else:
+            groups = self.find_duplicate_groups()
+
+        for target, duplicates in groups:
+            self.stdout.write('Merging {} into {}'.format(
+                ', '.join(skill.name for skill in duplicates), target.name))
+
+            if not options['dry_run']:
+                merge_skills(target, duplicates)
+
+        if not groups:
+            self.stdout.write('No duplicate skills found.')
+
+    def get_named_group(self, into, names):
+        skills = {
+            skill.name: skill
+            for skill in Skill.objects.filter(name__in=[into] + names)
+        }
+
+        missing = [name for name in [into] + names if name not in skills]
+        if missing:
+            raise CommandError('Unknown skill(s): {}'.format(
+                ', '.join(missing)))
+
+        return (skills[into], [skills[name] for name in names
+                               if name != into])
+
+    def find_duplicate_groups(self):
+        """
+        Group skills by normalized name, treating a skill whose name matches
+        an alias as a duplicate of the aliased skill.
+        """
+        skills = list(Skill.objects.annotate(num_users=Count('userskill')))
+        aliases = dict(SkillAlias.objects.values_list('normalized_name',
+                                                      'skill_id'))
+
+        canonical = {}
+        for skill in skills:
+            canonical.setdefault(normalize_skill_name(skill.name), skill.id)
+        canonical.update(aliases)
+
+        groups = defaultdict(list)
+        for skill in skills:
+            groups[canonical[normalize_skill_name(skill.name)]].append(skill)
+
+        # Merge into the aliased skill, otherwise the most widely used one
+        aliased_ids = set(aliases.values())
+        duplicate_groups = []
+
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+
+            target = max(group, key=lambda skill: (
+                skill.id in aliased_ids, skill.num_users, -skill.id))
+            duplicates = [skill for skill in group if skill != target]
+            duplicate_groups.append((target, duplicates))
+
+        return duplicate_groups
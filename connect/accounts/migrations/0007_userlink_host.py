@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.db import models, migrations
+
+
+BATCH_SIZE = 1000
+
+
+def populate_hosts(apps, schema_editor):
+    """
+    Backfill the normalized host of existing links, updating links in
+    batches per distinct host rather than one at a time.
+    """
+    UserLink = apps.get_model('accounts', 'UserLink')
+
+    links_by_host = defaultdict(list)
+    for pk, url in UserLink.objects.values_list('pk', 'url').iterator():
+        links_by_host[urlsplit(url).hostname or ''].append(pk)
+
+    for host, pks in links_by_host.items():
+        if not host:
+            continue
+        for i in range(0, len(pks), BATCH_SIZE):
+            UserLink.objects.filter(
+                pk__in=pks[i:i + BATCH_SIZE]).update(host=host)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_merge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userlink',
+            name='host',
+            field=models.CharField(verbose_name='host', max_length=200, blank=True, db_index=True, editable=False, help_text='Normalized host of the url, used to match brands'),
+        ),
+        migrations.RunPython(populate_hosts, migrations.RunPython.noop),
+    ]
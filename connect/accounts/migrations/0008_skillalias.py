@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_userlink_host'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillAlias',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('name', models.CharField(verbose_name='name', max_length=100)),
+                ('normalized_name', models.CharField(verbose_name='normalized name', max_length=100, unique=True, editable=False)),
+                ('skill', models.ForeignKey(verbose_name='skill', related_name='aliases', to='accounts.Skill')),
+            ],
+            options={
+                'verbose_name': 'skill alias',
+                'verbose_name_plural': 'skill aliases',
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.db import models, migrations
+from django.db.models import Case, CharField, Value, When
+
+
+BATCH_SIZE = 1000
+
+
+def normalize_email(email):
+    # Frozen copy of accounts.utils.normalize_email
+    return email.strip().lower()
+
+
+def populate_normalized_emails(apps, schema_editor):
+    """
+    Backfill the normalized email of existing users in batches, refusing
+    to migrate while two users share an address that differs only in case
+    or surrounding whitespace.
+    """
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+
+    users_by_email = defaultdict(list)
+    for pk, email in CustomUser.objects.values_list('pk', 'email').iterator():
+        users_by_email[normalize_email(email)].append(pk)
+
+    duplicates = sorted(email for email, pks in users_by_email.items()
+                        if len(pks) > 1)
+    if duplicates:
+        raise RuntimeError(
+            'These email addresses are registered to more than one user '
+            '(in different cases), please merge or remove the duplicates '
+            'before migrating: {}'.format(', '.join(duplicates)))
+
+    updates = [(pks[0], email) for email, pks in users_by_email.items()]
+    for i in range(0, len(updates), BATCH_SIZE):
+        batch = updates[i:i + BATCH_SIZE]
+        CustomUser.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+            email_normalized=Case(
+                *[When(pk=pk, then=Value(email)) for pk, email in batch],
+                output_field=CharField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_skillalias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='email_normalized',
+            field=models.CharField(verbose_name='normalized email address', max_length=254, null=True, editable=False, help_text='Lower-cased email address, used for lookups'),
+        ),
+        migrations.RunPython(populate_normalized_emails,
+                             migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='customuser',
+            name='email_normalized',
+            field=models.CharField(verbose_name='normalized email address', max_length=254, unique=True, editable=False, help_text='Lower-cased email address, used for lookups'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, migrations
+from django.utils import timezone
+
+
+BATCH_SIZE = 1000
+
+
+def move_tokens(apps, schema_editor):
+    """
+    Store the digests of outstanding (unused) tokens in the token table,
+    so that links already sent out keep working until they expire.
+    """
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    ActivationToken = apps.get_model('accounts', 'ActivationToken')
+
+    expires = timezone.now() + timedelta(
+        days=settings.ACTIVATION_TOKEN_EXPIRY_DAYS)
+
+    users = CustomUser.objects.filter(auth_token_is_used=False) \
+                              .exclude(auth_token='') \
+                              .values_list('pk', 'registration_method',
+                                           'auth_token')
+
+    tokens = []
+    for pk, registration_method, auth_token in users.iterator():
+        tokens.append(ActivationToken(
+            user_id=pk,
+            purpose='INV' if registration_method == 'INV' else 'APP',
+            token_hash=hashlib.sha256(auth_token.encode('utf-8')).hexdigest(),
+            expires_datetime=expires,
+        ))
+
+    ActivationToken.objects.bulk_create(tokens, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0009_customuser_email_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivationToken',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', primary_key=True, serialize=False, auto_created=True)),
+                ('purpose', models.CharField(verbose_name='purpose', max_length=3, choices=[('INV', 'Invitation'), ('REI', 'Reinvitation'), ('APP', 'Approved application'), ('REA', 'Reactivation')])),
+                ('token_hash', models.CharField(verbose_name='token hash', max_length=64, unique=True, editable=False, help_text='SHA-256 digest of the token sent to the user')),
+                ('created_datetime', models.DateTimeField(verbose_name='date created', auto_now_add=True)),
+                ('expires_datetime', models.DateTimeField(verbose_name='expires', db_index=True)),
+                ('user', models.ForeignKey(verbose_name='user', related_name='activation_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'activation token',
+                'verbose_name_plural': 'activation tokens',
+            },
+        ),
+        migrations.RunPython(move_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='auth_token',
+        ),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_activationtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='last_digest_datetime',
+            field=models.DateTimeField(verbose_name='last digest sent', blank=True, null=True, editable=False, help_text='When the moderator was last sent a digest of notifications'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='notification_frequency',
+            field=models.CharField(verbose_name='moderator notifications', max_length=4, default='NOW', choices=[('NOW', 'Immediately'), ('HOUR', 'In an hourly digest'), ('DAY', 'In a daily digest')], help_text='When moderators are told about new applications and abuse reports'),
+        ),
+    ]
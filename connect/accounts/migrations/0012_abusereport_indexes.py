@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_notification_frequency'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='abusereport',
+            index_together=set([('decision_datetime', 'logged_against'), ('logged_against', 'moderator_decision')]),
+        ),
+    ]
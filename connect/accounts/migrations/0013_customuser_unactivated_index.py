@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Must match the conditions of CustomUserManager.unactivated()
+CREATE_INDEX = (
+    "CREATE INDEX accounts_customuser_unactivated "
+    "ON accounts_customuser (decision_datetime) "
+    "WHERE is_active = false AND activated_datetime IS NULL"
+)
+
+DROP_INDEX = "DROP INDEX IF EXISTS accounts_customuser_unactivated"
+
+
+def create_unactivated_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_INDEX)
+
+
+def drop_unactivated_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_abusereport_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_unactivated_index,
+                             drop_unactivated_index),
+    ]
@@ -1,18 +1,24 @@
-from urllib.parse import urlsplit
+from datetime import timedelta
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin
 )
-from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.core.exceptions import (
+    ObjectDoesNotExist, PermissionDenied, ValidationError
+)
 
 from django.db import models
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from connect.utils import generate_unique_id
-from connect.accounts.utils import create_inactive_user
+from connect.accounts.backends import invalidate_user
+from connect.accounts.utils import (
+    clear_email_registered_cache, create_inactive_user, get_host,
+    hash_token, normalize_email, normalize_skill_name
+)
 
 
 class CustomUserManager(BaseUserManager):
@@ -42,6 +48,28 @@ class CustomUserManager(BaseUserManager):
         return self._create_user(email, password, True, True,
                                  **extra_fields)
 
+    def get_by_natural_key(self, email):
+        """
+        Look users up by their normalized email, so that authentication is
+        case-insensitive and uses the unique index.
+        """
+        return self.get(email_normalized=normalize_email(email))
+
+    def unactivated(self, before):
+        """
+        Return users who were invited or approved before `before`, but have
+        never activated their account. On PostgreSQL the conditions on
+        is_active and activated_datetime match a partial index (see
+        migration 0013), so that these users are found without scanning
+        all users.
+        """
+        return self.filter(is_active=False,
+                           activated_datetime=None,
+                           auth_token_is_used=False,
+                           moderator_decision__in=[self.model.PRE_APPROVED,
+                                                   self.model.APPROVED],
+                           decision_datetime__lt=before)
+
 
 class CustomUser(AbstractBaseUser, PermissionsMixin):
     """
@@ -68,8 +96,23 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         (REJECTED, _('Rejected')),
     )
 
+    IMMEDIATELY = 'NOW'
+    HOURLY = 'HOUR'
+    DAILY = 'DAY'
+
+    NOTIFICATION_CHOICES = (
+        (IMMEDIATELY, _('Immediately')),
+        (HOURLY, _('In an hourly digest')),
+        (DAILY, _('In a daily digest')),
+    )
+
     email = models.EmailField(_('email address'), max_length=254, unique=True)
 
+    email_normalized = models.CharField(
+        _('normalized email address'), max_length=254, unique=True,
+        editable=False,
+        help_text=_('Lower-cased email address, used for lookups'))
+
     full_name = models.CharField(_('full name'), max_length=100, blank=True)
 
     is_staff = models.BooleanField(
@@ -100,6 +143,17 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         help_text=_('Designates whether the user has '
                     'moderator privileges.'))
 
+    notification_frequency = models.CharField(
+        _('moderator notifications'), max_length=4,
+        choices=NOTIFICATION_CHOICES, default=IMMEDIATELY,
+        help_text=_('When moderators are told about new applications '
+                    'and abuse reports'))
+
+    last_digest_datetime = models.DateTimeField(
+        _('last digest sent'), blank=True, null=True, editable=False,
+        help_text=_('When the moderator was last sent a digest of '
+                    'notifications'))
+
     # Registration details
     registration_method = models.CharField(_('registration method'),
                                            max_length=3,
@@ -135,12 +189,6 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         help_text=_('When moderator made their decision to invite, approve'
                     ' or reject this user'))
 
-    auth_token = models.CharField(
-        _('authentication token'),
-        max_length=40,
-        blank=True,
-        help_text=_('Token for user to activate their account'))
-
     auth_token_is_used = models.BooleanField(_('token is used'),
                                              default=False)
 
@@ -172,6 +220,25 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
             ("ban_user", "Can ban a user in response to an abuse report"),
         )
 
+    def clean(self):
+        """
+        Ensure the email is not registered to another user in a different
+        case.
+        """
+        super(CustomUser, self).clean()
+
+        if self.email and CustomUser.objects.filter(
+                email_normalized=normalize_email(self.email)
+        ).exclude(pk=self.pk).exists():
+            raise ValidationError({
+                'email': _('Sorry, this email address is already '
+                           'registered to another user.')
+            })
+
+    def save(self, *args, **kwargs):
+        self.email_normalized = normalize_email(self.email)
+        super(CustomUser, self).save(*args, **kwargs)
+
     def get_full_name(self):
         return self.full_name.strip()
 
@@ -215,37 +282,94 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def invite_new_user(self, email, full_name):
         """
         Invite an inactive user (who needs to activate their account).
-        Returns none if user already exists.
+        Returns none if user already exists, otherwise the new user with
+        the token to send them as `auth_token`.
         """
         User = get_user_model()
 
         if self.is_moderator and self.has_perm('accounts.invite_user'):
             try:
-                User.objects.get(email=email)
+                User.objects.get(email_normalized=normalize_email(email))
             except User.DoesNotExist:
                 new_user = create_inactive_user(email, full_name)
                 new_user.registration_method = new_user.INVITED
                 new_user.moderator = self
                 new_user.moderator_decision = new_user.PRE_APPROVED
                 new_user.decision_datetime = timezone.now()
-                new_user.auth_token = generate_unique_id()
                 new_user.save()
+                new_user.auth_token = ActivationToken.objects.issue(
+                    new_user, ActivationToken.INVITATION)
                 return new_user
             else:
                 return None
         else:
             raise PermissionDenied
 
+    def invite_new_users(self, invitations, batch_size=500):
+        """
+        Invite several inactive users at once, given (email, full name)
+        pairs of addresses that are not registered yet. Users and their
+        tokens are created in batches. Returns the new users, with the
+        tokens to send them as `auth_token`.
+        """
+        User = get_user_model()
+
+        if not (self.is_moderator and self.has_perm('accounts.invite_user')):
+            raise PermissionDenied
+
+        now = timezone.now()
+        new_users = []
+
+        for email, full_name in invitations:
+            email = User.objects.normalize_email(email)
+            user = User(email=email,
+                        email_normalized=normalize_email(email),
+                        full_name=full_name,
+                        is_active=False,
+                        date_joined=now,
+                        last_login=now,
+                        registration_method=User.INVITED,
+                        moderator=self,
+                        moderator_decision=User.PRE_APPROVED,
+                        decision_datetime=now)
+            user.set_unusable_password()
+            new_users.append(user)
+
+        User.objects.bulk_create(new_users, batch_size=batch_size)
+
+        # bulk_create does not set the ids of the new users
+        emails = [user.email_normalized for user in new_users]
+        saved_users = {}
+
+        for start in range(0, len(emails), batch_size):
+            saved_users.update(
+                (user.email_normalized, user) for user in User.objects.filter(
+                    email_normalized__in=emails[start:start + batch_size]))
+
+        new_users = [saved_users[email] for email in emails]
+
+        tokens = ActivationToken.objects.issue_many(
+            new_users, ActivationToken.INVITATION, batch_size=batch_size)
+
+        for user, token in zip(new_users, tokens):
+            user.auth_token = token
+
+        clear_email_registered_cache(*emails)
+
+        return new_users
+
     def reinvite_user(self, user, email):
         """
-        Reinvite an already invited user.
+        Reinvite an already invited user, issuing them a new token
+        (available as `auth_token` on the returned user).
         """
         if self.is_moderator and self.has_perm('accounts.invite_user'):
             # Reset email, set a new token and update decision datetime
             user.email = email
-            user.auth_token = generate_unique_id()
             user.decision_datetime = timezone.now()
             user.save()
+            user.auth_token = ActivationToken.objects.issue(
+                user, ActivationToken.REINVITATION)
 
             return user
 
@@ -254,15 +378,17 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     def approve_user_application(self, user):
         """
-        Approve a user's application
+        Approve a user's application, issuing them a token
+        (available as `auth_token` on the returned user).
         """
         if self.is_moderator and \
            self.has_perm('accounts.approve_user_application'):
             user.moderator = self
             user.moderator_decision = user.APPROVED
             user.decision_datetime = timezone.now()
-            user.auth_token = generate_unique_id()
             user.save()
+            user.auth_token = ActivationToken.objects.issue(
+                user, ActivationToken.APPROVAL)
 
             return user
 
@@ -285,6 +411,157 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         else:
             raise PermissionDenied
 
+    def approve_user_applications(self, users):
+        """
+        Approve several users' applications at once, issuing each of them
+        a token (available as `auth_token` on each user).
+        """
+        if self.is_moderator and \
+           self.has_perm('accounts.approve_user_application'):
+            self._decide_user_applications(users, self.APPROVED)
+            tokens = ActivationToken.objects.issue_many(
+                users, ActivationToken.APPROVAL)
+
+            for user, token in zip(users, tokens):
+                user.auth_token = token
+
+            return users
+
+        else:
+            raise PermissionDenied
+
+    def reject_user_applications(self, users):
+        """
+        Reject several users' applications at once.
+        """
+        if self.is_moderator \
+           and self.has_perm('accounts.reject_user_application'):
+            self._decide_user_applications(users, self.REJECTED)
+
+            return users
+
+        else:
+            raise PermissionDenied
+
+    def _decide_user_applications(self, users, decision):
+        now = timezone.now()
+
+        CustomUser.objects.filter(id__in=[user.id for user in users]).update(
+            moderator=self, moderator_decision=decision,
+            decision_datetime=now)
+
+        for user in users:
+            user.moderator = self
+            user.moderator_decision = decision
+            user.decision_datetime = now
+            invalidate_user(user.id)
+
+
+class ActivationTokenManager(models.Manager):
+
+    def issue(self, user, purpose, token=None):
+        """
+        Store a new activation token for the user, replacing any they were
+        issued before. Returns the raw token, which is only ever sent to
+        the user; the table only holds its digest.
+        """
+        token = token or generate_unique_id()
+        expires = timezone.now() + timedelta(
+            days=settings.ACTIVATION_TOKEN_EXPIRY_DAYS)
+
+        self.filter(user=user).delete()
+        self.create(user=user, purpose=purpose, token_hash=hash_token(token),
+                    expires_datetime=expires)
+
+        return token
+
+    def issue_many(self, users, purpose, batch_size=None):
+        """
+        Issue new tokens to several users at once, replacing any they were
+        issued before. Returns the raw tokens, in the order of the users.
+        """
+        tokens = [generate_unique_id() for user in users]
+        expires = timezone.now() + timedelta(
+            days=settings.ACTIVATION_TOKEN_EXPIRY_DAYS)
+
+        self.filter(user__in=users).delete()
+        self.bulk_create([
+            ActivationToken(user=user, purpose=purpose,
+                            token_hash=hash_token(token),
+                            expires_datetime=expires)
+            for user, token in zip(users, tokens)], batch_size=batch_size)
+
+        return tokens
+
+    def get_by_token(self, token):
+        """
+        Look up a token (with its user) by the digest of the raw token.
+        """
+        return self.select_related('user').get(token_hash=hash_token(token))
+
+    def delete_expired(self, batch_size=1000):
+        """
+        Delete expired tokens in batches, so that each delete is a short
+        statement. Returns the number of tokens deleted.
+        """
+        expired = self.filter(expires_datetime__lte=timezone.now())
+        deleted = 0
+
+        while True:
+            pks = list(expired.values_list('pk', flat=True)[:batch_size])
+
+            if not pks:
+                return deleted
+
+            self.filter(pk__in=pks).delete()
+            deleted += len(pks)
+
+
+class ActivationToken(models.Model):
+    """
+    Token sent to a user by email, allowing them to activate or reactivate
+    their account. Only a digest of the token is stored.
+    """
+    INVITATION = 'INV'
+    REINVITATION = 'REI'
+    APPROVAL = 'APP'
+    REACTIVATION = 'REA'
+
+    PURPOSE_CHOICES = (
+        (INVITATION, _('Invitation')),
+        (REINVITATION, _('Reinvitation')),
+        (APPROVAL, _('Approved application')),
+        (REACTIVATION, _('Reactivation')),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             verbose_name=_('user'),
+                             related_name='activation_tokens')
+
+    purpose = models.CharField(_('purpose'), max_length=3,
+                               choices=PURPOSE_CHOICES)
+
+    token_hash = models.CharField(
+        _('token hash'), max_length=64, unique=True, editable=False,
+        help_text=_('SHA-256 digest of the token sent to the user'))
+
+    created_datetime = models.DateTimeField(_('date created'),
+                                            auto_now_add=True)
+
+    expires_datetime = models.DateTimeField(_('expires'), db_index=True)
+
+    objects = ActivationTokenManager()
+
+    class Meta:
+        verbose_name = _('activation token')
+        verbose_name_plural = _('activation tokens')
+
+    def __str__(self):
+        return '{} ({})'.format(self.user, self.get_purpose_display())
+
+    def is_expired(self):
+        return self.expires_datetime <= timezone.now()
+
 
 class AbuseReport(models.Model):
     """
@@ -342,6 +619,12 @@ class AbuseReport(models.Model):
     class Meta:
         verbose_name = _('abuse report')
         verbose_name_plural = _('abuse reports')
+        # Support finding undecided reports, and counting users' warnings,
+        # for the abuse review queue
+        index_together = [
+            ('decision_datetime', 'logged_against'),
+            ('logged_against', 'moderator_decision'),
+        ]
 
     def __str__(self):
         return 'Reported by {} against {}'.format(
@@ -366,6 +649,29 @@ class Skill(models.Model):
         return self.name
 
 
+class SkillAlias(models.Model):
+    """
+    Alternative name for a skill, e.g. 'JS' for 'JavaScript'.
+    Input matching an alias is canonicalized to the aliased skill.
+    """
+    name = models.CharField(_('name'), max_length=100)
+    normalized_name = models.CharField(_('normalized name'), max_length=100,
+                                       unique=True, editable=False)
+    skill = models.ForeignKey(Skill, verbose_name=_('skill'),
+                              related_name='aliases')
+
+    class Meta:
+        verbose_name = _('skill alias')
+        verbose_name_plural = _('skill aliases')
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_skill_name(self.name)
+        super(SkillAlias, self).save(*args, **kwargs)
+
+
 class UserSkill(models.Model):
     """
     How proficient an individual user is at a particular skill.
@@ -441,6 +747,9 @@ class UserLink(models.Model):
                              related_name='links')
     anchor = models.CharField(_('anchor text'), max_length=100)
     url = models.URLField(_('url'))
+    host = models.CharField(
+        _('host'), max_length=200, blank=True, db_index=True, editable=False,
+        help_text=_('Normalized host of the url, used to match brands'))
     icon = models.ForeignKey('LinkBrand', blank=True, null=True,
                              on_delete=models.SET_NULL,
                              verbose_name=_('icon'))
@@ -464,14 +773,22 @@ class UserLink(models.Model):
     def __str__(self):
         return self.anchor
 
+    def clean(self):
+        """
+        Populate the normalized host from the url.
+        -- Call this before bulk creating links, as bulk_create() does not
+        call save().
+        """
+        self.host = get_host(self.url)
+
     def save(self, *args, **kwargs):
         """
         Attempt to match a user link to a recognised brand (LinkBrand).
         """
-        domain = urlsplit(self.url).netloc
+        self.clean()
 
         try:
-            self.icon = LinkBrand.objects.get(domain=domain)
+            self.icon = LinkBrand.objects.get(domain=self.host)
         except ObjectDoesNotExist:
             pass
 
@@ -507,15 +824,12 @@ class LinkBrand(models.Model):
         """
         Find any existing links to match to a new (or edited) brand
         """
-        super(LinkBrand, self).save(*args, **kwargs)
-
-        existing_links = UserLink.objects.filter(url__contains=self.domain)
+        self.domain = self.domain.strip().lower()
 
-        # Filter out any false positives
-        for link in existing_links:
-            domain = urlsplit(link.url).netloc
+        super(LinkBrand, self).save(*args, **kwargs)
 
-            if domain != self.domain:
-                existing_links = existing_links.exclude(pk=link.pk)
+        # Release links matched to a previous domain of this brand
+        UserLink.objects.filter(icon=self).exclude(
+            host=self.domain).update(icon=None)
 
-        existing_links.update(icon=self)
+        UserLink.objects.filter(host=self.domain).update(icon=self)
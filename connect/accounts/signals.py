@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_init, post_save
+)
+from django.dispatch import receiver
+
+from connect.accounts.backends import invalidate_permissions, invalidate_user
+from connect.accounts.models import Skill, SkillAlias
+from connect.accounts.skills import skill_index
+from connect.accounts.utils import clear_email_registered_cache
+
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=Skill)
+@receiver([post_save, post_delete], sender=SkillAlias)
+def invalidate_skill_index(sender, **kwargs):
+    """
+    Rebuild the skill autocomplete index when skills change.
+    """
+    skill_index.invalidate()
+
+
+@receiver(post_init, sender=User)
+def remember_email(sender, instance, **kwargs):
+    """
+    Keep track of the email a user was loaded with, so that cached checks
+    for the old address can be cleared when it changes.
+    (Read from __dict__ to avoid loading the field if it is deferred.)
+    """
+    instance._loaded_email_normalized = instance.__dict__.get(
+        'email_normalized')
+
+
+@receiver([post_save, post_delete], sender=User)
+def clear_email_availability(sender, instance, **kwargs):
+    """
+    Clear cached email availability checks when users are created,
+    updated or deleted.
+    """
+    email_normalized = instance.__dict__.get('email_normalized')
+
+    clear_email_registered_cache(email_normalized,
+                                 instance._loaded_email_normalized)
+    instance._loaded_email_normalized = email_normalized
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Stop serving a cached copy of a user once they are saved or deleted.
+    """
+    invalidate_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Permission)
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_cached_permissions(sender, **kwargs):
+    """
+    Reload cached permissions when groups, permissions or a user's
+    groups or permissions change.
+    """
+    if kwargs.get('action') in (None, 'post_add', 'post_remove', 'post_clear'):
+        invalidate_permissions()
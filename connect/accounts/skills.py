@@ -0,0 +1,200 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from connect.utils import bump_version_stamp, get_version_stamp
+from connect.accounts.models import Skill, SkillAlias, UserSkill
+from connect.accounts.utils import normalize_skill_name
+
+
+class SkillIndex(object):
+    """
+    In-memory index of skill names (and their aliases), searchable by prefix.
+
+    Case-folded names are kept in a sorted list, so a prefix search is a
+    binary search followed by a short scan. A precomputed map from
+    normalized names to skill ids is used to canonicalize input.
+
+    The index is rebuilt lazily whenever the version stamp stored in the
+    USER_CACHE_ALIAS cache changes, so that all processes sharing the cache
+    notice when skills are edited. It is also rebuilt once it is more than
+    `timeout` seconds old, which is how other processes' edits are noticed
+    when there is no shared cache.
+    """
+    version_key = 'accounts:skill_index_version'
+    timeout = 60
+
+    def __init__(self):
+        self._keys = []
+        self._ids = []
+        self._names = {}
+        self._canonical = {}
+        self._version = None
+        self._expires = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """
+        Rebuild the index from the database if it is out of date.
+        """
+        version = get_version_stamp(self.version_key,
+                                    using=settings.USER_CACHE_ALIAS)
+
+        if version == self._version and time.monotonic() < self._expires:
+            return
+
+        with self._lock:
+            skills = list(Skill.objects.values_list('id', 'name'))
+            aliases = list(SkillAlias.objects.values_list('name', 'skill_id'))
+
+            entries = sorted(
+                [(name.casefold(), skill_id) for skill_id, name in skills] +
+                [(name.casefold(), skill_id) for name, skill_id in aliases])
+
+            canonical = {}
+            for skill_id, name in skills:
+                canonical.setdefault(normalize_skill_name(name), skill_id)
+            # Aliases take precedence over (duplicate) skill names
+            for name, skill_id in aliases:
+                canonical[normalize_skill_name(name)] = skill_id
+
+            self._keys = [key for key, _ in entries]
+            self._ids = [skill_id for _, skill_id in entries]
+            self._names = dict(skills)
+            self._canonical = canonical
+            self._version = version
+            self._expires = time.monotonic() + self.timeout
+
+    def invalidate(self):
+        """
+        Force every process to rebuild its index on next use.
+        """
+        self._expires = 0
+        bump_version_stamp(self.version_key,
+                           using=settings.USER_CACHE_ALIAS)
+
+    def search(self, prefix, limit=10):
+        """
+        Return up to `limit` (id, name) pairs for skills whose name, or one
+        of whose aliases, starts with `prefix`, ignoring case.
+        """
+        prefix = prefix.strip().casefold()
+
+        if not prefix:
+            return []
+
+        self._load()
+        keys, ids = self._keys, self._ids
+
+        results = []
+        i = bisect.bisect_left(keys, prefix)
+
+        while i < len(keys) and len(results) < limit \
+                and keys[i].startswith(prefix):
+            if ids[i] not in results:
+                results.append(ids[i])
+            i += 1
+
+        return [(skill_id, self._names[skill_id]) for skill_id in results]
+
+    def canonicalize(self, name):
+        """
+        Return the (id, name) of the skill that `name` is a spelling or
+        alias of, or None if it is not a known skill.
+        """
+        self._load()
+        skill_id = self._canonical.get(normalize_skill_name(name))
+
+        if skill_id is None:
+            return None
+
+        return (skill_id, self._names[skill_id])
+
+    def get_name(self, skill_id):
+        """
+        Return the name of the skill with the given id, or None.
+        """
+        self._load()
+
+        try:
+            return self._names.get(int(skill_id))
+        except (TypeError, ValueError):
+            return None
+
+    def __len__(self):
+        self._load()
+        return len(self._names)
+
+
+skill_index = SkillIndex()
+
+
+def merge_skills(target, duplicates):
+    """
+    Merge duplicate skills into the target skill, in a single transaction.
+
+    Users' skills are reassigned with set-based queries. Where a user has
+    several of the merged skills, the highest proficiency is kept.
+    The names of the duplicates are kept as aliases of the target.
+    """
+    duplicate_ids = [skill.id for skill in duplicates if skill != target]
+
+    if not duplicate_ids:
+        return
+
+    table = connection.ops.quote_name(UserSkill._meta.db_table)
+    in_duplicates = ', '.join(['%s'] * len(duplicate_ids))
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Raise the target proficiency of users who also have a
+            # duplicate at a higher proficiency
+            max_duplicate_proficiency = (
+                'SELECT MAX(d.proficiency) FROM {table} d '
+                'WHERE d.user_id = {table}.user_id '
+                'AND d.skill_id IN ({in_duplicates})'
+            ).format(table=table, in_duplicates=in_duplicates)
+
+            cursor.execute(
+                'UPDATE {table} SET proficiency = ({max}) '
+                'WHERE skill_id = %s AND proficiency < ({max})'.format(
+                    table=table, max=max_duplicate_proficiency),
+                duplicate_ids + [target.id] + duplicate_ids)
+
+            # Drop duplicates held by users who already have the target,
+            # and all but the best duplicate held by everyone else
+            cursor.execute(
+                'DELETE FROM {table} '
+                'WHERE skill_id IN ({in_duplicates}) AND ('
+                '  user_id IN ('
+                '    SELECT t.user_id FROM {table} t WHERE t.skill_id = %s)'
+                '  OR EXISTS ('
+                '    SELECT 1 FROM {table} o'
+                '    WHERE o.user_id = {table}.user_id'
+                '    AND o.skill_id IN ({in_duplicates})'
+                '    AND (o.proficiency > {table}.proficiency'
+                '         OR (o.proficiency = {table}.proficiency'
+                '             AND o.id < {table}.id))))'.format(
+                    table=table, in_duplicates=in_duplicates),
+                duplicate_ids + [target.id] + duplicate_ids)
+
+        UserSkill.objects.filter(
+            skill_id__in=duplicate_ids).update(skill=target)
+
+        SkillAlias.objects.filter(
+            skill_id__in=duplicate_ids).update(skill=target)
+
+        for skill in duplicates:
+            if skill == target:
+                continue
+
+            normalized_name = normalize_skill_name(skill.name)
+            if normalized_name != normalize_skill_name(target.name):
+                SkillAlias.objects.get_or_create(
+                    normalized_name=normalized_name,
+                    defaults={'name': skill.name, 'skill': target})
+
+        Skill.objects.filter(id__in=duplicate_ids).delete()
@@ -0,0 +1,166 @@
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from connect.accounts.backends import (
+    CachedPermissionsBackend, CachedUserBackend
+)
+from connect.accounts.factories import ModeratorFactory, UserFactory
+from connect.accounts.models import CustomUser
+
+
+@override_settings(USER_CACHE_ALIAS='default')
+class CachedPermissionsBackendTest(TestCase):
+    fixtures = ['group_perms']
+
+    def setUp(self):
+        cache.clear()
+        self.moderator = ModeratorFactory()
+        self.standard_user = UserFactory()
+        self.permission = Permission.objects.get(codename='invite_user')
+
+    def reload(self, user):
+        return CustomUser.objects.get(pk=user.pk)
+
+    def test_permissions_are_cached_across_requests(self):
+        self.assertTrue(self.moderator.has_perm('accounts.invite_user'))
+
+        moderator = self.reload(self.moderator)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(moderator.has_perm('accounts.invite_user'))
+            self.assertTrue(moderator.has_perms(['accounts.invite_user',
+                                                 'accounts.ban_user']))
+
+    def test_group_permission_change_is_seen(self):
+        self.assertTrue(self.moderator.has_perm('accounts.invite_user'))
+
+        Group.objects.get(name='moderators').permissions.remove(
+            self.permission)
+
+        self.assertFalse(
+            self.reload(self.moderator).has_perm('accounts.invite_user'))
+
+    def test_group_membership_change_is_seen(self):
+        self.assertFalse(self.standard_user.has_perm('accounts.invite_user'))
+
+        self.standard_user.groups.add(Group.objects.get(name='moderators'))
+
+        self.assertTrue(
+            self.reload(self.standard_user).has_perm('accounts.invite_user'))
+
+    def test_user_permission_change_is_seen(self):
+        self.assertFalse(self.standard_user.has_perm('accounts.invite_user'))
+
+        self.standard_user.user_permissions.add(self.permission)
+
+        self.assertTrue(
+            self.reload(self.standard_user).has_perm('accounts.invite_user'))
+
+    def test_inactive_user_has_no_permissions(self):
+        self.assertTrue(self.moderator.has_perm('accounts.invite_user'))
+
+        self.moderator.is_active = False
+        self.moderator.save()
+
+        self.assertFalse(
+            self.reload(self.moderator).has_perm('accounts.invite_user'))
+
+    def test_superuser_change_is_seen(self):
+        self.assertFalse(self.standard_user.has_perm('accounts.ban_user'))
+
+        self.standard_user.is_superuser = True
+        self.standard_user.save()
+
+        self.assertTrue(
+            self.reload(self.standard_user).has_perm('accounts.ban_user'))
+
+    def test_cached_permissions_expire(self):
+        backend = CachedPermissionsBackend()
+        backend.permissions_timeout = 0
+        self.assertIn('accounts.invite_user',
+                      backend.get_all_permissions(self.moderator))
+
+        # Not noticed by the signal handlers
+        Group.permissions.through.objects.filter(
+            permission=self.permission).delete()
+
+        self.assertNotIn('accounts.invite_user',
+                         backend.get_all_permissions(
+                             self.reload(self.moderator)))
+
+    @override_settings(USER_CACHE_ALIAS='sessions')
+    def test_permissions_are_not_cached_without_shared_cache(self):
+        self.assertTrue(self.moderator.has_perm('accounts.invite_user'))
+
+        Group.permissions.through.objects.filter(
+            permission=self.permission).delete()
+
+        self.assertFalse(
+            self.reload(self.moderator).has_perm('accounts.invite_user'))
+
+
+@override_settings(USER_CACHE_ALIAS='default')
+class CachedUserBackendTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.backend = CachedUserBackend()
+        self.user = UserFactory(full_name='Original Name')
+
+    def test_user_is_cached(self):
+        self.backend.get_user(self.user.pk)
+
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.full_name, 'Original Name')
+
+    def test_unknown_user(self):
+        self.assertIsNone(self.backend.get_user(0))
+
+    def test_saved_user_is_reloaded(self):
+        self.backend.get_user(self.user.pk)
+
+        self.user.full_name = 'New Name'
+        self.user.save()
+
+        user = self.backend.get_user(self.user.pk)
+
+        self.assertEqual(user.full_name, 'New Name')
+
+    def test_deactivated_user_is_reloaded(self):
+        self.assertTrue(self.backend.get_user(self.user.pk).is_active)
+
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+
+        self.assertFalse(self.backend.get_user(self.user.pk).is_active)
+
+    def test_password_change_is_seen(self):
+        old_hash = self.backend.get_user(
+            self.user.pk).get_session_auth_hash()
+
+        self.user.set_password('new password')
+        self.user.save()
+
+        self.assertNotEqual(
+            self.backend.get_user(self.user.pk).get_session_auth_hash(),
+            old_hash)
+
+    def test_deleted_user_is_not_served(self):
+        self.backend.get_user(self.user.pk)
+        pk = self.user.pk
+
+        self.user.delete()
+
+        self.assertIsNone(self.backend.get_user(pk))
+
+    def test_logged_in_user_is_served_from_cache(self):
+        self.assertTrue(
+            self.client.login(username=self.user.email, password='pass'))
+        self.client.get('/')
+
+        with self.assertNumQueries(0):
+            self.backend.get_user(self.user.pk)
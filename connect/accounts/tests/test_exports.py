@@ -0,0 +1,120 @@
+import datetime
+import json
+import pytz
+
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from connect.accounts.exports import iter_member_data
+from connect.accounts.factories import (
+    AbuseReportFactory, RoleFactory, SkillFactory, UserFactory,
+    UserLinkFactory, UserSkillFactory
+)
+from connect.accounts.models import UserSkill
+from connect.moderation.factories import LogFactory
+from connect.moderation.utils import archive_logs
+
+
+class MemberDataExportTest(TestCase):
+    def setUp(self):
+        self.user = UserFactory(full_name='Member', bio='About me',
+                                roles=[RoleFactory(name='Mentor')])
+        UserSkillFactory(user=self.user, skill=SkillFactory(name='Django'),
+                         proficiency=UserSkill.EXPERT)
+        UserLinkFactory(user=self.user, anchor='Blog',
+                        url='http://blog.test/')
+        AbuseReportFactory(logged_by=self.user,
+                           logged_against=UserFactory(full_name='Other'),
+                           abuse_comment='Rude')
+        LogFactory(pertains_to=self.user, comment='Invited')
+
+        # Data about other members is not exported
+        UserSkillFactory()
+        LogFactory()
+
+        self.superuser = UserFactory(is_staff=True, is_superuser=True)
+
+    def test_member_data(self):
+        data = json.loads(''.join(iter_member_data(self.user)))
+
+        self.assertEqual(data['profile']['full_name'], 'Member')
+        self.assertEqual(data['profile']['bio'], 'About me')
+        self.assertEqual(data['profile']['roles'], ['Mentor'])
+        self.assertEqual(data['skills'], [
+            {'skill__name': 'Django', 'proficiency': UserSkill.EXPERT}])
+        self.assertEqual(data['links'], [
+            {'anchor': 'Blog', 'url': 'http://blog.test/'}])
+        self.assertEqual(len(data['abuse_reports_filed']), 1)
+        self.assertEqual(
+            data['abuse_reports_filed'][0]['logged_against__full_name'],
+            'Other')
+        self.assertEqual([log['comment'] for log in data['moderation_log']],
+                         ['Invited'])
+
+    def test_archived_moderation_log_is_exported(self):
+        self.user.date_joined = datetime.datetime(2015, 1, 5, tzinfo=pytz.UTC)
+        self.user.save()
+        for day, comment in [(20, 'Warned again'), (10, 'Warned')]:
+            LogFactory(pertains_to=self.user, comment=comment,
+                       msg_datetime=datetime.datetime(2015, 1, day,
+                                                      tzinfo=pytz.UTC))
+        LogFactory(comment='Someone else',
+                   msg_datetime=datetime.datetime(2015, 1, 15,
+                                                  tzinfo=pytz.UTC))
+        archive_logs(before=datetime.datetime(2015, 2, 1, tzinfo=pytz.UTC))
+
+        data = json.loads(''.join(iter_member_data(self.user)))
+
+        self.assertEqual([log['comment'] for log in data['moderation_log']],
+                         ['Warned', 'Warned again', 'Invited'])
+        self.assertEqual(data['moderation_log'][0]['msg_datetime'],
+                         '2015-01-10T00:00:00Z')
+
+    def test_archives_from_before_the_member_joined_are_skipped(self):
+        self.user.date_joined = datetime.datetime(2015, 2, 5, tzinfo=pytz.UTC)
+        self.user.save()
+        for month in [1, 2]:
+            LogFactory(pertains_to=self.user,
+                       comment='Logged in month {}'.format(month),
+                       msg_datetime=datetime.datetime(2015, month, 1,
+                                                      tzinfo=pytz.UTC))
+        archive_logs(before=datetime.datetime(2015, 3, 1, tzinfo=pytz.UTC))
+
+        data = json.loads(''.join(iter_member_data(self.user)))
+
+        self.assertEqual([log['comment'] for log in data['moderation_log']],
+                         ['Logged in month 2', 'Invited'])
+
+    def test_empty_sections(self):
+        data = json.loads(''.join(iter_member_data(UserFactory())))
+
+        self.assertEqual(data['skills'], [])
+        self.assertEqual(data['moderation_log'], [])
+
+    def test_admin_export_is_streamed(self):
+        self.client.login(username=self.superuser.email, password='pass')
+        response = self.client.get(reverse(
+            'admin:accounts_customuser_export', args=[self.user.pk]))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="member-{}.json"'.format(
+                             self.user.pk))
+
+        data = json.loads(b''.join(response.streaming_content).decode())
+        self.assertEqual(data['profile']['id'], self.user.pk)
+
+    def test_admin_change_page_links_to_export(self):
+        self.client.login(username=self.superuser.email, password='pass')
+        response = self.client.get(reverse(
+            'admin:accounts_customuser_change', args=[self.user.pk]))
+
+        self.assertContains(response, reverse(
+            'admin:accounts_customuser_export', args=[self.user.pk]))
+
+    def test_non_staff_cannot_export(self):
+        self.client.login(username=self.user.email, password='pass')
+        response = self.client.get(reverse(
+            'admin:accounts_customuser_export', args=[self.user.pk]))
+
+        self.assertEqual(response.status_code, 302)
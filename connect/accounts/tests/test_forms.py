@@ -7,15 +7,17 @@ from django.utils.translation import ugettext as _
 from connect.config.factories import SiteConfigFactory
 
 from connect.accounts.factories import (
-    InvitedPendingFactory, RoleFactory, SkillFactory, UserFactory
+    InvitedPendingFactory, RoleFactory, SkillAliasFactory, SkillFactory,
+    UserFactory
 )
 from connect.accounts.forms import (
     ActivateAccountForm, CloseAccountForm,
     CustomUserCreationForm, CustomUserChangeForm,
-    CustomPasswordResetForm, ProfileForm, UpdateEmailForm,
-    UpdatePasswordForm
+    CustomPasswordResetForm, ProfileForm, SkillAdminForm,
+    SkillAliasAdminForm, SkillForm, UpdateEmailForm, UpdatePasswordForm
 )
-from connect.accounts.models import UserSkill
+from connect.accounts.models import SkillAlias, UserSkill
+from connect.accounts.skills import skill_index
 
 
 class CustomCustomPasswordResetFormTest(TestCase):
@@ -49,6 +51,13 @@ class CustomCustomPasswordResetFormTest(TestCase):
         self.assertEqual(form.cleaned_data['email'], self.user.email)
         self.assertEqual(len(mail.outbox), 1)
 
+    def test_email_in_different_case(self):
+        form = CustomPasswordResetForm({'email': 'TEST@test.test'})
+        self.assertTrue(form.is_valid())
+        form.save(domain_override='example.com')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+
     def test_custom_email_subject(self):
         data = {'email': 'test@test.test'}
         form = CustomPasswordResetForm(data)
@@ -101,6 +110,63 @@ class CustomUserAdminTest(TestCase):
         self.assertNotIn('username', form.fields)
 
 
+class SkillAdminFormTest(TestCase):
+    def setUp(self):
+        self.javascript = SkillFactory(name='JavaScript')
+        SkillAliasFactory(name='JS', skill=self.javascript)
+
+    def test_new_skill_name_is_valid(self):
+        form = SkillAdminForm({'name': 'Python'})
+
+        self.assertTrue(form.is_valid())
+
+    def test_variant_of_existing_skill_is_invalid(self):
+        form = SkillAdminForm({'name': 'java script'})
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['name'][0],
+                         '"java script" is already recorded as the skill '
+                         '"JavaScript".')
+
+    def test_alias_of_existing_skill_is_invalid(self):
+        form = SkillAdminForm({'name': 'js'})
+
+        self.assertFalse(form.is_valid())
+
+    def test_renaming_skill_to_variant_of_itself_is_valid(self):
+        form = SkillAdminForm({'name': 'Javascript'},
+                              instance=self.javascript)
+
+        self.assertTrue(form.is_valid())
+
+    def test_alias_for_same_skill_is_valid(self):
+        form = SkillAliasAdminForm({'name': 'Java Script',
+                                    'skill': self.javascript.id})
+
+        self.assertTrue(form.is_valid())
+
+    def test_variant_of_existing_alias_is_invalid(self):
+        form = SkillAliasAdminForm({'name': 'j.s.',
+                                    'skill': self.javascript.id})
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['name'][0],
+                         '"j.s." is already recorded as an alias.')
+
+    def test_editing_alias_is_valid(self):
+        alias = SkillAlias.objects.get(name='JS')
+        form = SkillAliasAdminForm({'name': 'js', 'skill': self.javascript.id},
+                                   instance=alias)
+
+        self.assertTrue(form.is_valid())
+
+    def test_alias_for_another_skill_is_invalid(self):
+        python = SkillFactory(name='Python')
+        form = SkillAliasAdminForm({'name': 'JS', 'skill': python.id})
+
+        self.assertFalse(form.is_valid())
+
+
 class RequestInvitationFormTest(TestCase):
     def setUp(self):
         site = get_current_site(self.client.request)
@@ -325,6 +391,26 @@ class SkillFormsetTest(TestCase):
         self.raise_formset_error(response,
                                  'All skills must have a skill name.')
 
+    def test_unknown_skill(self):
+        """
+        Test validation fails when the skill id does not match a skill.
+        """
+        form = SkillForm(data={'skill': 999999,
+                               'proficiency': UserSkill.BEGINNER})
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('skill', form.errors)
+
+    def test_skill_is_resolved_without_query(self):
+        form = SkillForm(data={'skill': self.django.id,
+                               'proficiency': UserSkill.BEGINNER})
+        len(skill_index)  # Load the index
+
+        with self.assertNumQueries(0):
+            self.assertTrue(form.is_valid())
+
+        self.assertEqual(form.cleaned_data['skill'], self.django)
+
 
 class LinkFormsetTest(TestCase):
     def setUp(self):
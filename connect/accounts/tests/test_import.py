@@ -0,0 +1,190 @@
+import datetime
+import json
+import os
+import re
+import tempfile
+from io import StringIO
+
+from django.contrib.sites.models import Site
+from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from connect.accounts.factories import (
+    BrandFactory, ModeratorFactory, RoleFactory, SkillFactory, UserFactory
+)
+from connect.accounts.models import CustomUser, UserLink, UserSkill
+from connect.config.factories import SiteConfigFactory
+from connect.moderation.utils import sweep_unactivated_users
+from connect.utils import send_queued_emails
+
+
+class ImportMembersTest(TestCase):
+    fixtures = ['group_perms']
+
+    def setUp(self):
+        self.moderator = ModeratorFactory(email='moderator@test.test')
+        self.django = SkillFactory(name='Django')
+        self.mentor = RoleFactory(name='Mentor')
+        self.github = BrandFactory()
+        UserFactory(email='existing@test.test')
+        SiteConfigFactory(site=Site.objects.get_current())
+
+    def write_file(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def import_members(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_members', path, moderator='moderator@test.test',
+                     stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_imports_csv(self):
+        path = self.write_file('.csv', (
+            'email,full_name,bio,roles,skills,links\n'
+            'New.Member@test.test,New Member,Hi,mentor,Django:expert,'
+            'My code|https://github.com/new\n'
+            'existing@TEST.test,Existing,,,,\n'
+            'invalid,Invalid,,,,\n'
+        ))
+
+        out, err = self.import_members(path)
+        user = CustomUser.objects.get(email='new.member@test.test')
+        link = UserLink.objects.get(user=user)
+
+        self.assertIn('1 created, 1 skipped, 1 failed', out)
+        self.assertIn('Row 3: invalid email', err)
+        self.assertFalse(user.is_active)
+        self.assertFalse(user.has_usable_password())
+        self.assertEqual(user.moderator, self.moderator)
+        self.assertEqual(user.registration_method, CustomUser.INVITED)
+        self.assertEqual(list(user.roles.all()), [self.mentor])
+        self.assertEqual(UserSkill.objects.get(user=user).proficiency,
+                         UserSkill.EXPERT)
+        self.assertEqual(link.anchor, 'My code')
+        self.assertEqual(link.host, 'github.com')
+        self.assertEqual(link.icon, self.github)
+
+    def test_imports_jsonl_in_batches(self):
+        lines = [json.dumps({
+            'email': 'member{}@test.test'.format(i),
+            'full_name': 'Member {}'.format(i),
+            'skills': [{'skill': 'django', 'proficiency': 20}],
+        }) for i in range(5)]
+        path = self.write_file('.jsonl', '\n'.join(lines))
+
+        out, err = self.import_members(path, batch_size=2)
+
+        self.assertIn('Row 4: 4 created', out)
+        self.assertIn('5 created, 0 skipped, 0 failed', out)
+        self.assertEqual(UserSkill.objects.filter(
+            skill=self.django, proficiency=UserSkill.INTERMEDIATE).count(), 5)
+
+    def test_rerun_skips_imported_members(self):
+        path = self.write_file('.jsonl', json.dumps({
+            'email': 'member@test.test', 'full_name': 'Member'}))
+
+        self.import_members(path)
+        out, err = self.import_members(path)
+
+        self.assertIn('0 created, 1 skipped', out)
+        self.assertEqual(
+            CustomUser.objects.filter(email='member@test.test').count(), 1)
+
+    def test_start_row(self):
+        lines = [json.dumps({'email': 'member{}@test.test'.format(i),
+                             'full_name': 'Member'}) for i in range(3)]
+        path = self.write_file('.jsonl', '\n'.join(lines))
+
+        self.import_members(path, start_row=3)
+
+        self.assertFalse(
+            CustomUser.objects.filter(email='member0@test.test').exists())
+        self.assertTrue(
+            CustomUser.objects.filter(email='member2@test.test').exists())
+
+    def test_unknown_skill_fails_row(self):
+        path = self.write_file('.csv', (
+            'email,full_name,skills\n'
+            'member@test.test,Member,Cobol\n'
+        ))
+
+        out, err = self.import_members(path)
+
+        self.assertIn('unknown skill "Cobol"', err)
+        self.assertFalse(
+            CustomUser.objects.filter(email='member@test.test').exists())
+
+    def test_jsonl_values_of_the_wrong_type_fail_rows(self):
+        path = self.write_file('.jsonl', '\n'.join([
+            '[1]',
+            '"member@test.test"',
+            'null',
+            json.dumps({'email': 'roles@test.test', 'full_name': 'Roles',
+                        'roles': 'Mentor'}),
+            json.dumps({'email': 'skills@test.test', 'full_name': 'Skills',
+                        'skills': ['Django'], 'links': [None]}),
+            json.dumps({'email': 'member@test.test', 'full_name': 'Member'}),
+        ]))
+
+        out, err = self.import_members(path)
+
+        self.assertIn('1 created, 0 skipped, 5 failed', out)
+        self.assertIn('Row 1: invalid JSON', err)
+        self.assertIn('Row 4: invalid roles', err)
+        self.assertIn('Row 5: invalid skills, invalid links', err)
+        self.assertEqual(
+            list(CustomUser.objects.filter(
+                email__in=['roles@test.test', 'skills@test.test',
+                           'member@test.test']
+            ).values_list('email', flat=True)),
+            ['member@test.test'])
+
+    def test_imported_members_are_invited(self):
+        path = self.write_file('.jsonl', json.dumps({
+            'email': 'member@test.test', 'full_name': 'Member'}))
+
+        self.import_members(path)
+        send_queued_emails()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['member@test.test'])
+        activation_url = re.search(r'/accounts/activate/\w+',
+                                   mail.outbox[0].body).group()
+
+        response = self.client.post(activation_url, data={
+            'full_name': 'Member',
+            'password': 'abc',
+            'confirm_password': 'abc',
+        })
+
+        self.assertRedirects(response, '/')
+        user = CustomUser.objects.get(email='member@test.test')
+        self.assertTrue(user.is_active)
+        self.assertTrue(user.auth_token_is_used)
+
+    def test_members_can_be_imported_without_inviting_them(self):
+        path = self.write_file('.jsonl', json.dumps({
+            'email': 'member@test.test', 'full_name': 'Member'}))
+
+        self.import_members(path, invite=False)
+        send_queued_emails()
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            sweep_unactivated_users(
+                timezone.now() + datetime.timedelta(days=1)), 0)
+        self.assertTrue(
+            CustomUser.objects.filter(email='member@test.test').exists())
+
+    def test_unknown_moderator(self):
+        path = self.write_file('.csv', 'email,full_name\n')
+
+        with self.assertRaises(CommandError):
+            call_command('import_members', path, moderator='nobody@test.test')
@@ -1,12 +1,21 @@
-from django.core.exceptions import PermissionDenied
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import authenticate
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
 
 from connect.accounts.factories import (
     AbuseReportFactory, BrandFactory, InvitedPendingFactory, ModeratorFactory,
     RequestedPendingFactory, RoleFactory, SkillFactory, UserFactory,
     UserLinkFactory, UserSkillFactory
 )
-from connect.accounts.models import CustomUser, UserLink, UserSkill
+from connect.accounts.models import (
+    ActivationToken, CustomUser, UserLink, UserSkill
+)
+from connect.accounts.utils import hash_token
 
 
 class UserModelTest(TestCase):
@@ -33,6 +42,30 @@ class UserModelTest(TestCase):
 
         self.assertEqual(short_name, 'Firsto')
 
+    def test_email_normalized_is_populated_on_save(self):
+        user = UserFactory(email='Mixed.Case@Test.test')
+
+        self.assertEqual(user.email_normalized, 'mixed.case@test.test')
+
+    def test_clean_rejects_email_registered_in_different_case(self):
+        UserFactory(email='taken@test.test')
+        user = CustomUser(email='TAKEN@test.test')
+
+        with self.assertRaises(ValidationError):
+            user.clean()
+
+    def test_authentication_ignores_email_case(self):
+        user = UserFactory(email='login@test.test')
+
+        self.assertEqual(
+            authenticate(username='LOGIN@test.test', password='pass'), user)
+
+    def test_moderator_cannot_invite_email_registered_in_different_case(self):
+        user = self.moderator.invite_new_user(
+            email=self.standard_user.email.upper(), full_name='Duplicate')
+
+        self.assertIsNone(user)
+
     def test_is_pending_activation(self):
         self.assertFalse(self.standard_user.is_pending_activation())
         self.assertTrue(self.invited_pending.is_pending_activation())
@@ -64,6 +97,28 @@ class UserModelTest(TestCase):
                 full_name='standard_user user'
             )
 
+    def test_moderator_can_invite_new_users(self):
+        new_users = self.moderator.invite_new_users(
+            [('First@Test.test', 'First User'),
+             ('second@test.test', 'Second User')])
+
+        self.assertEqual([user.email_normalized for user in new_users],
+                         ['first@test.test', 'second@test.test'])
+
+        for user in new_users:
+            self.assertFalse(user.is_active)
+            self.assertEqual(user.moderator, self.moderator)
+            self.assertEqual(user.moderator_decision,
+                             CustomUser.PRE_APPROVED)
+            self.assertEqual(
+                ActivationToken.objects.get_by_token(user.auth_token).user,
+                user)
+
+    def test_standard_user_cannot_invite_new_users(self):
+        with self.assertRaises(PermissionDenied):
+            self.standard_user.invite_new_users(
+                [('new@test.test', 'New User')])
+
     def test_moderator_can_reinvite_user(self):
         decision_datetime = self.invited_pending.decision_datetime
         auth_token = self.invited_pending.auth_token
@@ -101,12 +156,90 @@ class UserModelTest(TestCase):
         self.assertEqual(self.requested_pending.moderator_decision,
                          CustomUser.REJECTED)
         self.assertIsNotNone(self.requested_pending.decision_datetime)
-        self.assertIsNotNone(self.requested_pending.auth_token)
+        self.assertFalse(self.requested_pending.activation_tokens.exists())
 
     def test_standard_user_user_cannot_reject_user_application(self):
         with self.assertRaises(PermissionDenied):
             self.standard_user.reject_user_application(self.requested_pending)
 
+    def test_moderator_can_approve_user_applications(self):
+        other_pending = RequestedPendingFactory()
+
+        self.moderator.approve_user_applications([self.requested_pending,
+                                                  other_pending])
+
+        for user in (self.requested_pending, other_pending):
+            saved_user = CustomUser.objects.get(id=user.id)
+            self.assertEqual(saved_user.moderator, self.moderator)
+            self.assertEqual(saved_user.moderator_decision,
+                             CustomUser.APPROVED)
+            self.assertIsNotNone(saved_user.decision_datetime)
+            self.assertEqual(
+                ActivationToken.objects.get_by_token(user.auth_token).user,
+                user)
+
+    def test_moderator_can_reject_user_applications(self):
+        self.moderator.reject_user_applications([self.requested_pending])
+
+        user = CustomUser.objects.get(id=self.requested_pending.id)
+        self.assertEqual(user.moderator, self.moderator)
+        self.assertEqual(user.moderator_decision, CustomUser.REJECTED)
+        self.assertFalse(user.activation_tokens.exists())
+
+    def test_standard_user_cannot_decide_user_applications(self):
+        with self.assertRaises(PermissionDenied):
+            self.standard_user.approve_user_applications(
+                [self.requested_pending])
+
+        with self.assertRaises(PermissionDenied):
+            self.standard_user.reject_user_applications(
+                [self.requested_pending])
+
+
+class ActivationTokenTest(TestCase):
+    def setUp(self):
+        self.user = InvitedPendingFactory(auth_token='firsttoken')
+
+    def test_only_digest_is_stored(self):
+        token = ActivationToken.objects.get(user=self.user)
+
+        self.assertEqual(token.token_hash, hash_token('firsttoken'))
+        self.assertNotIn('firsttoken', token.token_hash)
+
+    def test_issue_replaces_previous_token(self):
+        raw_token = ActivationToken.objects.issue(
+            self.user, ActivationToken.REINVITATION)
+
+        self.assertEqual(self.user.activation_tokens.count(), 1)
+        self.assertEqual(
+            ActivationToken.objects.get_by_token(raw_token).user, self.user)
+
+        with self.assertRaises(ActivationToken.DoesNotExist):
+            ActivationToken.objects.get_by_token('firsttoken')
+
+    def test_delete_expired(self):
+        InvitedPendingFactory()
+        expired = [InvitedPendingFactory() for i in range(3)]
+        ActivationToken.objects.filter(user__in=expired).update(
+            expires_datetime=timezone.now() - timedelta(days=1))
+
+        deleted = ActivationToken.objects.delete_expired(batch_size=2)
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(ActivationToken.objects.count(), 2)
+        self.assertFalse(ActivationToken.objects.filter(
+            user__in=expired).exists())
+
+    def test_delete_expired_tokens_command(self):
+        self.user.activation_tokens.update(
+            expires_datetime=timezone.now() - timedelta(days=1))
+        out = StringIO()
+
+        call_command('delete_expired_tokens', stdout=out)
+
+        self.assertIn('Deleted 1 expired token(s).', out.getvalue())
+        self.assertFalse(ActivationToken.objects.exists())
+
 
 class AbuseReportTest(TestCase):
     def test_string_method(self):
@@ -167,6 +300,11 @@ class UserLinkTest(TestCase):
 
         self.assertIsNone(user_link.icon)
 
+    def test_custom_save_method_populates_normalized_host(self):
+        user_link = UserLinkFactory(url='http://WWW.Example.com:8000/me')
+
+        self.assertEqual(user_link.host, 'www.example.com')
+
     def test_get_icon_method_gets_correct_icon(self):
         user_link = UserLinkFactory(url='http://github.com/nlh-kabu')
         icon = user_link.get_icon()
@@ -208,3 +346,18 @@ class LinkBrandTest(TestCase):
         link = UserLink.objects.get(url='http://notreallyfacebook.com/me')
 
         self.assertIsNone(link.icon)
+
+    def test_editing_brand_domain_rematches_existing_userlinks(self):
+        UserLinkFactory(url='http://facebook.com/me')
+        UserLinkFactory(url='http://fb.com/me')
+
+        brand = BrandFactory(name='Facebook', domain='facebook.com',
+                             fa_icon='fa-facebook')
+        brand.domain = 'fb.com'
+        brand.save()
+
+        old_link = UserLink.objects.get(url='http://facebook.com/me')
+        new_link = UserLink.objects.get(url='http://fb.com/me')
+
+        self.assertIsNone(old_link.icon)
+        self.assertEqual(new_link.icon, brand)
@@ -0,0 +1,174 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from connect.accounts.factories import (
+    SkillAliasFactory, SkillFactory, UserFactory, UserSkillFactory
+)
+from connect.accounts.models import Skill, SkillAlias, UserSkill
+from connect.accounts.skills import SkillIndex, merge_skills
+
+
+@override_settings(USER_CACHE_ALIAS='default')
+class SkillIndexTest(TestCase):
+    def setUp(self):
+        self.index = SkillIndex()
+        self.django = SkillFactory(name='Django')
+        self.docker = SkillFactory(name='docker')
+        self.python = SkillFactory(name='Python')
+
+    def test_search_matches_prefix_ignoring_case(self):
+        results = self.index.search('D')
+
+        self.assertEqual(results, [(self.django.id, 'Django'),
+                                   (self.docker.id, 'docker')])
+
+    def test_search_limits_results(self):
+        results = self.index.search('d', limit=1)
+
+        self.assertEqual(results, [(self.django.id, 'Django')])
+
+    def test_search_with_empty_prefix_returns_nothing(self):
+        self.assertEqual(self.index.search('  '), [])
+
+    def test_index_is_refreshed_when_skills_change(self):
+        self.assertEqual(self.index.search('py'),
+                         [(self.python.id, 'Python')])
+
+        self.python.name = 'Pyramid'
+        self.python.save()
+
+        self.assertEqual(self.index.search('py'),
+                         [(self.python.id, 'Pyramid')])
+
+        self.python.delete()
+
+        self.assertEqual(self.index.search('py'), [])
+
+    @override_settings(USER_CACHE_ALIAS='sessions')
+    def test_index_expires_without_shared_cache(self):
+        self.index.timeout = 0
+        self.assertEqual(self.index.search('py'),
+                         [(self.python.id, 'Python')])
+
+        Skill.objects.filter(id=self.python.id).update(name='Pyramid')
+
+        self.assertEqual(self.index.search('py'),
+                         [(self.python.id, 'Pyramid')])
+
+    def test_search_matches_aliases(self):
+        SkillAliasFactory(name='Dj', skill=self.django)
+        SkillAliasFactory(name='Pyth', skill=self.python)
+
+        self.assertEqual(self.index.search('dj'), [(self.django.id, 'Django')])
+        self.assertEqual(self.index.search('pyth'),
+                         [(self.python.id, 'Python')])
+
+    def test_canonicalize(self):
+        SkillAliasFactory(name='DJ', skill=self.django)
+
+        self.assertEqual(self.index.canonicalize('django '),
+                         (self.django.id, 'Django'))
+        self.assertEqual(self.index.canonicalize('d.j.'),
+                         (self.django.id, 'Django'))
+        self.assertIsNone(self.index.canonicalize('ruby'))
+
+    def test_get_name(self):
+        self.assertEqual(self.index.get_name(self.django.id), 'Django')
+        self.assertEqual(self.index.get_name(str(self.django.id)), 'Django')
+        self.assertIsNone(self.index.get_name(''))
+
+
+class MergeSkillsTest(TestCase):
+    def setUp(self):
+        self.javascript = SkillFactory(name='JavaScript')
+        self.js = SkillFactory(name='JS')
+        self.java_script = SkillFactory(name='Java script')
+
+    def get_proficiencies(self):
+        return dict(UserSkill.objects.filter(
+            skill=self.javascript).values_list('user_id', 'proficiency'))
+
+    def test_merge_reassigns_user_skills(self):
+        user = UserFactory()
+        UserSkillFactory(user=user, skill=self.js,
+                         proficiency=UserSkill.ADVANCED)
+
+        merge_skills(self.javascript, [self.js, self.java_script])
+
+        self.assertEqual(self.get_proficiencies(),
+                         {user.id: UserSkill.ADVANCED})
+        self.assertEqual(list(Skill.objects.all()), [self.javascript])
+
+    def test_merge_keeps_highest_proficiency(self):
+        has_target = UserFactory()
+        UserSkillFactory(user=has_target, skill=self.javascript,
+                         proficiency=UserSkill.BEGINNER)
+        UserSkillFactory(user=has_target, skill=self.js,
+                         proficiency=UserSkill.EXPERT)
+        UserSkillFactory(user=has_target, skill=self.java_script,
+                         proficiency=UserSkill.INTERMEDIATE)
+
+        has_duplicates = UserFactory()
+        UserSkillFactory(user=has_duplicates, skill=self.js,
+                         proficiency=UserSkill.INTERMEDIATE)
+        UserSkillFactory(user=has_duplicates, skill=self.java_script,
+                         proficiency=UserSkill.ADVANCED)
+
+        has_better_target = UserFactory()
+        UserSkillFactory(user=has_better_target, skill=self.javascript,
+                         proficiency=UserSkill.EXPERT)
+        UserSkillFactory(user=has_better_target, skill=self.js,
+                         proficiency=UserSkill.BEGINNER)
+
+        merge_skills(self.javascript, [self.js, self.java_script])
+
+        self.assertEqual(self.get_proficiencies(), {
+            has_target.id: UserSkill.EXPERT,
+            has_duplicates.id: UserSkill.ADVANCED,
+            has_better_target.id: UserSkill.EXPERT,
+        })
+        self.assertEqual(UserSkill.objects.count(), 3)
+
+    def test_merge_keeps_duplicate_names_as_aliases(self):
+        merge_skills(self.javascript, [self.js, self.java_script])
+
+        aliases = SkillAlias.objects.filter(skill=self.javascript)
+
+        # 'Java script' is a variant spelling, so needs no alias
+        self.assertEqual([alias.name for alias in aliases], ['JS'])
+
+    def test_command_merges_variant_spellings_and_aliases(self):
+        SkillAliasFactory(name='js', skill=self.javascript)
+        UserSkillFactory(skill=self.java_script)
+        UserSkillFactory(skill=self.java_script)
+
+        out = StringIO()
+        call_command('merge_skills', stdout=out)
+
+        self.assertEqual(list(Skill.objects.all()), [self.javascript])
+        self.assertEqual(UserSkill.objects.filter(
+            skill=self.javascript).count(), 2)
+
+    def test_command_merges_named_skills(self):
+        python = SkillFactory(name='Python')
+
+        out = StringIO()
+        call_command('merge_skills', 'JS', into='JavaScript', stdout=out)
+
+        self.assertEqual(set(Skill.objects.all()),
+                         {self.javascript, self.java_script, python})
+        self.assertIn('Merging JS into JavaScript', out.getvalue())
+
+    def test_command_needs_names_to_merge_into_a_skill(self):
+        with self.assertRaises(CommandError):
+            call_command('merge_skills', into='JavaScript', stdout=StringIO())
+
+    def test_command_dry_run_does_not_merge(self):
+        out = StringIO()
+        call_command('merge_skills', dry_run=True, stdout=out)
+
+        self.assertEqual(Skill.objects.count(), 3)
+        self.assertIn('Merging', out.getvalue())
@@ -8,10 +8,12 @@ from django.test import TestCase, RequestFactory
 from connect.config.factories import SiteConfigFactory
 
 from connect.accounts.factories import UserFactory
+from connect.accounts.models import ActivationToken
 from connect.accounts.utils import (
     create_inactive_user, get_user, invite_user_to_reactivate_account,
     validate_email_availability
 )
+from connect.utils import send_queued_emails
 
 
 class AccountUtilsTest(TestCase):
@@ -43,13 +45,16 @@ class AccountUtilsTest(TestCase):
         Test that when a closed account is reactivated, their auth token
         is reset.
         """
-        initial_token = self.standard_user.auth_token
+        user = UserFactory(auth_token='initialtoken')
         request = self.factory.get(reverse('accounts:request-invitation'))
-        user = invite_user_to_reactivate_account(self.standard_user, request)
+        user = invite_user_to_reactivate_account(user, request)
 
-        self.assertNotEqual(initial_token, user.auth_token)
+        self.assertNotEqual(user.auth_token, 'initialtoken')
         self.assertFalse(user.auth_token_is_used)
 
+        token = ActivationToken.objects.get(user=user)
+        self.assertEqual(token.purpose, ActivationToken.REACTIVATION)
+
     def test_reactivation_email_sent_to_user(self):
         """
         Test that when a closed account is reactivated, they are sent an
@@ -65,6 +70,7 @@ class AccountUtilsTest(TestCase):
         expected_url = 'http://testserver/accounts/activate/{}'.format(
             self.closed_user.auth_token
         )
+        send_queued_emails()
         email = mail.outbox[0]
 
         self.assertEqual(len(mail.outbox), 1)
@@ -78,6 +84,11 @@ class AccountUtilsTest(TestCase):
 
         self.assertEqual(user, self.standard_user)
 
+    def test_get_user_ignores_case(self):
+        user = get_user(' My.User@Test.test')
+
+        self.assertEqual(user, self.standard_user)
+
     def test_unregistered_email(self):
         """
         Test that an email not registered to another user is returned as True.
@@ -94,3 +105,7 @@ class AccountUtilsTest(TestCase):
         """
         with self.assertRaises(ValidationError):
             validate_email_availability('my.user@test.test')
+
+    def test_registered_email_in_different_case(self):
+        with self.assertRaises(ValidationError):
+            validate_email_availability('MY.USER@test.test')
@@ -1,16 +1,25 @@
+import json
+from datetime import timedelta
+
 import factory
 
 from django.contrib.auth import get_user_model
 from django.contrib.sites.shortcuts import get_current_site
 from django.contrib.auth import views as auth_views
 from django.core import mail
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from connect.accounts import factories
 from connect.accounts import views
 from connect.accounts.models import UserLink, UserSkill
 from connect.config.factories import SiteConfigFactory
 from connect.tests import BoostedTestCase as TestCase
+from connect.utils import send_queued_emails
 
 
 User = get_user_model()
@@ -109,6 +118,7 @@ class RequestInvitationTest(TestCase):
         expected_url = (
             'href="http://testserver/moderation/review-applications/"'
         )
+        send_queued_emails()
         email = mail.outbox[0]
 
         # 3 created as batch, plus original.
@@ -167,6 +177,19 @@ class ActivateAccountTest(TestCase):
 
         self.assertInHTML(expected_html, response.content.decode())
 
+    def test_expired_token(self):
+        """
+        Test that a user with an expired token is shown a
+        'token has expired' message.
+        """
+        self.invited_user.activation_tokens.update(
+            expires_datetime=timezone.now() - timedelta(days=1))
+
+        response = self.client.get('/accounts/activate/mytoken')
+        expected_html = '<h3 class="lined">Token has Expired</h3>'
+
+        self.assertInHTML(expected_html, response.content.decode())
+
     def test_account_activation(self):
         """
         Given a valid token, and valid data,
@@ -258,6 +281,259 @@ class ProfileSettingsTest(TestCase):
         expected_message = 'profile has been updated.'
         self.assertIn(expected_message, response.content.decode())
 
+    def test_query_count_does_not_grow_with_skills_and_links(self):
+        cache.clear()
+        skills = factories.SkillFactory.create_batch(5)
+        factories.RoleFactory.create_batch(3)
+
+        self.client.login(username=self.standard_user.email, password='pass')
+        url = reverse('accounts:profile-settings')
+        self.client.get(url)
+
+        factories.UserSkillFactory(user=self.standard_user, skill=skills[0])
+        factories.UserLinkFactory(user=self.standard_user)
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+
+        for skill in skills[1:]:
+            factories.UserSkillFactory(user=self.standard_user, skill=skill)
+            factories.UserLinkFactory(user=self.standard_user)
+
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+
+        self.assertEqual(len(few), len(many))
+
+
+class EmailAvailabilityTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.standard_user = factories.UserFactory(email='taken@test.test')
+
+    def get_availability(self, email):
+        response = self.client.get(reverse('accounts:email-availability'),
+                                   {'email': email})
+        return json.loads(response.content.decode())['available']
+
+    def test_url(self):
+        self.check_url('/accounts/email-availability/',
+                       views.email_availability)
+
+    def test_registered_email_is_unavailable(self):
+        self.assertFalse(self.get_availability('Taken@test.test'))
+
+    def test_unregistered_email_is_available(self):
+        self.assertTrue(self.get_availability('free@test.test'))
+
+    def test_invalid_email_is_rejected(self):
+        response = self.client.get(reverse('accounts:email-availability'),
+                                   {'email': 'not an email'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_cached_answer_is_cleared_when_users_change(self):
+        self.assertTrue(self.get_availability('new@test.test'))
+
+        factories.UserFactory(email='new@test.test')
+        self.assertFalse(self.get_availability('new@test.test'))
+
+        self.standard_user.email = 'changed@test.test'
+        self.standard_user.save()
+        self.assertTrue(self.get_availability('taken@test.test'))
+        self.assertFalse(self.get_availability('changed@test.test'))
+
+        self.standard_user.delete()
+        self.assertTrue(self.get_availability('changed@test.test'))
+
+    @override_settings(EMAIL_AVAILABILITY_RATE_LIMIT=2)
+    def test_lookups_are_rate_limited_per_client(self):
+        url = reverse('accounts:email-availability')
+        for _ in range(2):
+            response = self.client.get(url, {'email': 'free@test.test'},
+                                       REMOTE_ADDR='10.0.0.1')
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(url, {'email': 'free@test.test'},
+                                   REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+
+        response = self.client.get(url, {'email': 'free@test.test'},
+                                   REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(EMAIL_AVAILABILITY_RATE_LIMIT=1)
+    def test_clients_behind_a_proxy_are_limited_separately(self):
+        url = reverse('accounts:email-availability')
+        response = self.client.get(url, {'email': 'free@test.test'},
+                                   HTTP_X_FORWARDED_FOR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+
+        # Spoofed addresses before the one added by the proxy are ignored
+        response = self.client.get(url, {'email': 'free@test.test'},
+                                   HTTP_X_FORWARDED_FOR='10.0.0.9, 10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+
+        response = self.client.get(url, {'email': 'free@test.test'},
+                                   HTTP_X_FORWARDED_FOR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+
+class ProfileSectionTest(TestCase):
+    def setUp(self):
+        self.standard_user = factories.UserFactory(full_name='Old Name')
+        self.client.login(username=self.standard_user.email, password='pass')
+
+    def post_json(self, url_name, data):
+        response = self.client.post(reverse(url_name), data)
+        return response, json.loads(response.content.decode())
+
+    def test_urls(self):
+        self.check_url('/accounts/profile/details/',
+                       views.update_profile_details)
+        self.check_url('/accounts/profile/roles/', views.update_profile_roles)
+        self.check_url('/accounts/profile/skill/', views.update_profile_skill)
+        self.check_url('/accounts/profile/link/', views.update_profile_link)
+
+    def test_get_is_not_allowed(self):
+        response = self.client.get(reverse('accounts:update-profile-details'))
+
+        self.assertEqual(response.status_code, 405)
+
+    def test_can_update_details(self):
+        response, data = self.post_json('accounts:update-profile-details', {
+            'full_name': 'New Name',
+            'bio': 'New bio',
+        })
+
+        user = User.objects.get(id=self.standard_user.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user.full_name, 'New Name')
+        self.assertEqual(user.bio, 'New bio')
+
+    def test_invalid_details_return_errors(self):
+        response, data = self.post_json('accounts:update-profile-details', {
+            'full_name': '',
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(data['errors']['full_name'],
+                         ['Please enter your full name.'])
+
+    def test_can_update_roles(self):
+        mentor = factories.RoleFactory(name='mentor')
+        social = factories.RoleFactory(name='social')
+        self.standard_user.roles.add(mentor)
+
+        response, data = self.post_json('accounts:update-profile-roles', {
+            'roles': [social.id],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(self.standard_user.roles.all()), [social])
+
+    def test_can_add_update_and_remove_skill(self):
+        django = factories.SkillFactory(name='django')
+        url_name = 'accounts:update-profile-skill'
+
+        self.post_json(url_name, {'skill': django.id,
+                                  'proficiency': UserSkill.BEGINNER})
+        self.post_json(url_name, {'skill': django.id,
+                                  'proficiency': UserSkill.EXPERT})
+
+        user_skill = UserSkill.objects.get(user=self.standard_user)
+        self.assertEqual(user_skill.skill, django)
+        self.assertEqual(user_skill.proficiency, UserSkill.EXPERT)
+
+        self.post_json(url_name, {'skill': django.id, 'proficiency': ''})
+
+        self.assertFalse(
+            UserSkill.objects.filter(user=self.standard_user).exists())
+
+    def test_skill_is_required(self):
+        response, data = self.post_json('accounts:update-profile-skill', {
+            'skill': '',
+            'proficiency': UserSkill.BEGINNER,
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(data['errors']['__all__'],
+                         ['All skills must have a skill name.'])
+
+    def test_can_add_update_and_remove_link(self):
+        brand = factories.BrandFactory()
+        url_name = 'accounts:update-profile-link'
+
+        response, data = self.post_json(url_name, {
+            'anchor': 'My Link',
+            'url': 'http://mylink.com/',
+        })
+        link_id = data['link']
+
+        self.post_json(url_name, {
+            'link': link_id,
+            'anchor': 'My Github',
+            'url': 'http://{}/me/'.format(brand.domain),
+        })
+
+        link = UserLink.objects.get(id=link_id)
+        self.assertEqual(link.anchor, 'My Github')
+        self.assertEqual(link.icon, brand)
+
+        self.post_json(url_name, {'link': link_id, 'anchor': '', 'url': ''})
+
+        self.assertFalse(UserLink.objects.filter(id=link_id).exists())
+
+    def test_duplicate_link_is_rejected(self):
+        factories.UserLinkFactory(user=self.standard_user, anchor='Taken')
+
+        response, data = self.post_json('accounts:update-profile-link', {
+            'anchor': 'Taken',
+            'url': 'http://other.com/',
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(data['errors']['__all__'],
+                         ['Links must have unique anchors and URLs.'])
+
+    def test_cannot_update_another_users_link(self):
+        link = factories.UserLinkFactory()
+
+        response, data = self.post_json('accounts:update-profile-link', {
+            'link': link.id,
+            'anchor': 'Mine now',
+            'url': 'http://mine.com/',
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('link', data['errors'])
+
+
+class SkillAutocompleteTest(TestCase):
+    def setUp(self):
+        self.standard_user = factories.UserFactory()
+        self.django = factories.SkillFactory(name='Django')
+        factories.SkillFactory(name='Python')
+
+    def test_url(self):
+        self.check_url('/accounts/skills/autocomplete/',
+                       views.skill_autocomplete)
+
+    def test_unauthenticated_user_cannot_search_skills(self):
+        response = self.client.get(reverse('accounts:skill-autocomplete'))
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_returns_skills_matching_prefix(self):
+        self.client.login(username=self.standard_user.email, password='pass')
+        response = self.client.get(reverse('accounts:skill-autocomplete'),
+                                   {'term': 'dj'})
+
+        self.assertEqual(json.loads(response.content.decode()), [{
+            'id': self.django.id, 'label': 'Django', 'value': 'Django',
+        }])
+
 
 class UpdateEmailTest(TestCase):
     def setUp(self):
@@ -342,6 +618,36 @@ class UpdatePasswordTest(TestCase):
         self.assertIn(expected_message, response.content.decode())
 
 
+class UpdateNotificationsTest(TestCase):
+    fixtures = ['group_perms']
+
+    def setUp(self):
+        self.moderator = factories.ModeratorFactory()
+        self.standard_user = factories.UserFactory()
+
+    def test_url(self):
+        self.check_url('/accounts/update/notifications/',
+                       views.update_notifications)
+
+    def test_standard_user_cannot_access_page(self):
+        self.client.login(username=self.standard_user.email, password='pass')
+        response = self.client.get(reverse('accounts:update-notifications'))
+
+        self.assertRedirects(
+            response, '/accounts/login/?next=/accounts/update/notifications/')
+
+    def test_moderator_can_choose_digests(self):
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.client.post(
+            reverse('accounts:update-notifications'),
+            data={'notification_frequency': User.DAILY})
+
+        moderator = User.objects.get(id=self.moderator.id)
+        self.assertEqual(moderator.notification_frequency, User.DAILY)
+        self.assertIn('notification settings have been updated',
+                      response.content.decode())
+
+
 class CloseAccountTest(TestCase):
     def setUp(self):
         self.standard_user = factories.UserFactory()
@@ -68,14 +68,28 @@ urlpatterns = patterns(
         name='request-invitation-done'),
     url(_(r'^activate/(?P<token>\w+)$'), views.activate_account,
         name='activate-account'),
+    url(_(r'^email-availability/$'), views.email_availability,
+        name='email-availability'),
 
     # Profile settings
     url(_(r'^profile/$'), views.profile_settings, name='profile-settings'),
+    url(_(r'^profile/details/$'), views.update_profile_details,
+        name='update-profile-details'),
+    url(_(r'^profile/roles/$'), views.update_profile_roles,
+        name='update-profile-roles'),
+    url(_(r'^profile/skill/$'), views.update_profile_skill,
+        name='update-profile-skill'),
+    url(_(r'^profile/link/$'), views.update_profile_link,
+        name='update-profile-link'),
+    url(_(r'^skills/autocomplete/$'), views.skill_autocomplete,
+        name='skill-autocomplete'),
 
     # Account settings
     url(_(r'^update/email/$'), views.update_email, name='update-email'),
     url(_(r'^update/password/$'), views.update_password,
         name='update-password'),
+    url(_(r'^update/notifications/$'), views.update_notifications,
+        name='update-notifications'),
     url(_(r'^close/$'), views.close_account, name='close-account'),
     url(_(r'^close/done/$'),
         TemplateView.as_view(template_name='accounts/close_account_done.html'),
@@ -1,12 +1,17 @@
+import hashlib
+import re
+from urllib.parse import urlsplit
+
 from django import forms
 
 from django.contrib.auth import get_user_model
 from django.contrib.sites.shortcuts import get_current_site
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.utils.translation import ugettext as _
 from django.utils.translation import ugettext_lazy
 
-from connect.utils import send_connect_email, generate_unique_id
+from connect.utils import send_connect_email
 
 
 def create_inactive_user(email, full_name):
@@ -25,15 +30,25 @@ def create_inactive_user(email, full_name):
     return user
 
 
+def hash_token(token):
+    """
+    Return the digest under which an activation token is stored.
+    """
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
 def invite_user_to_reactivate_account(user, request):
     """
     Send an email to a user asking them if they'd like to reactivate
     their account.
     """
+    from connect.accounts.models import ActivationToken
+
     # Build and send a reactivation link for closed account
-    user.auth_token = generate_unique_id()  # Reset token
     user.auth_token_is_used = False
     user.save()
+    user.auth_token = ActivationToken.objects.issue(
+        user, ActivationToken.REACTIVATION)
 
     site = get_current_site(request)
     url = request.build_absolute_uri(
@@ -53,15 +68,23 @@ def invite_user_to_reactivate_account(user, request):
     return user
 
 
+def normalize_email(email):
+    """
+    Return the case-insensitive form of an email address, as stored in the
+    (uniquely indexed) email_normalized column of users.
+    """
+    return email.strip().lower()
+
+
 def get_user(email):
     """
-    Retrieve a user based on the supplied email address.
+    Retrieve a user based on the supplied email address (ignoring case).
     Return None if no user has registered this email address.
     """
     User = get_user_model()
 
     try:
-        user = User.objects.get(email=email)
+        user = User.objects.get(email_normalized=normalize_email(email))
         return user
 
     except User.DoesNotExist:
@@ -72,8 +95,10 @@ def validate_email_availability(email):
     """
     Check that the email address is not registered to an existing user.
     """
-    user = get_user(email)
-    if user:
+    User = get_user_model()
+
+    if email and User.objects.filter(
+            email_normalized=normalize_email(email)).exists():
         raise forms.ValidationError(
             ugettext_lazy('Sorry, this email address is already '
                           'registered to another user.'),
@@ -81,3 +106,103 @@ def validate_email_availability(email):
         )
     else:
         return True
+
+
+def get_registered_emails(emails):
+    """
+    Return the (normalized) email addresses, from those given, that are
+    registered to users, with a single query.
+    """
+    User = get_user_model()
+    normalized_emails = set(normalize_email(email) for email in emails)
+
+    if not normalized_emails:
+        return set()
+
+    return set(User.objects.filter(
+        email_normalized__in=normalized_emails
+    ).values_list('email_normalized', flat=True))
+
+
+EMAIL_REGISTERED_CACHE_TIMEOUT = 60
+
+
+def get_email_registered_cache_key(email):
+    digest = hashlib.md5(normalize_email(email).encode('utf-8')).hexdigest()
+    return 'accounts:email_registered:{}'.format(digest)
+
+
+def is_email_registered(email):
+    """
+    Check whether an email address is registered to a user, caching the
+    answer briefly. Use validate_email_availability() to validate forms.
+    """
+    key = get_email_registered_cache_key(email)
+    registered = cache.get(key)
+
+    if registered is None:
+        User = get_user_model()
+        registered = User.objects.filter(
+            email_normalized=normalize_email(email)).exists()
+        cache.set(key, registered, EMAIL_REGISTERED_CACHE_TIMEOUT)
+
+    return registered
+
+
+def get_client_ip(request):
+    """
+    Return the address of the client making a request. Behind a proxy
+    (see SECURE_PROXY_SSL_HEADER) this is the last address the proxy
+    appended to X-Forwarded-For, as any earlier ones come from the client.
+    """
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    addresses = [address.strip() for address in forwarded_for.split(',')
+                 if address.strip()]
+
+    if addresses:
+        return addresses[-1]
+
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def is_rate_limited(key, limit, period):
+    """
+    Count an attempt against `key`, returning True once more than `limit`
+    attempts have been made within `period` seconds of the first.
+    """
+    key = 'ratelimit:{}'.format(key)
+    cache.add(key, 0, period)
+
+    try:
+        attempts = cache.incr(key)
+    except ValueError:
+        # The count expired between add() and incr()
+        cache.add(key, 1, period)
+        attempts = 1
+
+    return attempts > limit
+
+
+def clear_email_registered_cache(*emails):
+    """
+    Forget cached registration checks for the given email addresses.
+    """
+    cache.delete_many([get_email_registered_cache_key(email)
+                       for email in emails if email])
+
+
+def get_host(url):
+    """
+    Return the normalized (lower-cased, port-less) host of a URL.
+    Return an empty string if the URL has no host.
+    """
+    return urlsplit(url).hostname or ''
+
+
+def normalize_skill_name(name):
+    """
+    Reduce a skill name to a key that ignores case, spacing and punctuation
+    (other than '+' and '#', as in 'C++' and 'C#'), so that near-duplicates
+    such as 'Javascript' and 'Java Script' compare equal.
+    """
+    return re.sub(r'[^\w+#]|_', '', name.casefold())
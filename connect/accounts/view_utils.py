@@ -1,9 +1,7 @@
-from urllib.parse import urlsplit
-
 from django.contrib import messages
-from django.core.exceptions import ObjectDoesNotExist
 from django.core.urlresolvers import reverse
 from django.db import IntegrityError, transaction
+from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.utils.translation import ugettext as _
 
@@ -26,6 +24,8 @@ def save_paired_items(request, user, formset, Model,
                 model_instance = Model(user=user)
                 setattr(model_instance, item_name, item)
                 setattr(model_instance, counterpart_name, counterpart)
+                # bulk_create() bypasses save(), so populate derived fields
+                model_instance.clean()
                 paired_items.append(model_instance)
 
     # Replace old pairs with new
@@ -57,15 +57,26 @@ def match_link_to_brand(user_links):
     This functionality also exists as a custom save() method on the model.
     -- Use this with functions that create and update in bulk.
     """
-    for link in user_links:
-        domain = urlsplit(link.url).netloc
+    hosts = set(link.host for link in user_links)
+    brands = LinkBrand.objects.filter(domain__in=hosts)
+
+    for brand in brands:
+        matched = [link for link in user_links if link.host == brand.domain]
 
-        try:
-            brand = LinkBrand.objects.get(domain=domain)
+        for link in matched:
             link.icon = brand
-            link.save()
 
-        except ObjectDoesNotExist:
-            pass
+        UserLink.objects.filter(
+            pk__in=[link.pk for link in matched]).update(icon=brand)
 
     return user_links
+
+
+def form_errors_response(form):
+    """
+    Return a form's errors as JSON, for the profile section endpoints.
+    """
+    errors = {field: list(messages)
+              for field, messages in form.errors.items()}
+
+    return JsonResponse({'errors': errors}, status=400)
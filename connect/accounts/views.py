@@ -1,32 +1,45 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, get_user_model, login, logout
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.hashers import make_password
 from django.contrib.sites.shortcuts import get_current_site
+from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
+from django.core.validators import validate_email
+from django.db import transaction
 from django.forms.formsets import formset_factory
-from django.shortcuts import get_object_or_404, redirect, render
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import redirect, render
 from django.utils.timezone import now
 from django.utils.translation import ugettext as _
-
-from connect.utils import send_connect_email
+from django.views.decorators.http import require_POST
 
 from connect.accounts.forms import (
     ActivateAccountForm, BaseLinkFormSet, BaseSkillFormSet, CloseAccountForm,
-    LinkForm, ProfileForm, RequestInvitationForm, SkillForm, UpdateEmailForm,
+    LinkForm, NotificationSettingsForm, ProfileForm, ProfileLinkForm,
+    ProfileSkillForm, RequestInvitationForm, SkillForm, UpdateEmailForm,
     UpdatePasswordForm
 )
-from connect.accounts.models import Role, Skill, UserLink, UserSkill
+from connect.accounts.models import (
+    ActivationToken, Role, UserLink, UserSkill
+)
+from connect.accounts.skills import skill_index
 
-from connect.accounts.utils import create_inactive_user
+from connect.accounts.utils import (
+    create_inactive_user, get_client_ip, is_email_registered, is_rate_limited
+)
 from connect.accounts.view_utils import (
-    match_link_to_brand, save_links, save_skills
+    form_errors_response, match_link_to_brand, save_links, save_skills
 )
+from connect.moderation.models import ModeratorNotification
+from connect.moderation.utils import notify_moderators
 
 
 User = get_user_model()
 
 
+@transaction.atomic
 def request_invitation(request):
     """
     Allow a member of the public to request an account invitation.
@@ -50,10 +63,7 @@ def request_invitation(request):
             new_user.application_comments = comments
             new_user.save()
 
-            # Send email(s) to moderator(s) alerting them of new
-            # account application
-            moderators = User.objects.filter(is_moderator=True, is_active=True)
-
+            # Alert moderators to the new account application
             url = request.build_absolute_uri(reverse(
                 'moderation:review-applications'))
 
@@ -62,12 +72,12 @@ def request_invitation(request):
                 'moderation/emails/notify_moderators_of_new_application.html'
             )
 
-            for moderator in moderators:
-                send_connect_email(subject=subject,
-                                   template=template,
-                                   recipient=moderator,
-                                   site=site,
-                                   url=url)
+            notify_moderators(event_type=ModeratorNotification.APPLICATION,
+                              pertains_to=new_user,
+                              subject=subject,
+                              template=template,
+                              site=site,
+                              url=url)
 
             return redirect('accounts:request-invitation-done')
     else:
@@ -80,14 +90,60 @@ def request_invitation(request):
     return render(request, 'accounts/request_invitation.html', context)
 
 
+def email_availability(request):
+    """
+    Report whether an email address is available, as JSON, so that forms
+    can warn about registered addresses before they are submitted.
+    Clients making too many lookups are refused, to prevent enumeration.
+    """
+    key = 'email_availability:{}'.format(get_client_ip(request))
+
+    if is_rate_limited(key, settings.EMAIL_AVAILABILITY_RATE_LIMIT,
+                       settings.EMAIL_AVAILABILITY_RATE_PERIOD):
+        return JsonResponse({
+            'message': _('Too many requests, please try again later.'),
+        }, status=429)
+
+    email = request.GET.get('email', '').strip()
+
+    try:
+        validate_email(email)
+    except ValidationError:
+        return HttpResponseBadRequest()
+
+    if is_email_registered(email):
+        return JsonResponse({
+            'available': False,
+            'message': _('Sorry, this email address is already '
+                         'registered to another user.'),
+        })
+
+    return JsonResponse({'available': True})
+
+
 def activate_account(request, token):
     """
     Allow a user to activate their account with the token sent to them
     by email.
     """
-    user = get_object_or_404(User, auth_token=token)
+    try:
+        activation_token = ActivationToken.objects.get_by_token(token)
+    except ActivationToken.DoesNotExist:
+        raise Http404
+
+    user = activation_token.user
+
+    if user.auth_token_is_used:
+        context = {
+            'token_is_used': True,
+        }
 
-    if not user.auth_token_is_used:
+    elif activation_token.is_expired():
+        context = {
+            'token_is_expired': True,
+        }
+
+    else:
         if request.POST:
             form = ActivateAccountForm(request.POST, user=user)
 
@@ -119,13 +175,6 @@ def activate_account(request, token):
             'form': form,
         }
 
-    else:
-        token_is_used = True
-
-        context = {
-            'token_is_used': token_is_used,
-        }
-
     return render(request, 'accounts/activate_account.html', context)
 
 
@@ -136,14 +185,18 @@ def profile_settings(request):
     """
     user = request.user
 
-    has_skills = Skill.objects.count() > 0
-    has_roles = Role.objects.count() > 0
+    # Reference data is fetched once and shared by the form and formsets,
+    # so the number of queries does not grow with the number of rows
+    roles = list(Role.objects.all())
+    has_roles = bool(roles)
+    has_skills = len(skill_index) > 0
 
     SkillFormSet = formset_factory(SkillForm, formset=BaseSkillFormSet)
 
     user_skills = UserSkill.objects.filter(user=user).order_by('skill__name')
-    skill_data = [{'skill': s.skill, 'proficiency': s.proficiency}
-                  for s in user_skills]
+    skill_data = [{'skill': skill_id, 'proficiency': proficiency}
+                  for skill_id, proficiency
+                  in user_skills.values_list('skill_id', 'proficiency')]
 
     LinkFormSet = formset_factory(LinkForm, formset=BaseLinkFormSet)
 
@@ -152,7 +205,7 @@ def profile_settings(request):
                  for l in user_links]
 
     if request.method == 'POST':
-        form = ProfileForm(request.POST, user=user)
+        form = ProfileForm(request.POST, user=user, roles=roles)
         skill_formset = SkillFormSet(request.POST, prefix='skill')
         link_formset = LinkFormSet(request.POST, prefix='link')
 
@@ -176,7 +229,7 @@ def profile_settings(request):
                 'Your {} profile has been updated.'.format(site.name)))
 
     else:
-        form = ProfileForm(user=user)
+        form = ProfileForm(user=user, roles=roles)
         skill_formset = SkillFormSet(initial=skill_data, prefix='skill')
         link_formset = LinkFormSet(initial=link_data, prefix='link')
 
@@ -191,6 +244,114 @@ def profile_settings(request):
     return render(request, 'accounts/profile_settings.html', context)
 
 
+@login_required
+@require_POST
+def update_profile_details(request):
+    """
+    Update the user's name and bio.
+    """
+    user = request.user
+    form = ProfileForm(request.POST, user=user, only=('full_name', 'bio'))
+
+    if not form.is_valid():
+        return form_errors_response(form)
+
+    user.full_name = form.cleaned_data['full_name']
+    user.bio = form.cleaned_data['bio']
+    user.save(update_fields=['full_name', 'bio'])
+
+    return JsonResponse({'full_name': user.full_name, 'bio': user.bio})
+
+
+@login_required
+@require_POST
+def update_profile_roles(request):
+    """
+    Update the user's roles, only adding and removing those that changed.
+    """
+    user = request.user
+    form = ProfileForm(request.POST, user=user, only=('roles',))
+
+    if not form.is_valid():
+        return form_errors_response(form)
+
+    current = set(user.roles.values_list('id', flat=True))
+    selected = set(role.id for role in form.cleaned_data['roles'])
+
+    if current - selected:
+        user.roles.remove(*(current - selected))
+    if selected - current:
+        user.roles.add(*(selected - current))
+
+    return JsonResponse({'roles': sorted(selected)})
+
+
+@login_required
+@require_POST
+def update_profile_skill(request):
+    """
+    Add or update one of the user's skills, or remove it if no
+    proficiency is given.
+    """
+    form = ProfileSkillForm(request.POST)
+
+    if not form.is_valid():
+        return form_errors_response(form)
+
+    skill = form.cleaned_data['skill']
+    proficiency = form.cleaned_data['proficiency']
+
+    if proficiency:
+        UserSkill.objects.update_or_create(
+            user=request.user, skill=skill,
+            defaults={'proficiency': proficiency})
+    else:
+        UserSkill.objects.filter(user=request.user, skill=skill).delete()
+
+    return JsonResponse({'skill': skill.id, 'proficiency': proficiency})
+
+
+@login_required
+@require_POST
+def update_profile_link(request):
+    """
+    Add or update one of the user's links, or remove an existing link if
+    it is given no anchor or URL.
+    """
+    form = ProfileLinkForm(request.POST, user=request.user)
+
+    if not form.is_valid():
+        return form_errors_response(form)
+
+    link = form.instance or UserLink(user=request.user)
+    anchor = form.cleaned_data['anchor']
+    url = form.cleaned_data['url']
+
+    if not anchor and not url:
+        link.delete()
+        return JsonResponse({'link': None})
+
+    link.anchor = anchor
+    link.url = url
+    link.save()
+
+    return JsonResponse({'link': link.id, 'icon': link.get_icon()})
+
+
+@login_required
+def skill_autocomplete(request):
+    """
+    Return skills whose name starts with the search term as JSON,
+    for the skill autocomplete widget.
+    """
+    term = request.GET.get('term', '')
+
+    skills = [{'id': skill_id, 'label': name, 'value': name}
+              for skill_id, name in skill_index.search(term)]
+
+    return JsonResponse(skills, safe=False)
+
+
 @login_required
 def update_email(request):
     """
@@ -248,6 +409,36 @@ def update_password(request):
     return render(request, 'accounts/update_password.html', context)
 
 
+@login_required
+@permission_required('accounts.access_moderators_section')
+def update_notifications(request):
+    """
+    Update when a moderator is notified about new applications and
+    abuse reports
+    """
+    user = request.user
+
+    if request.method == 'POST':
+        form = NotificationSettingsForm(request.POST, user=user)
+
+        if form.is_valid():
+            user.notification_frequency = \
+                form.cleaned_data['notification_frequency']
+            user.save(update_fields=['notification_frequency'])
+
+            messages.success(request, _(
+                'Your notification settings have been updated.'))
+
+    else:
+        form = NotificationSettingsForm(user=user)
+
+    context = {
+        'form': form,
+    }
+
+    return render(request, 'accounts/update_notifications.html', context)
+
+
 @login_required
 def close_account(request):
     """
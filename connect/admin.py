@@ -0,0 +1,27 @@
+from django.contrib import admin
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from connect.models import QueuedEmail
+
+
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipient', 'status', 'attempts',
+                    'send_after', 'created_datetime')
+    list_filter = ('status',)
+    search_fields = ('recipient', 'subject')
+    readonly_fields = ('subject', 'body', 'html_body', 'from_email',
+                       'recipient', 'status', 'created_datetime',
+                       'send_after', 'attempts', 'last_error')
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry(self, request, queryset):
+        queryset.update(status=QueuedEmail.PENDING, attempts=0,
+                        send_after=timezone.now())
+    retry.short_description = _('Retry sending the selected emails')
+
+
+admin.site.register(QueuedEmail, QueuedEmailAdmin)
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from connect.utils import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = ('Send queued emails. Run it with --loop to keep sending emails '
+            'as they are queued; several workers may run at once.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, dest='batch_size',
+                            default=100,
+                            help='Number of emails to send at a time')
+        parser.add_argument('--loop', action='store_true', dest='loop',
+                            default=False,
+                            help='Keep running, waiting for new emails')
+        parser.add_argument('--interval', type=float, dest='interval',
+                            default=5,
+                            help='Seconds to wait when there is nothing to '
+                                 'send (with --loop)')
+
+    def handle(self, *args, **options):
+        total = 0
+
+        while True:
+            sent = send_queued_emails(batch_size=options['batch_size'])
+            total += sent
+
+            if sent:
+                continue
+
+            if not options['loop']:
+                break
+
+            close_old_connections()
+            time.sleep(options['interval'])
+
+        self.stdout.write('Sent {} email(s).'.format(total))
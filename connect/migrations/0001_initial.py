@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEmail',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', primary_key=True, serialize=False, auto_created=True)),
+                ('subject', models.CharField(verbose_name='subject', max_length=255)),
+                ('body', models.TextField(verbose_name='body')),
+                ('html_body', models.TextField(verbose_name='HTML body', blank=True)),
+                ('from_email', models.EmailField(verbose_name='from', max_length=254)),
+                ('recipient', models.EmailField(verbose_name='recipient', max_length=254)),
+                ('status', models.CharField(verbose_name='status', max_length=10, default='PENDING', choices=[('PENDING', 'Pending'), ('FAILED', 'Failed')])),
+                ('created_datetime', models.DateTimeField(verbose_name='date queued', auto_now_add=True)),
+                ('send_after', models.DateTimeField(verbose_name='send after', default=django.utils.timezone.now)),
+                ('attempts', models.PositiveSmallIntegerField(verbose_name='attempts', default=0)),
+                ('last_error', models.TextField(verbose_name='last error', blank=True)),
+            ],
+            options={
+                'verbose_name': 'queued email',
+                'verbose_name_plural': 'queued emails',
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='queuedemail',
+            index_together=set([('status', 'send_after')]),
+        ),
+    ]
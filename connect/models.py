@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import connections, models
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+
+class QueuedEmailManager(models.Manager):
+
+    def claim(self, batch_size):
+        """
+        Lock and return up to `batch_size` emails that are due to be sent.
+        Must be called in a transaction. On PostgreSQL 9.5 or later, emails
+        locked by another worker are skipped, so that several workers can
+        run at once.
+        """
+        due = self.filter(status=QueuedEmail.PENDING,
+                          send_after__lte=timezone.now()).order_by('id')
+        connection = connections[self.db]
+
+        if connection.vendor != 'postgresql' or \
+           connection.pg_version < 90500:
+            return list(due.select_for_update()[:batch_size])
+
+        # Django 1.8 has no select_for_update(skip_locked=True)
+        sql, params = due.values_list('id')[:batch_size].query \
+                         .sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql + ' FOR UPDATE SKIP LOCKED', params)
+            ids = [row[0] for row in cursor.fetchall()]
+
+        return list(self.filter(id__in=ids).order_by('id'))
+
+
+class QueuedEmail(models.Model):
+    """
+    An email waiting to be sent by the send_queued_emails command.
+    Emails are deleted once they have been sent.
+    """
+    PENDING = 'PENDING'
+    FAILED = 'FAILED'
+
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (FAILED, _('Failed')),
+    )
+
+    subject = models.CharField(_('subject'), max_length=255)
+    body = models.TextField(_('body'))
+    html_body = models.TextField(_('HTML body'), blank=True)
+    from_email = models.EmailField(_('from'), max_length=254)
+    recipient = models.EmailField(_('recipient'), max_length=254)
+    status = models.CharField(_('status'), max_length=10,
+                              choices=STATUS_CHOICES, default=PENDING)
+    created_datetime = models.DateTimeField(_('date queued'),
+                                            auto_now_add=True)
+    send_after = models.DateTimeField(_('send after'), default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(_('attempts'), default=0)
+    last_error = models.TextField(_('last error'), blank=True)
+
+    objects = QueuedEmailManager()
+
+    class Meta:
+        verbose_name = _('queued email')
+        verbose_name_plural = _('queued emails')
+        index_together = [('status', 'send_after')]
+
+    def __str__(self):
+        return '{} ({})'.format(self.subject, self.recipient)
+
+    def as_message(self, connection=None):
+        message = EmailMultiAlternatives(self.subject, self.body,
+                                         self.from_email, [self.recipient],
+                                         connection=connection)
+        if self.html_body:
+            message.attach_alternative(self.html_body, 'text/html')
+
+        return message
+
+    def retry_later(self, error):
+        """
+        Record a failed attempt to send the email, and schedule the next
+        one after a delay that doubles with each attempt, giving up after
+        EMAIL_MAX_ATTEMPTS.
+        """
+        self.attempts += 1
+        self.last_error = str(error)
+
+        if self.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            self.status = self.FAILED
+        else:
+            delay = settings.EMAIL_RETRY_DELAY * 2 ** (self.attempts - 1)
+            self.send_after = timezone.now() + timedelta(seconds=delay)
+
+        self.save(update_fields=['attempts', 'last_error', 'status',
+                                 'send_after'])
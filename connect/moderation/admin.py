@@ -1,5 +1,16 @@
 from django.contrib import admin
 
-from connect.moderation.models import ModerationLogMsg
+from connect.moderation.models import ModerationLogArchive, ModerationLogMsg
+
+
+class ModerationLogArchiveAdmin(admin.ModelAdmin):
+    list_display = ('month', 'log_count', 'created_datetime')
+    fields = ('month', 'log_count', 'created_datetime')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
 
 admin.site.register(ModerationLogMsg)
+admin.site.register(ModerationLogArchive, ModerationLogArchiveAdmin)
@@ -1,15 +1,23 @@
+import csv
+import io
+
 from datetime import date
 from parsley.decorators import parsleyfy
 
 from django import forms
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
 from django.http import Http404
 from django.utils.translation import ugettext_lazy as _
 from django.shortcuts import get_object_or_404
 
 from connect.moderation.models import ModerationLogMsg
+from connect.accounts.forms import EmailAvailabilityInput
 from connect.accounts.models import AbuseReport
-from connect.accounts.forms import validate_email_availability
+from connect.accounts.utils import (
+    get_registered_emails, normalize_email, validate_email_availability
+)
 
 
 User = get_user_model()
@@ -27,6 +35,7 @@ class InviteMemberForm(forms.Form):
         })
 
     email = forms.EmailField(
+        widget=EmailAvailabilityInput,
         error_messages={
             'required': _('Please enter an email address.'),
             'invalid': _('Please enter a valid email address.')
@@ -43,6 +52,110 @@ class InviteMemberForm(forms.Form):
         return cleaned_data
 
 
+class BulkInviteMembersForm(forms.Form):
+    """
+    Form for moderators to invite several new members at once, from a CSV
+    file of names and email addresses (one member per line, with an
+    optional header line).
+
+    Each line is checked, and `cleaned_data['rows']` holds a dict for each
+    of them, with the line number, name, email and error (if any), so that
+    the valid lines can be invited and the others reported.
+    """
+    MAX_ROWS = 500
+
+    csv_file = forms.FileField(
+        label=_('CSV file'),
+        error_messages={
+            'required': _('Please choose a CSV file.'),
+        })
+
+    def clean_csv_file(self):
+        csv_file = self.cleaned_data['csv_file']
+
+        try:
+            text = csv_file.read().decode('utf-8-sig')
+            reader = csv.reader(io.StringIO(text))
+            lines = []
+            number = 1
+
+            # Number rows by the line of the file they start on
+            for values in reader:
+                if any(value.strip() for value in values):
+                    lines.append((number, values))
+                number = reader.line_num + 1
+        except (UnicodeDecodeError, csv.Error):
+            raise forms.ValidationError(
+                _('Sorry, this file could not be read. Please upload a CSV '
+                  'file (saved as UTF-8).'),
+                code='unreadable')
+
+        # Skip a header line
+        if lines and len(lines[0][1]) > 1 and \
+           lines[0][1][1].strip().lower() in ('email', 'email address'):
+            lines = lines[1:]
+
+        if not lines:
+            raise forms.ValidationError(_('This file is empty.'),
+                                        code='empty')
+
+        if len(lines) > self.MAX_ROWS:
+            raise forms.ValidationError(
+                _('Please invite at most %(max)s members at a time.'),
+                code='too_many_rows', params={'max': self.MAX_ROWS})
+
+        self.cleaned_data['rows'] = self.check_rows(lines)
+
+        return csv_file
+
+    def check_rows(self, lines):
+        rows = []
+        seen = set()
+
+        for number, values in lines:
+            line = [value.strip() for value in values] + ['', '']
+            row = {'line': number, 'full_name': line[0], 'email': line[1],
+                   'error': None}
+            rows.append(row)
+
+            if not row['full_name'] or not row['email']:
+                row['error'] = _('Please give a name and an email address.')
+                continue
+
+            if len(row['full_name']) > 100:
+                row['error'] = _('This name is too long.')
+                continue
+
+            try:
+                validate_email(row['email'])
+            except ValidationError:
+                row['error'] = _('This is not a valid email address.')
+                continue
+
+            if len(row['email']) > 254:
+                row['error'] = _('This email address is too long.')
+                continue
+
+            email = normalize_email(row['email'])
+
+            if email in seen:
+                row['error'] = _('This email address is already in the '
+                                 'file.')
+                continue
+
+            seen.add(email)
+
+        registered = get_registered_emails(seen)
+
+        for row in rows:
+            if not row['error'] and \
+               normalize_email(row['email']) in registered:
+                row['error'] = _('Sorry, this email address is already '
+                                 'registered to another user.')
+
+        return rows
+
+
 @parsleyfy
 class ReInviteMemberForm(forms.Form):
     """
@@ -54,6 +167,7 @@ class ReInviteMemberForm(forms.Form):
         super(ReInviteMemberForm, self).__init__(*args, **kwargs)
 
     email = forms.EmailField(
+        widget=EmailAvailabilityInput,
         error_messages={
             'required': _('Please enter an email address.'),
             'invalid': _('Please enter a valid email address.')
@@ -79,7 +193,7 @@ class ReInviteMemberForm(forms.Form):
             raise Http404
 
         # If this email is not already registered to this user
-        if email != user.email:
+        if email and normalize_email(email) != user.email_normalized:
             validate_email_availability(email)
 
         return cleaned_data
@@ -116,6 +230,40 @@ class ModerateApplicationForm(forms.Form):
         })
 
 
+class BulkModerateApplicationsForm(forms.Form):
+    """
+    Form for moderators to approve or reject several account applications
+    at once. Only applications that are still pending can be chosen, and
+    they are locked until the decision has been saved.
+    """
+    users = forms.ModelMultipleChoiceField(
+        queryset=User.objects.none(),
+        error_messages={
+            'required': _('Please choose at least one application.'),
+            'invalid_choice': _('Some of the applications have already '
+                                'been decided, please try again.'),
+        })
+    decision = forms.ChoiceField(choices=User.MODERATOR_CHOICES[1:],
+                                 widget=forms.HiddenInput)
+    comments = forms.CharField(
+        widget=forms.Textarea(attrs={
+            'placeholder': _('Please explain your decision. '
+                             'This information will not be sent to the '
+                             'users, but will be recorded in the '
+                             'moderation logs.'),
+        }), error_messages={
+            'required': _('Please explain your decision.'),
+        })
+
+    def __init__(self, *args, **kwargs):
+        super(BulkModerateApplicationsForm, self).__init__(*args, **kwargs)
+
+        self.fields['users'].queryset = User.objects.filter(
+            registration_method=User.REQUESTED,
+            decision_datetime=None,
+            is_active=False).select_for_update()
+
+
 @parsleyfy
 class ReportAbuseForm(forms.Form):
     """
@@ -202,6 +350,15 @@ class FilterLogsForm(forms.Form):
                                            'disabled': 'True',
                                        }))
 
+    search = forms.CharField(
+        required=False, max_length=100,
+        widget=forms.TextInput(attrs={
+            'placeholder': _('Search comments'),
+        }))
+
+    include_archived = forms.BooleanField(
+        required=False, label=_('Include archived logs'))
+
     def clean(self):
         """
         If 'CUSTOM' is selected, check that both start_date and end_date
@@ -222,3 +379,20 @@ class FilterLogsForm(forms.Form):
                     code='missing_date')
 
         return cleaned_data
+
+
+class StatsPeriodForm(forms.Form):
+    """
+    Form for a moderator to choose how many days of moderation statistics
+    to view.
+    """
+    DAY_CHOICES = (
+        ('7', _('Last 7 days')),
+        ('30', _('Last 30 days')),
+        ('90', _('Last 90 days')),
+        ('365', _('Last year')),
+    )
+
+    days = forms.TypedChoiceField(choices=DAY_CHOICES, coerce=int,
+                                  initial='30', required=False,
+                                  empty_value=30)
@@ -0,0 +1,31 @@
+import datetime
+import pytz
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from connect.moderation.utils import archive_logs
+
+
+class Command(BaseCommand):
+    help = ('Move moderation logs older than the given number of months '
+            'into compressed monthly archives. Whole months are archived, '
+            'one at a time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, dest='months', default=12,
+                            help='Number of months of logs (including the '
+                                 'current month) to keep in the log table')
+
+    def handle(self, *args, **options):
+        if options['months'] < 1:
+            raise CommandError('Please keep at least one month of logs.')
+
+        now = timezone.now().astimezone(pytz.UTC)
+        month = now.year * 12 + now.month - options['months']
+        before = datetime.datetime(month // 12, month % 12 + 1, 1,
+                                   tzinfo=pytz.UTC)
+
+        archived = archive_logs(before)
+
+        self.stdout.write('Archived {} log(s).'.format(archived))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from connect.moderation.utils import rebuild_moderation_stats
+
+
+class Command(BaseCommand):
+    help = ('Recount the moderation statistics from the moderation logs, '
+            'including archived logs.')
+
+    def handle(self, *args, **options):
+        rows = rebuild_moderation_stats()
+
+        self.stdout.write('Rebuilt {} statistic(s).'.format(rows))
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+
+from connect.moderation.utils import send_moderator_digests
+
+
+User = get_user_model()
+
+FREQUENCIES = {
+    'hourly': User.HOURLY,
+    'daily': User.DAILY,
+}
+
+
+class Command(BaseCommand):
+    help = ('Email moderators who receive digests a summary of the new '
+            'applications and abuse reports since their last digest. '
+            'Run it every hour with --frequency hourly, and once a day with '
+            '--frequency daily.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--frequency', dest='frequency',
+                            choices=sorted(FREQUENCIES),
+                            help='Which digests to send')
+
+    def handle(self, *args, **options):
+        if not options['frequency']:
+            raise CommandError('Please specify the digest frequency.')
+
+        sent = send_moderator_digests(FREQUENCIES[options['frequency']],
+                                      site=Site.objects.get_current())
+
+        self.stdout.write('Sent {} digest(s).'.format(sent))
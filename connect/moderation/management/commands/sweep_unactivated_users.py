@@ -0,0 +1,42 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from connect.moderation.utils import sweep_unactivated_users
+
+
+class Command(BaseCommand):
+    help = ('Delete invited or approved users who have not activated their '
+            'account within the given number of days, in batches. The '
+            'removals are recorded in the moderation logs.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, dest='days',
+                            default=settings.UNACTIVATED_USER_EXPIRY_DAYS,
+                            help='Days after their invitation or approval '
+                                 'after which users are removed')
+        parser.add_argument('--batch-size', type=int, dest='batch_size',
+                            default=100,
+                            help='Number of users to delete at a time')
+        parser.add_argument('--dry-run', action='store_true', dest='dry_run',
+                            default=False,
+                            help='Only count the users that would be removed')
+
+    def handle(self, *args, **options):
+        if options['days'] < settings.ACTIVATION_TOKEN_EXPIRY_DAYS:
+            raise CommandError(
+                'Please keep users for at least {} days, until their '
+                'activation links expire.'.format(
+                    settings.ACTIVATION_TOKEN_EXPIRY_DAYS))
+
+        before = timezone.now() - datetime.timedelta(days=options['days'])
+        count = sweep_unactivated_users(before,
+                                        batch_size=options['batch_size'],
+                                        dry_run=options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write('Would remove {} user(s).'.format(count))
+        else:
+            self.stdout.write('Removed {} user(s).'.format(count))
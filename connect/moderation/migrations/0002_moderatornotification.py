@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('moderation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModeratorNotification',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', primary_key=True, serialize=False, auto_created=True)),
+                ('event_type', models.CharField(verbose_name='event type', max_length=20, choices=[('APPLICATION', 'New Account Application'), ('ABUSE_REPORT', 'New Abuse Report')])),
+                ('created_datetime', models.DateTimeField(verbose_name='date and time recorded', db_index=True, default=django.utils.timezone.now)),
+                ('pertains_to', models.ForeignKey(verbose_name='pertains to', help_text='User who applied, or who was reported', related_name='moderator_notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'moderator notification',
+                'verbose_name_plural': 'moderator notifications',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moderation', '0002_moderatornotification'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='moderationlogmsg',
+            index_together=set([('msg_type', 'msg_datetime', 'id'), ('msg_datetime', 'id')]),
+        ),
+    ]
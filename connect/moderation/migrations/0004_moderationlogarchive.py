@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moderation', '0003_moderationlogmsg_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationLogArchive',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', primary_key=True, serialize=False, auto_created=True)),
+                ('month', models.DateField(verbose_name='month', unique=True, help_text='First day of the (UTC) month')),
+                ('log_count', models.PositiveIntegerField(verbose_name='number of logs')),
+                ('data', models.BinaryField(verbose_name='compressed logs')),
+                ('created_datetime', models.DateTimeField(verbose_name='date archived', auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'log archive',
+                'verbose_name_plural': 'log archives',
+                'ordering': ('-month',),
+            },
+        ),
+    ]
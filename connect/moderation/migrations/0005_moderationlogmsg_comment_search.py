@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Must match the expression used by connect.moderation.utils.search_logs
+CREATE_INDEX = (
+    "CREATE INDEX moderation_moderationlogmsg_comment_search "
+    "ON moderation_moderationlogmsg "
+    "USING GIN (to_tsvector('english', comment))"
+)
+
+DROP_INDEX = "DROP INDEX IF EXISTS moderation_moderationlogmsg_comment_search"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moderation', '0004_moderationlogarchive'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
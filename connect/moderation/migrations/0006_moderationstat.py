@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('moderation', '0005_moderationlogmsg_comment_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationStat',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', primary_key=True, serialize=False, auto_created=True)),
+                ('day', models.DateField(verbose_name='day')),
+                ('msg_type', models.CharField(verbose_name='message type', max_length=20, choices=[('INVITATION', 'Invitation'), ('REINVITATION', 'Invitation Resent'), ('APPROVAL', 'Application Approved'), ('REJECTION', 'Application Rejected'), ('DISMISSAL', 'Abuse Report Dismissed'), ('WARNING', 'Official Warning'), ('BANNING', 'Ban User')])),
+                ('count', models.PositiveIntegerField(verbose_name='count', default=0)),
+                ('moderator', models.ForeignKey(verbose_name='moderator', related_name='moderation_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'moderation statistic',
+                'verbose_name_plural': 'moderation statistics',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='moderationstat',
+            unique_together=set([('day', 'msg_type', 'moderator')]),
+        ),
+    ]
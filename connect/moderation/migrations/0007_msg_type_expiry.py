@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moderation', '0006_moderationstat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='moderationlogmsg',
+            name='msg_type',
+            field=models.CharField(verbose_name='message type', max_length=20, choices=[('INVITATION', 'Invitation'), ('REINVITATION', 'Invitation Resent'), ('APPROVAL', 'Application Approved'), ('REJECTION', 'Application Rejected'), ('DISMISSAL', 'Abuse Report Dismissed'), ('WARNING', 'Official Warning'), ('BANNING', 'Ban User'), ('EXPIRY', 'Unactivated Accounts Removed')]),
+        ),
+        migrations.AlterField(
+            model_name='moderationstat',
+            name='msg_type',
+            field=models.CharField(verbose_name='message type', max_length=20, choices=[('INVITATION', 'Invitation'), ('REINVITATION', 'Invitation Resent'), ('APPROVAL', 'Application Approved'), ('REJECTION', 'Application Rejected'), ('DISMISSAL', 'Abuse Report Dismissed'), ('WARNING', 'Official Warning'), ('BANNING', 'Ban User'), ('EXPIRY', 'Unactivated Accounts Removed')]),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moderation', '0007_msg_type_expiry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='moderationlogmsg',
+            name='logged_by',
+            field=models.ForeignKey(verbose_name='logged by', blank=True, null=True, help_text='Moderator who created the log (empty for automatic actions)', related_name='log_messages_by', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
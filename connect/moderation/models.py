@@ -1,5 +1,12 @@
+import gzip
+import io
+import json
+
 from django.conf import settings
-from django.db import models
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import F
+from django.utils.dateparse import parse_datetime
 from django.template.defaultfilters import truncatewords
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
@@ -20,6 +27,7 @@ class ModerationLogMsg(models.Model):
     DISMISSAL = 'DISMISSAL'
     WARNING = 'WARNING'
     BANNING = 'BANNING'
+    EXPIRY = 'EXPIRY'
 
     MSG_TYPE_CHOICES = [
         (INVITATION, _('Invitation')),
@@ -29,6 +37,7 @@ class ModerationLogMsg(models.Model):
         (DISMISSAL, _('Abuse Report Dismissed')),
         (WARNING, _('Official Warning')),
         (BANNING, _('Ban User')),
+        (EXPIRY, _('Unactivated Accounts Removed')),
     ]
 
     msg_datetime = models.DateTimeField(_('date and time recorded'),
@@ -42,12 +51,181 @@ class ModerationLogMsg(models.Model):
                                                 'log is about'))
     logged_by = models.ForeignKey(User, verbose_name=_('logged by'),
                                   related_name='log_messages_by',
-                                  help_text=_('Moderator who created the log'))
+                                  null=True, blank=True,
+                                  help_text=_('Moderator who created the log '
+                                              '(empty for automatic actions)'))
 
     class Meta:
         verbose_name = _('log entry')
         verbose_name_plural = _('log entries')
+        # Support paging through logs newest first, optionally by type
+        index_together = [
+            ('msg_datetime', 'id'),
+            ('msg_type', 'msg_datetime', 'id'),
+        ]
 
     def __str__(self):
         return '{}: {}'.format(self.get_msg_type_display(),
                                truncatewords(self.comment, 20))
+
+
+class ModerationStatManager(models.Manager):
+
+    def increment(self, day, msg_type, moderator_id, count=1):
+        """
+        Add `count` to the number of events of a type logged by a moderator
+        on a day. On PostgreSQL 9.5 or later this is a single upsert, so
+        concurrent increments do not conflict.
+        """
+        connection = connections[self.db]
+
+        if connection.vendor != 'postgresql' or \
+           connection.pg_version < 90500:
+            stats = self.filter(day=day, msg_type=msg_type,
+                                moderator_id=moderator_id)
+
+            if stats.update(count=F('count') + count):
+                return
+
+            try:
+                with transaction.atomic(using=self.db):
+                    self.create(day=day, msg_type=msg_type,
+                                moderator_id=moderator_id, count=count)
+            except IntegrityError:
+                # Created by a concurrent increment in the meantime
+                stats.update(count=F('count') + count)
+            return
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} (day, msg_type, moderator_id, count) '
+                'VALUES (%s, %s, %s, %s) '
+                'ON CONFLICT (day, msg_type, moderator_id) '
+                'DO UPDATE SET count = {table}.count + EXCLUDED.count'.format(
+                    table=table),
+                [day, msg_type, moderator_id, count])
+
+    def decrement(self, day, msg_type, moderator_id, count=1):
+        """
+        Subtract `count` from the number of events of a type logged by a
+        moderator on a day (e.g. when the logs are deleted), removing the
+        statistic when none are left.
+        """
+        stats = self.filter(day=day, msg_type=msg_type,
+                            moderator_id=moderator_id)
+
+        if not stats.filter(count__gt=count).update(
+                count=F('count') - count):
+            stats.delete()
+
+
+class ModerationStat(models.Model):
+    """
+    The number of moderation events of a type logged by a moderator on a
+    (UTC) day, kept up to date by log_moderator_event so that statistics
+    can be shown without counting the logs.
+    """
+    day = models.DateField(_('day'))
+    msg_type = models.CharField(_('message type'), max_length=20,
+                                choices=ModerationLogMsg.MSG_TYPE_CHOICES)
+    moderator = models.ForeignKey(User, verbose_name=_('moderator'),
+                                  related_name='moderation_stats')
+    count = models.PositiveIntegerField(_('count'), default=0)
+
+    objects = ModerationStatManager()
+
+    class Meta:
+        verbose_name = _('moderation statistic')
+        verbose_name_plural = _('moderation statistics')
+        unique_together = [('day', 'msg_type', 'moderator')]
+
+    def __str__(self):
+        return '{}: {} {}'.format(self.day, self.count,
+                                  self.get_msg_type_display())
+
+
+class ModeratorNotification(models.Model):
+    """
+    Record an event that moderators are notified about, i.e. a new account
+    application or abuse report. Moderators who receive digests are sent a
+    summary of these by the send_moderator_digests command.
+    """
+    APPLICATION = 'APPLICATION'
+    ABUSE_REPORT = 'ABUSE_REPORT'
+
+    EVENT_TYPE_CHOICES = [
+        (APPLICATION, _('New Account Application')),
+        (ABUSE_REPORT, _('New Abuse Report')),
+    ]
+
+    event_type = models.CharField(_('event type'), max_length=20,
+                                  choices=EVENT_TYPE_CHOICES)
+    pertains_to = models.ForeignKey(User, verbose_name=_('pertains to'),
+                                    related_name='moderator_notifications',
+                                    help_text=_('User who applied, or who '
+                                                'was reported'))
+    created_datetime = models.DateTimeField(_('date and time recorded'),
+                                            default=timezone.now,
+                                            db_index=True)
+
+    class Meta:
+        verbose_name = _('moderator notification')
+        verbose_name_plural = _('moderator notifications')
+
+    def __str__(self):
+        return self.get_event_type_display()
+
+
+class ModerationLogArchive(models.Model):
+    """
+    A month of moderation logs, moved out of the log table by the
+    archive_moderation_logs command and stored as compressed JSON lines.
+    """
+    month = models.DateField(_('month'), unique=True,
+                             help_text=_('First day of the (UTC) month'))
+    log_count = models.PositiveIntegerField(_('number of logs'))
+    data = models.BinaryField(_('compressed logs'))
+    created_datetime = models.DateTimeField(_('date archived'),
+                                            auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('log archive')
+        verbose_name_plural = _('log archives')
+        ordering = ('-month',)
+
+    def __str__(self):
+        return self.month.strftime('%B %Y')
+
+    def iter_rows(self):
+        """
+        Yield the archived logs as dicts, newest first, decompressing them
+        as they are read.
+        """
+        with gzip.GzipFile(fileobj=io.BytesIO(bytes(self.data))) as f:
+            for line in f:
+                yield json.loads(line.decode('utf-8'))
+
+    def iter_logs(self):
+        """
+        Yield the archived logs, newest first, as (unsaved) log messages
+        whose pertains_to and logged_by users only have their id and name
+        (logged_by is None for automatic actions).
+        """
+        User = get_user_model()
+
+        for row in self.iter_rows():
+            log = ModerationLogMsg(id=row['id'],
+                                   msg_datetime=parse_datetime(
+                                       row['msg_datetime']),
+                                   msg_type=row['msg_type'],
+                                   comment=row['comment'],
+                                   pertains_to_id=row['pertains_to_id'],
+                                   logged_by_id=row['logged_by_id'])
+            log.pertains_to = User(id=row['pertains_to_id'],
+                                   full_name=row['pertains_to'])
+            if row['logged_by_id'] is not None:
+                log.logged_by = User(id=row['logged_by_id'],
+                                     full_name=row['logged_by'])
+            yield log
@@ -1,10 +1,12 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.http import Http404
 from django.test import TestCase
 
 from connect.accounts.factories import (InvitedPendingFactory, ModeratorFactory,
                                 RequestedPendingFactory, UserFactory)
-from connect.moderation.forms import (FilterLogsForm, InviteMemberForm,
-                              ReInviteMemberForm, RevokeInvitationForm)
+from connect.moderation.forms import (BulkInviteMembersForm, FilterLogsForm,
+                              InviteMemberForm, ReInviteMemberForm,
+                              RevokeInvitationForm)
 
 
 class TestInviteMemberForm(TestCase):
@@ -28,6 +30,55 @@ class TestInviteMemberForm(TestCase):
         self.assertFalse(form.is_valid())
 
 
+
+class TestBulkInviteMembersForm(TestCase):
+    def setUp(self):
+        self.existing_user = UserFactory(email='existing.email@test.test')
+
+    def form_data(self, content):
+        return BulkInviteMembersForm(files={
+            'csv_file': SimpleUploadedFile('members.csv',
+                                           content.encode('utf-8')),
+        })
+
+    def test_rows_are_checked(self):
+        form = self.form_data(
+            'Name,Email\n'
+            'First Fast,first@test.test\n'
+            'Second,Existing.Email@test.test\n'
+            'Third,not-an-email\n'
+            '\n'
+            'Fourth\n'
+            'First Again,FIRST@test.test\n'
+            '"Multi\nLine",multi@test.test\n'
+            'Long,{}@test.test\n'.format('a' * 250))
+
+        self.assertTrue(form.is_valid())
+        self.assertEqual(
+            [(row['line'], row['email'][:20], bool(row['error']))
+             for row in form.cleaned_data['rows']],
+            [(2, 'first@test.test', False),
+             (3, 'Existing.Email@test.', True),
+             (4, 'not-an-email', True),
+             (6, '', True),
+             (7, 'FIRST@test.test', True),
+             (8, 'multi@test.test', False),
+             (10, 'a' * 20, True)])
+        self.assertEqual(form.cleaned_data['rows'][-1]['error'],
+                         'This email address is too long.')
+
+    def test_empty_file(self):
+        form = self.form_data('name,email\n')
+
+        self.assertFalse(form.is_valid())
+
+    def test_too_many_rows(self):
+        form = self.form_data('Name,a{}@test.test\n' * (
+            BulkInviteMembersForm.MAX_ROWS + 1))
+
+        self.assertFalse(form.is_valid())
+
+
 class TestReInviteMemberForm(TestCase):
     def setUp(self):
         self.moderator = ModeratorFactory()
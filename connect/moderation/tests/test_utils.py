@@ -1,13 +1,30 @@
 import datetime
 import pytz
 
+from django.contrib.sites.models import Site
+from django.core import mail
 from django.test import TestCase
 from django.utils import timezone
 
-from connect.accounts.factories import UserFactory, ModeratorFactory
+from connect.accounts.factories import (
+    InvitedPendingFactory, ModeratorFactory, RequestedPendingFactory,
+    UserFactory
+)
+from connect.accounts.models import CustomUser
+from connect.config.factories import SiteConfigFactory
 
-from connect.moderation.models import ModerationLogMsg
-from connect.moderation.utils import log_moderator_event, get_date_limits
+from connect.moderation.factories import LogFactory
+from connect.moderation.models import (
+    ModerationLogArchive, ModerationLogMsg, ModerationStat,
+    ModeratorNotification
+)
+from connect.moderation.utils import (
+    archive_logs, decode_log_cursor, get_archived_logs, get_digest_counts,
+    get_logs_page, get_moderation_stats, iter_logs, log_moderator_event,
+    get_date_limits, notify_moderators, rebuild_moderation_stats,
+    send_moderator_digests, sweep_unactivated_users
+)
+from connect.utils import send_queued_emails
 
 
 class LogMessageTest(TestCase):
@@ -64,3 +81,390 @@ class LogMessageTest(TestCase):
 
         self.assertEqual(start, expected_start)
         self.assertEqual(end, expected_end)
+
+
+class ModeratorNotificationTest(TestCase):
+    fixtures = ['group_perms']
+
+    def setUp(self):
+        self.site = Site.objects.get_current()
+        self.site.config = SiteConfigFactory(site=self.site)
+
+        self.immediate_moderator = ModeratorFactory()
+        self.hourly_moderator = ModeratorFactory(
+            full_name='Hourly Moderator',
+            notification_frequency=CustomUser.HOURLY)
+        self.daily_moderator = ModeratorFactory(
+            notification_frequency=CustomUser.DAILY)
+
+    def notify(self, event_type, pertains_to):
+        notify_moderators(
+            event_type=event_type,
+            pertains_to=pertains_to,
+            subject='New event',
+            template='moderation/emails/notify_moderators_of_abuse_report.html',
+            site=self.site,
+            url='http://testserver/')
+
+    def test_only_immediate_moderators_are_emailed(self):
+        self.notify(ModeratorNotification.ABUSE_REPORT, UserFactory())
+        send_queued_emails()
+
+        self.assertEqual(ModeratorNotification.objects.count(), 1)
+        self.assertEqual([email.to[0] for email in mail.outbox],
+                         [self.immediate_moderator.email])
+
+    def test_digest_counts(self):
+        applicant = UserFactory()
+        self.notify(ModeratorNotification.APPLICATION, applicant)
+        self.notify(ModeratorNotification.ABUSE_REPORT, UserFactory())
+        self.notify(ModeratorNotification.ABUSE_REPORT, UserFactory())
+        # Not counted for the moderator it pertains to
+        self.notify(ModeratorNotification.ABUSE_REPORT,
+                    self.hourly_moderator)
+
+        with self.assertNumQueries(1):
+            counts = get_digest_counts(
+                CustomUser.HOURLY,
+                since=timezone.now() - datetime.timedelta(hours=1),
+                until=timezone.now())
+
+        self.assertEqual(counts, {
+            self.hourly_moderator.id: {
+                ModeratorNotification.APPLICATION: 1,
+                ModeratorNotification.ABUSE_REPORT: 2,
+            },
+        })
+
+    def test_can_send_digests(self):
+        self.notify(ModeratorNotification.APPLICATION, UserFactory())
+        self.notify(ModeratorNotification.ABUSE_REPORT, UserFactory())
+        send_queued_emails()
+        mail.outbox = []
+
+        sent = send_moderator_digests(CustomUser.HOURLY, self.site)
+        send_queued_emails()
+
+        self.assertEqual(sent, 1)
+        self.assertEqual(len(mail.outbox), 1)
+        email = mail.outbox[0]
+        self.assertEqual(email.to, [self.hourly_moderator.email])
+        self.assertIn('Hi Hourly Moderator,', email.body)
+        self.assertIn('1 new account application has been registered',
+                      email.body)
+        self.assertIn('1 new abuse report has been registered', email.body)
+        self.assertIn('http://{}/moderation/review-abuse-reports/'.format(
+            self.site.domain), email.body)
+
+        hourly_moderator = CustomUser.objects.get(
+            id=self.hourly_moderator.id)
+        self.assertIsNotNone(hourly_moderator.last_digest_datetime)
+
+        # Nothing new since the last digest
+        self.assertEqual(
+            send_moderator_digests(CustomUser.HOURLY, self.site), 0)
+
+    def test_old_notifications_are_deleted(self):
+        ModeratorNotification.objects.create(
+            event_type=ModeratorNotification.APPLICATION,
+            pertains_to=UserFactory(),
+            created_datetime=timezone.now() - datetime.timedelta(days=3))
+
+        self.assertEqual(
+            send_moderator_digests(CustomUser.DAILY, self.site), 0)
+        self.assertFalse(ModeratorNotification.objects.exists())
+
+
+class LogsPageTest(TestCase):
+
+    def test_pages_follow_date_and_id(self):
+        now = timezone.now()
+        user = UserFactory()
+        older = LogFactory(pertains_to=user, logged_by=user,
+                           msg_datetime=now - datetime.timedelta(days=1))
+        # Logged at the same moment, so ordered by id
+        first, second, third = LogFactory.create_batch(
+            3, pertains_to=user, logged_by=user, msg_datetime=now)
+        logs = ModerationLogMsg.objects.all()
+
+        page, cursor = get_logs_page(logs, per_page=2)
+        self.assertEqual(page, [third, second])
+
+        page, cursor = get_logs_page(logs, cursor, per_page=2)
+        self.assertEqual(page, [first, older])
+        self.assertIsNone(cursor)
+
+    def test_invalid_cursor_is_ignored(self):
+        log = LogFactory()
+
+        self.assertIsNone(decode_log_cursor('not-a-cursor'))
+        self.assertIsNone(decode_log_cursor('1000000000000000000_1'))
+        self.assertIsNone(decode_log_cursor('-1000000000000000000_1'))
+        self.assertEqual(
+            get_logs_page(ModerationLogMsg.objects.all(), 'x_y'),
+            ([log], None))
+
+
+class LogArchiveTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.moderator = ModeratorFactory()
+
+    def log(self, year, month, day, **kwargs):
+        return LogFactory(pertains_to=self.user, logged_by=self.moderator,
+                          msg_datetime=datetime.datetime(
+                              year, month, day, 12, tzinfo=pytz.UTC),
+                          **kwargs)
+
+    def test_old_months_are_archived(self):
+        january = self.log(2015, 1, 10, comment='January')
+        self.log(2015, 1, 20)
+        february = self.log(2015, 2, 5)
+        march = self.log(2015, 3, 1)
+
+        archived = archive_logs(
+            before=datetime.datetime(2015, 3, 15, tzinfo=pytz.UTC))
+
+        self.assertEqual(archived, 3)
+        self.assertEqual(list(ModerationLogMsg.objects.all()), [march])
+        self.assertEqual(
+            [(a.month, a.log_count)
+             for a in ModerationLogArchive.objects.all()],
+            [(datetime.date(2015, 2, 1), 1), (datetime.date(2015, 1, 1), 2)])
+
+        archived_log = list(get_archived_logs())[-1]
+        self.assertEqual(archived_log.id, january.id)
+        self.assertEqual(archived_log.msg_datetime, january.msg_datetime)
+        self.assertEqual(archived_log.comment, 'January')
+        self.assertEqual(archived_log.pertains_to.get_full_name(),
+                         self.user.get_full_name())
+
+        # Only the months in the period are read
+        logs = get_archived_logs(
+            start=datetime.datetime(2015, 2, 1, tzinfo=pytz.UTC))
+        self.assertEqual([log.id for log in logs], [february.id])
+
+    def test_later_logs_are_added_to_an_archive(self):
+        self.log(2015, 1, 10)
+        archive_logs(before=datetime.datetime(2015, 2, 1, tzinfo=pytz.UTC))
+
+        # e.g. restored from a backup
+        self.log(2015, 1, 20)
+        archive_logs(before=datetime.datetime(2015, 2, 1, tzinfo=pytz.UTC))
+
+        archive = ModerationLogArchive.objects.get()
+        self.assertEqual(archive.log_count, 2)
+        self.assertEqual(len(list(archive.iter_logs())), 2)
+
+    def test_archived_logs_can_be_filtered(self):
+        self.log(2015, 1, 10, msg_type=ModerationLogMsg.INVITATION)
+        warning = self.log(2015, 1, 11, msg_type=ModerationLogMsg.WARNING)
+        LogFactory(pertains_to=self.moderator, logged_by=self.moderator,
+                   msg_type=ModerationLogMsg.WARNING,
+                   msg_datetime=datetime.datetime(2015, 1, 12,
+                                                  tzinfo=pytz.UTC))
+        archive_logs(before=datetime.datetime(2015, 2, 1, tzinfo=pytz.UTC))
+
+        logs = get_archived_logs(msg_type=ModerationLogMsg.WARNING,
+                                 exclude_user=self.moderator)
+
+        self.assertEqual([log.id for log in logs], [warning.id])
+
+    def test_archived_logs_can_be_searched(self):
+        self.log(2015, 1, 10, comment='Posted spam')
+        rude = self.log(2015, 1, 11, comment='Was Rude to a member')
+        archive_logs(before=datetime.datetime(2015, 2, 1, tzinfo=pytz.UTC))
+
+        logs = get_archived_logs(search='rude member')
+
+        self.assertEqual([log.id for log in logs], [rude.id])
+
+    def test_archived_logs_are_paged_with_current_logs(self):
+        old = self.log(2015, 1, 10)
+        older = self.log(2015, 1, 5)
+        archive_logs(before=datetime.datetime(2015, 2, 1, tzinfo=pytz.UTC))
+        new = self.log(2015, 2, 10)
+
+        logs = ModerationLogMsg.objects.all()
+        archived_logs = get_archived_logs()
+
+        page, cursor = get_logs_page(logs, per_page=2,
+                                     archived_logs=archived_logs)
+        self.assertEqual([log.id for log in page], [new.id, old.id])
+
+        page, cursor = get_logs_page(logs, cursor, per_page=2,
+                                     archived_logs=archived_logs)
+        self.assertEqual([log.id for log in page], [older.id])
+        self.assertIsNone(cursor)
+
+    def test_archived_logs_are_merged_month_by_month(self):
+        january = self.log(2015, 1, 10)
+        february = self.log(2015, 2, 10)
+        march = self.log(2015, 3, 10)
+        archive_logs(before=datetime.datetime(2015, 4, 1, tzinfo=pytz.UTC))
+        later = [self.log(2015, 2, 20), self.log(2015, 4, 10)]
+
+        logs = ModerationLogMsg.objects.all()
+        archived_logs = get_archived_logs()
+
+        self.assertEqual(
+            [log.id for log in iter_logs(logs, batch_size=1,
+                                         archived_logs=archived_logs)],
+            [later[1].id, march.id, later[0].id, february.id, january.id])
+
+        # A page starting in February does not read the March archive
+        page, cursor = get_logs_page(logs, per_page=3,
+                                     archived_logs=archived_logs)
+        self.assertEqual([log.id for log in page],
+                         [later[1].id, march.id, later[0].id])
+        with self.assertNumQueries(3):
+            self.assertEqual(
+                [log.id for log in archived_logs.iter_logs(
+                    decode_log_cursor(cursor))],
+                [february.id, january.id])
+
+
+class ModerationStatTest(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.moderator = ModeratorFactory()
+        self.today = timezone.now().astimezone(pytz.UTC).date()
+
+    def test_logging_events_counts_them(self):
+        log_moderator_event(ModerationLogMsg.INVITATION, self.user,
+                            self.moderator)
+        log_moderator_event(ModerationLogMsg.INVITATION, self.user,
+                            self.moderator)
+        log_moderator_event(ModerationLogMsg.WARNING, self.user,
+                            self.moderator)
+
+        self.assertEqual(
+            sorted(ModerationStat.objects.values_list(
+                'day', 'msg_type', 'moderator', 'count')),
+            [(self.today, ModerationLogMsg.INVITATION, self.moderator.id, 2),
+             (self.today, ModerationLogMsg.WARNING, self.moderator.id, 1)])
+
+    def test_can_rebuild_stats(self):
+        LogFactory.create_batch(2, pertains_to=self.user,
+                                logged_by=self.moderator,
+                                msg_type=ModerationLogMsg.BANNING,
+                                msg_datetime=datetime.datetime(
+                                    2015, 1, 10, tzinfo=pytz.UTC))
+        archive_logs(before=datetime.datetime(2015, 2, 1, tzinfo=pytz.UTC))
+        LogFactory(pertains_to=self.user, logged_by=self.moderator)
+        ModerationStat.objects.create(day=self.today,
+                                      msg_type=ModerationLogMsg.WARNING,
+                                      moderator=self.moderator, count=5)
+
+        self.assertEqual(rebuild_moderation_stats(), 2)
+        self.assertEqual(
+            sorted(ModerationStat.objects.values_list(
+                'day', 'msg_type', 'count')),
+            [(datetime.date(2015, 1, 10), ModerationLogMsg.BANNING, 2),
+             (LogFactory.msg_datetime.astimezone(pytz.UTC).date(),
+              ModerationLogMsg.INVITATION, 1)])
+
+    def test_stats_per_day_and_moderator(self):
+        other_moderator = ModeratorFactory()
+        yesterday = self.today - datetime.timedelta(days=1)
+        ModerationStat.objects.create(day=self.today,
+                                      msg_type=ModerationLogMsg.APPROVAL,
+                                      moderator=self.moderator, count=2)
+        ModerationStat.objects.create(day=self.today,
+                                      msg_type=ModerationLogMsg.APPROVAL,
+                                      moderator=other_moderator, count=1)
+        ModerationStat.objects.create(day=self.today - datetime.timedelta(
+                                          days=5),
+                                      msg_type=ModerationLogMsg.APPROVAL,
+                                      moderator=self.moderator, count=7)
+
+        days, moderators = get_moderation_stats(yesterday, self.today)
+
+        self.assertEqual(days, [(self.today, [0, 0, 3, 0, 0, 0, 0]),
+                                (yesterday, [0, 0, 0, 0, 0, 0, 0])])
+        self.assertEqual(
+            sorted((moderator.id, counts) for moderator, counts in moderators),
+            [(self.moderator.id, [0, 0, 2, 0, 0, 0, 0]),
+             (other_moderator.id, [0, 0, 1, 0, 0, 0, 0])])
+
+
+class SweepUnactivatedUsersTest(TestCase):
+
+    def setUp(self):
+        self.moderator = ModeratorFactory()
+        self.now = timezone.now()
+        self.long_ago = self.now - datetime.timedelta(days=100)
+        self.before = self.now - datetime.timedelta(days=90)
+
+    def test_removes_stale_unactivated_users(self):
+        invited = InvitedPendingFactory.create_batch(
+            3, moderator=self.moderator, decision_datetime=self.long_ago)
+        approved = RequestedPendingFactory(
+            moderator=self.moderator, moderator_decision=CustomUser.APPROVED,
+            decision_datetime=self.long_ago)
+
+        removed = sweep_unactivated_users(self.before, batch_size=2)
+
+        self.assertEqual(removed, 4)
+        self.assertFalse(CustomUser.objects.filter(
+            id__in=[user.id for user in invited + [approved]]).exists())
+
+        logs = ModerationLogMsg.objects.filter(
+            msg_type=ModerationLogMsg.EXPIRY, pertains_to=self.moderator,
+            logged_by=None)
+        self.assertEqual(logs.count(), 2)
+        self.assertNotIn(approved.email, ' '.join(
+            logs.values_list('comment', flat=True)))
+
+    def test_removed_users_logs_are_no_longer_counted(self):
+        users = InvitedPendingFactory.create_batch(
+            2, moderator=self.moderator, decision_datetime=self.long_ago)
+        for user in users:
+            log_moderator_event(ModerationLogMsg.INVITATION, user,
+                                self.moderator)
+        log_moderator_event(ModerationLogMsg.INVITATION, UserFactory(),
+                            self.moderator)
+
+        sweep_unactivated_users(self.before)
+
+        self.assertEqual(
+            list(ModerationStat.objects.values_list('msg_type', 'count')),
+            [(ModerationLogMsg.INVITATION, 1)])
+        rebuild_moderation_stats()
+        self.assertEqual(
+            list(ModerationStat.objects.values_list('msg_type', 'count')),
+            [(ModerationLogMsg.INVITATION, 1)])
+
+    def test_keeps_recent_activated_and_closed_users(self):
+        recent = InvitedPendingFactory(moderator=self.moderator,
+                                       decision_datetime=self.now)
+        activated = InvitedPendingFactory(moderator=self.moderator,
+                                          decision_datetime=self.long_ago,
+                                          is_active=True,
+                                          auth_token_is_used=True,
+                                          activated_datetime=self.long_ago)
+        closed = InvitedPendingFactory(moderator=self.moderator,
+                                       decision_datetime=self.long_ago,
+                                       activated_datetime=self.long_ago)
+        requested = RequestedPendingFactory()
+
+        self.assertEqual(sweep_unactivated_users(self.before), 0)
+        self.assertEqual(
+            CustomUser.objects.filter(id__in=[
+                recent.id, activated.id, closed.id, requested.id]).count(),
+            4)
+        self.assertFalse(ModerationLogMsg.objects.filter(
+            msg_type=ModerationLogMsg.EXPIRY).exists())
+
+    def test_dry_run_only_counts_users(self):
+        InvitedPendingFactory.create_batch(2, moderator=self.moderator,
+                                           decision_datetime=self.long_ago)
+
+        self.assertEqual(
+            sweep_unactivated_users(self.before, dry_run=True), 2)
+        self.assertEqual(CustomUser.objects.unactivated(self.before).count(),
+                         2)
+        self.assertFalse(ModerationLogMsg.objects.filter(
+            msg_type=ModerationLogMsg.EXPIRY).exists())
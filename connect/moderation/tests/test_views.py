@@ -1,11 +1,14 @@
 import datetime
 import factory
+import json
 import pytz
+import re
 
 from django.contrib.auth import get_user_model
 from django.contrib.sites.shortcuts import get_current_site
 from django.core import mail
 from django.core.exceptions import PermissionDenied
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.urlresolvers import resolve, reverse
 from django.http import Http404
 from django.utils import timezone
@@ -13,14 +16,18 @@ from django.utils import timezone
 from connect.accounts.factories import (AbuseReportFactory, AbuseWarningFactory,
                                 InvitedPendingFactory, ModeratorFactory,
                                 RequestedPendingFactory, UserFactory)
-from connect.accounts.models import AbuseReport, CustomUser
+from connect.accounts.models import AbuseReport, ActivationToken, CustomUser
 from connect.config.factories import SiteFactory, SiteConfigFactory
 from connect.tests import BoostedTestCase as TestCase
 from connect.moderation.factories import LogFactory
 from connect.moderation.forms import FilterLogsForm
 from connect.moderation.models import ModerationLogMsg
-from connect.moderation.views import (moderation_home, report_abuse,
-                              review_abuse, review_applications, view_logs)
+from connect.moderation.utils import archive_logs, log_moderator_event
+from connect.moderation.views import (ABUSE_QUEUE_PAGE_SIZE,
+                                      export_logs, moderation_home,
+                              report_abuse, review_abuse,
+                              review_applications, view_logs, view_stats)
+from connect.utils import send_queued_emails
 
 
 User = get_user_model()
@@ -158,13 +165,12 @@ class InviteUserTest(TestCase):
         expected_content = 'created for you at {}'.format(
             self.site.name
         )
-        expected_url = 'http://testserver/accounts/activate/{}"'.format(
-            invited_user.auth_token
-        )
+        expected_url = 'http://testserver/accounts/activate/'
         expected_footer = 'My Moderator registered a new {} account'.format(
             self.site.name
         )
 
+        send_queued_emails()
         email = mail.outbox[0]
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(email.subject, expected_subject)
@@ -174,6 +180,11 @@ class InviteUserTest(TestCase):
         self.assertIn(expected_url, email.alternatives[0][0])
         self.assertIn(expected_footer, email.body)
 
+        token = re.search(r'/accounts/activate/(\w+)"',
+                          email.alternatives[0][0]).group(1)
+        self.assertEqual(ActivationToken.objects.get_by_token(token).user,
+                         invited_user)
+
     def test_confirmation_message(self):
         response = self.post_data()
         messages = list(response.context['messages'])
@@ -182,6 +193,71 @@ class InviteUserTest(TestCase):
         self.assertIn('has been invited to', str(messages[0]))
 
 
+
+class BulkInviteUsersTest(TestCase):
+    fixtures = ['group_perms']
+
+    def setUp(self):
+        self.site = get_current_site(self.client.request)
+        self.site.config = SiteConfigFactory(site=self.site)
+
+        self.moderator = ModeratorFactory(full_name='My Moderator')
+        self.existing_user = UserFactory(email='existing@test.test')
+
+        self.client.login(username=self.moderator.email, password='pass')
+
+    def post_file(self, content):
+        return self.client.post(
+            reverse('moderation:bulk-invite-users'),
+            data={'csv_file': SimpleUploadedFile('members.csv',
+                                                 content.encode('utf-8'))})
+
+    def test_can_invite_users_from_csv(self):
+        response = self.post_file('Ada Lovelace,ada@test.test\n'
+                                  'Existing,existing@test.test\n'
+                                  'Alan Turing,alan@test.test\n')
+
+        self.assertTemplateUsed(response,
+                                'moderation/bulk_invite_results.html')
+        self.assertEqual(response.context['invited_count'], 2)
+        self.assertEqual(response.context['error_count'], 1)
+
+        for email, full_name in (('ada@test.test', 'Ada Lovelace'),
+                                 ('alan@test.test', 'Alan Turing')):
+            user = User.objects.get(email=email)
+            self.assertEqual(user.full_name, full_name)
+            self.assertFalse(user.is_active)
+            self.assertFalse(user.has_usable_password())
+            self.assertEqual(user.registration_method, CustomUser.INVITED)
+            self.assertEqual(user.moderator, self.moderator)
+            self.assertTrue(user.activation_tokens.exists())
+            self.assertEqual(
+                ModerationLogMsg.objects.get(pertains_to=user).msg_type,
+                ModerationLogMsg.INVITATION)
+
+    def test_invited_users_are_emailed_their_own_links(self):
+        self.post_file('Ada Lovelace,ada@test.test\n'
+                       'Alan Turing,alan@test.test\n')
+        send_queued_emails()
+
+        self.assertEqual(len(mail.outbox), 2)
+
+        for email in mail.outbox:
+            user = User.objects.get(email=email.to[0])
+            token = re.search(r'/accounts/activate/(\w+)"',
+                              email.alternatives[0][0]).group(1)
+
+            self.assertEqual(email.subject,
+                             'Welcome to {}'.format(self.site.name))
+            self.assertEqual(
+                ActivationToken.objects.get_by_token(token).user, user)
+
+    def test_invalid_file_returns_to_moderation_home(self):
+        response = self.post_file('')
+
+        self.assertTemplateUsed(response, 'moderation/invite_member.html')
+        self.assertTrue(response.context['bulk_invitation_form'].errors)
+
 class ReInviteUserTest(TestCase):
     fixtures = ['group_perms']
 
@@ -227,9 +303,12 @@ class ReInviteUserTest(TestCase):
 
     def test_reinvitation_reset_auth_token(self):
         response = self.post_data()
-        reinvited_user = User.objects.get(id=self.invited_user.id)
 
-        self.assertNotEqual(reinvited_user.auth_token, 'myauthtoken')
+        with self.assertRaises(ActivationToken.DoesNotExist):
+            ActivationToken.objects.get_by_token('myauthtoken')
+
+        token = ActivationToken.objects.get(user=self.invited_user)
+        self.assertEqual(token.purpose, ActivationToken.REINVITATION)
 
     def test_reinvitation_resets_email(self):
         """
@@ -262,6 +341,7 @@ class ReInviteUserTest(TestCase):
             self.site.name
         )
 
+        send_queued_emails()
         email = mail.outbox[0]
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(email.subject, expected_subject)
@@ -447,7 +527,7 @@ class ReviewApplicationTest(TestCase):
     def test_can_approve_application(self):
         self.assertFalse(self.applied_user.moderator)
         self.assertFalse(self.applied_user.moderator_decision)
-        self.assertFalse(self.applied_user.auth_token)
+        self.assertFalse(self.applied_user.activation_tokens.exists())
 
         self.client.login(username=self.moderator.email, password='pass')
         response = self.approve_application()
@@ -455,7 +535,7 @@ class ReviewApplicationTest(TestCase):
 
         self.assertEqual(user.moderator, self.moderator)
         self.assertEqual(user.moderator_decision, CustomUser.APPROVED)
-        self.assertTrue(user.auth_token)
+        self.assertTrue(user.activation_tokens.exists())
 
     def test_can_log_approval(self):
         self.client.login(username=self.moderator.email, password='pass')
@@ -476,10 +556,9 @@ class ReviewApplicationTest(TestCase):
         expected_content = 'created for you at {}'.format(
             self.site.name
         )
-        expected_url = 'http://testserver/accounts/activate/{}'.format(
-            self.applied_user.auth_token
-        )
+        expected_url = 'http://testserver/accounts/activate/'
         expected_footer = 'My Moderator has approved your application'
+        send_queued_emails()
         email = mail.outbox[0]
 
         self.assertEqual(len(mail.outbox), 1)
@@ -489,6 +568,11 @@ class ReviewApplicationTest(TestCase):
         self.assertIn(expected_url, email.alternatives[0][0])
         self.assertIn(expected_footer, email.body)
 
+        token = re.search(r'/accounts/activate/(\w+)"',
+                          email.alternatives[0][0]).group(1)
+        self.assertEqual(ActivationToken.objects.get_by_token(token).user,
+                         self.applied_user)
+
     def test_can_reject_application(self):
         self.assertFalse(self.applied_user.moderator)
         self.assertFalse(self.applied_user.moderator_decision)
@@ -518,6 +602,7 @@ class ReviewApplicationTest(TestCase):
         expected_intro = 'Hi {},'.format('Hello')
         expected_email = self.site.config.email
         expected_footer = 'you applied for a {} account'.format(self.site.name)
+        send_queued_emails()
         email = mail.outbox[0]
 
         self.assertEqual(len(mail.outbox), 1)
@@ -527,6 +612,101 @@ class ReviewApplicationTest(TestCase):
         self.assertIn(expected_footer, email.body)
 
 
+
+class BulkReviewApplicationsTest(TestCase):
+    fixtures = ['group_perms']
+
+    def setUp(self):
+        self.site = get_current_site(self.client.request)
+        self.site.config = SiteConfigFactory(site=self.site)
+
+        self.standard_user = UserFactory()
+        self.applied_users = RequestedPendingFactory.create_batch(3)
+        self.moderator = ModeratorFactory(full_name='My Moderator')
+
+    def post_data(self, decision, comments, users=None):
+        if users is None:
+            users = self.applied_users
+
+        return self.client.post(
+            reverse('moderation:bulk-review-applications'),
+            data={
+                'bulk-users': [user.id for user in users],
+                'bulk-decision': decision,
+                'bulk-comments': comments,
+            },
+        )
+
+    def test_standard_users_cannot_decide_applications(self):
+        self.client.login(username=self.standard_user.email, password='pass')
+        response = self.post_data(CustomUser.APPROVED, 'Approved')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(User.objects.filter(
+            moderator_decision=CustomUser.APPROVED).exists())
+
+    def test_can_approve_applications(self):
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.post_data(CustomUser.APPROVED, 'Approved')
+
+        self.assertRedirects(response,
+                             reverse('moderation:review-applications'))
+
+        users = User.objects.filter(
+            id__in=[user.id for user in self.applied_users])
+        for user in users:
+            self.assertEqual(user.moderator, self.moderator)
+            self.assertEqual(user.moderator_decision, CustomUser.APPROVED)
+
+        logs = ModerationLogMsg.objects.filter(comment='Approved')
+        self.assertEqual(sorted(log.pertains_to_id for log in logs),
+                         sorted(user.id for user in self.applied_users))
+        self.assertTrue(all(log.msg_type == ModerationLogMsg.APPROVAL
+                            for log in logs))
+
+    def test_approved_users_are_sent_their_own_activation_links(self):
+        self.client.login(username=self.moderator.email, password='pass')
+        self.post_data(CustomUser.APPROVED, 'Approved')
+        send_queued_emails()
+
+        self.assertEqual(len(mail.outbox), 3)
+
+        for email in mail.outbox:
+            user = User.objects.get(email=email.to[0])
+            token = re.search(r'/accounts/activate/(\w+)"',
+                              email.alternatives[0][0]).group(1)
+
+            self.assertIn('Hi {}'.format(user.full_name), email.body)
+            self.assertIn('My Moderator has approved your application',
+                          email.body)
+            self.assertEqual(
+                ActivationToken.objects.get_by_token(token).user, user)
+
+    def test_can_reject_applications(self):
+        self.client.login(username=self.moderator.email, password='pass')
+        self.post_data(CustomUser.REJECTED, 'Spam', self.applied_users[:2])
+        send_queued_emails()
+
+        self.assertEqual(
+            User.objects.filter(moderator_decision=CustomUser.REJECTED)
+                        .count(), 2)
+        self.assertEqual(
+            ModerationLogMsg.objects.filter(
+                msg_type=ModerationLogMsg.REJECTION).count(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_decided_applications_cannot_be_chosen(self):
+        self.applied_users[0].decision_datetime = timezone.now()
+        self.applied_users[0].save()
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.post_data(CustomUser.APPROVED, 'Approved')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['bulk_form'].errors)
+        self.assertFalse(ModerationLogMsg.objects.exists())
+
+
 class ReportAbuseTest(TestCase):
     fixtures = ['group_perms']
 
@@ -614,6 +794,7 @@ class ReportAbuseTest(TestCase):
         expected_url = ('href="http://testserver/moderation/review-'
                        'abuse-reports/"')
         expected_footer = 'you are a moderator at {}'.format(self.site.name)
+        send_queued_emails()
         email = mail.outbox[0]
         recipients = [message.to[0] for message in mail.outbox]
 
@@ -632,6 +813,7 @@ class ReportAbuseTest(TestCase):
         response = self.post_data(self.moderator.id, 'This moderator is nasty')
         recipients = []
 
+        send_queued_emails()
         for email in mail.outbox:
             recipients.append(email.to[0])
 
@@ -711,24 +893,72 @@ class ReviewAbuseTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'moderation/review_abuse.html')
 
+    def get_context_reports(self, response):
+        return [report for user in response.context['reported_users']
+                for report in user.undecided_reports]
+
     def test_only_undecided_abuse_reports_in_response(self):
         self.client.login(username=self.moderator.email, password='pass')
         response = self.client.get(reverse('moderation:review-abuse'))
-        context_reports = response.context['reports']
+        context_reports = self.get_context_reports(response)
 
         self.assertEqual(len(context_reports), 1)
         self.assertIn(self.abuse_report, context_reports)
 
-    def test_previous_warnings_are_attached_to_abuse_report(self):
+    def test_reports_are_grouped_by_reported_user(self):
+        second_report = AbuseReportFactory(logged_against=self.accused_user)
+        other_report = AbuseReportFactory()
+
         self.client.login(username=self.moderator.email, password='pass')
         response = self.client.get(reverse('moderation:review-abuse'))
+        reported_users = response.context['reported_users']
 
-        context_reports = response.context['reports']
-        self.assertEqual(len(context_reports), 1)
+        self.assertEqual(reported_users, [self.accused_user,
+                                          other_report.logged_against])
+        self.assertEqual(reported_users[0].undecided_reports,
+                         [self.abuse_report, second_report])
+        self.assertEqual(reported_users[0].report_count, 2)
+        self.assertEqual(reported_users[1].report_count, 1)
+
+    def test_reported_users_are_paged(self):
+        AbuseReportFactory.create_batch(ABUSE_QUEUE_PAGE_SIZE)
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.client.get(reverse('moderation:review-abuse'))
+
+        self.assertEqual(len(response.context['reported_users']),
+                         ABUSE_QUEUE_PAGE_SIZE)
+        self.assertEqual(response.context['reported_users'][0],
+                         self.accused_user)
+
+        response = self.client.get(reverse('moderation:review-abuse'),
+                                   {'page': 2})
+
+        self.assertEqual(len(response.context['reported_users']), 1)
+
+    def test_previous_warnings_are_counted(self):
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.client.get(reverse('moderation:review-abuse'))
+
+        reported_users = response.context['reported_users']
+        self.assertEqual(len(reported_users), 1)
+        self.assertEqual(reported_users[0].prior_warning_count, 1)
+
+    def test_previous_warnings_are_loaded_on_demand(self):
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.client.get(reverse('moderation:abuse-warnings',
+                                           args=[self.accused_user.id]))
+
+        self.assertEqual(list(response.context['warnings']),
+                         [self.abuse_warning])
+        self.assertContains(response, 'This is a formal warning')
 
-        context_report = context_reports[0]
-        self.assertEqual(len(context_report.prior_warnings), 1)
-        self.assertIn(self.abuse_warning, context_report.prior_warnings)
+    def test_standard_users_cannot_load_warnings(self):
+        self.client.login(username=self.standard_user.email, password='pass')
+        response = self.client.get(reverse('moderation:abuse-warnings',
+                                           args=[self.accused_user.id]))
+
+        self.assertEqual(response.status_code, 302)
 
     def test_moderator_cannot_see_abuse_reports_about_themself(self):
         moderator_abuse_report = AbuseReportFactory(
@@ -740,7 +970,7 @@ class ReviewAbuseTest(TestCase):
 
         # We should only see self.abuse_report - as this is the only undecided
         # abuse report that is not about the logged in moderator
-        context_reports = response.context['reports']
+        context_reports = self.get_context_reports(response)
 
         self.assertEqual(len(context_reports), 1)
         self.assertIn(self.abuse_report, context_reports)
@@ -784,6 +1014,7 @@ class ReviewAbuseTest(TestCase):
         )
         expected_email = self.site.config.email
         expected_footer = 'logged an abuse report at {}'.format(self.site.name)
+        send_queued_emails()
         email = mail.outbox[0]
 
         self.assertEqual(len(mail.outbox), 1)
@@ -821,6 +1052,7 @@ class ReviewAbuseTest(TestCase):
         """
         self.client.login(username=self.moderator.email, password='pass')
         response = self.warn_user()
+        send_queued_emails()
         self.assertEqual(len(mail.outbox), 2)
 
         # Reporting user's email
@@ -895,6 +1127,7 @@ class ReviewAbuseTest(TestCase):
         """
         self.client.login(username=self.moderator.email, password='pass')
         response = self.ban_user()
+        send_queued_emails()
         self.assertEqual(len(mail.outbox), 2)
 
         # Reporting user's email
@@ -955,7 +1188,8 @@ class ViewLogsTest(TestCase):
     def test_logs_url(self):
         self.check_url('/moderation/logs/', view_logs)
 
-    def get_data(self, msg_type='ALL', period='ALL', start='', end=''):
+    def get_data(self, msg_type='ALL', period='ALL', start='', end='',
+                 search=''):
         return self.client.get(
             reverse('moderation:logs'),
             data={
@@ -963,6 +1197,7 @@ class ViewLogsTest(TestCase):
                 'period': period,
                 'start_date': start,
                 'end_date': end,
+                'search': search,
             },
         )
 
@@ -1009,6 +1244,15 @@ class ViewLogsTest(TestCase):
         # logged in moderator
         self.assertNotIn(log_about_moderator, context_logs)
 
+    def test_unfiltered_logs_can_be_exported(self):
+        LogFactory()
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.client.get(reverse('moderation:logs'))
+
+        self.assertFalse(response.context['form'].errors)
+        self.assertContains(response, 'class="export-logs"')
+
     def test_can_filter_logs_by_type(self):
         invitation_log = LogFactory()
         reinvitation_log = LogFactory(
@@ -1110,3 +1354,198 @@ class ViewLogsTest(TestCase):
         self.assertNotIn(today_reinvitation_log, context_logs)
         self.assertNotIn(yesterday_invitation_log, context_logs)
 
+    def test_can_search_log_comments(self):
+        spam_log = LogFactory(comment='Posted spam links to a casino')
+        LogFactory(comment='Was rude to another member')
+        LogFactory(comment='More spam',
+                   msg_type=ModerationLogMsg.REINVITATION)
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.get_data(ModerationLogMsg.INVITATION,
+                                 FilterLogsForm.TODAY,
+                                 search='SPAM casino')
+
+        self.assertEqual(response.context['logs'], [spam_log])
+
+    def test_logs_are_paged(self):
+        user = UserFactory()
+        logs = LogFactory.create_batch(51, pertains_to=user, logged_by=user)
+        logs.reverse()
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.get_data(ModerationLogMsg.INVITATION)
+
+        self.assertEqual(response.context['logs'], logs[:50])
+        next_page_query = response.context['next_page_query']
+        self.assertIn('msg_type=INVITATION', next_page_query)
+        self.assertIsNone(response.context['first_page_query'])
+
+        response = self.client.get(
+            reverse('moderation:logs') + '?' + next_page_query)
+
+        self.assertEqual(response.context['logs'], logs[50:])
+        self.assertIsNone(response.context['next_page_query'])
+        self.assertNotIn('before=', response.context['first_page_query'])
+
+    def test_moderator_sees_removal_of_their_invitations(self):
+        expiry_log = LogFactory(pertains_to=self.moderator, logged_by=None,
+                                msg_type=ModerationLogMsg.EXPIRY)
+        LogFactory(pertains_to=self.moderator)
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.get_data()
+
+        self.assertEqual(response.context['logs'], [expiry_log])
+        self.assertContains(response, 'Automatic')
+
+    def test_out_of_range_cursor_is_ignored(self):
+        log = LogFactory()
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.client.get(
+            reverse('moderation:logs') +
+            '?msg_type=INVITATION&before=1000000000000000000_1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['logs'], [log])
+
+
+class ViewStatsTest(TestCase):
+    fixtures = ['group_perms']
+
+    def setUp(self):
+        self.standard_user = UserFactory()
+        self.moderator = ModeratorFactory()
+
+    def test_url(self):
+        self.check_url('/moderation/stats/', view_stats)
+
+    def test_standard_users_cannot_view_stats(self):
+        self.client.login(username=self.standard_user.email, password='pass')
+        response = self.client.get(reverse('moderation:stats'))
+
+        self.assertRedirects(
+            response, '/accounts/login/?next=/moderation/stats/')
+
+    def test_can_view_stats(self):
+        log_moderator_event(ModerationLogMsg.BANNING, self.standard_user,
+                            self.moderator)
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.client.get(reverse('moderation:stats'),
+                                   {'days': '7'})
+
+        self.assertEqual(len(response.context['stats_per_day']), 7)
+        self.assertEqual(response.context['stats_per_day'][0][1],
+                         [0, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(response.context['stats_per_moderator'],
+                         [(self.moderator, [0, 0, 0, 0, 0, 0, 1])])
+
+
+class ExportLogsTest(TestCase):
+    fixtures = ['group_perms']
+
+    def setUp(self):
+        self.standard_user = UserFactory()
+        self.moderator = ModeratorFactory()
+
+    def test_url(self):
+        self.check_url('/moderation/logs/export/', export_logs)
+
+    def get_export(self, **data):
+        return self.client.get(reverse('moderation:export-logs'), data=data)
+
+    def test_standard_users_cannot_export_logs(self):
+        self.client.login(username=self.standard_user.email, password='pass')
+        response = self.get_export()
+
+        self.assertRedirects(
+            response, '/accounts/login/?next=/moderation/logs/export/')
+
+    def test_can_export_filtered_logs_as_csv(self):
+        invitation_log = LogFactory(comment='Invited, with a comma')
+        LogFactory(msg_type=ModerationLogMsg.REINVITATION)
+        LogFactory(pertains_to=self.moderator)
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.get_export(msg_type=ModerationLogMsg.INVITATION,
+                                   period='ALL', format='csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(lines[0], 'id,msg_datetime,msg_type,comment,'
+                                   'pertains_to_id,pertains_to,'
+                                   'logged_by_id,logged_by')
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(
+            '{},{},INVITATION,"Invited, with a comma",'.format(
+                invitation_log.id,
+                invitation_log.msg_datetime.isoformat())))
+
+    def test_formulas_are_not_exported_as_csv(self):
+        LogFactory(comment='=HYPERLINK("http://evil.test")',
+                   pertains_to=UserFactory(full_name='@Evil'))
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.get_export(msg_type=ModerationLogMsg.INVITATION,
+                                   period='ALL', format='csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertIn(',"\'=HYPERLINK(""http://evil.test"")",', lines[1])
+        self.assertIn(",'@Evil,", lines[1])
+
+    def test_invalid_filters_are_not_exported(self):
+        LogFactory()
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.get_export(period='CUSTOM', format='csv')
+
+        self.assertRedirects(
+            response, reverse('moderation:logs') + '?period=CUSTOM',
+            fetch_redirect_response=False)
+
+    def test_can_export_logs_as_json_lines(self):
+        logs = LogFactory.create_batch(2)
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.get_export(msg_type='ALL', period='ALL',
+                                   format='jsonl')
+        rows = [json.loads(line) for line in
+                b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual([row['id'] for row in rows],
+                         [logs[1].id, logs[0].id])
+        self.assertEqual(rows[0]['pertains_to'],
+                         logs[1].pertains_to.get_full_name())
+
+    def test_can_export_unfiltered_logs(self):
+        logs = LogFactory.create_batch(2)
+        LogFactory(pertains_to=self.moderator)
+
+        self.client.login(username=self.moderator.email, password='pass')
+        response = self.get_export(format='jsonl')
+        rows = [json.loads(line) for line in
+                b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual([row['id'] for row in rows],
+                         [logs[1].id, logs[0].id])
+
+    def test_can_include_archived_logs(self):
+        old_log = LogFactory(msg_datetime=datetime.datetime(
+            2015, 1, 10, tzinfo=pytz.UTC))
+        log = LogFactory()
+        archive_logs(before=datetime.datetime(2015, 2, 1, tzinfo=pytz.UTC))
+
+        self.client.login(username=self.moderator.email, password='pass')
+
+        response = self.get_export(msg_type='ALL', period='ALL',
+                                   format='jsonl')
+        rows = [json.loads(line) for line in
+                b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [log.id])
+
+        response = self.get_export(msg_type='ALL', period='ALL',
+                                   include_archived='on', format='jsonl')
+        rows = [json.loads(line) for line in
+                b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [log.id, old_log.id])
@@ -8,14 +8,22 @@ urlpatterns = patterns(
     '',
     url(r'^$', views.moderation_home, name='moderators'),
     url(_(r'^invite-user/$'), views.invite_user, name='invite-user'),
+    url(_(r'^invite-users/$'), views.bulk_invite_users,
+        name='bulk-invite-users'),
     url(_(r'^reinvite-user/$'), views.reinvite_user, name='reinvite-user'),
     url(_(r'^revoke-invitation/$'), views.revoke_invitation,
         name='revoke-invitation'),
     url(_(r'^review-applications/$'), views.review_applications,
         name='review-applications'),
+    url(_(r'^review-applications/bulk/$'), views.bulk_review_applications,
+        name='bulk-review-applications'),
     url(_(r'^review-abuse-reports/$'), views.review_abuse,
         name='review-abuse'),
+    url(_(r'^review-abuse-reports/(?P<user_id>\d+)/warnings/$'),
+        views.abuse_warnings, name='abuse-warnings'),
     url(_(r'^logs/$'), views.view_logs, name='logs'),
+    url(_(r'^logs/export/$'), views.export_logs, name='export-logs'),
+    url(_(r'^stats/$'), views.view_stats, name='stats'),
     url(_(r'^(?P<user_id>\d+)/report-abuse/$'), views.report_abuse,
         name='report-abuse'),
     url(_(r'^abuse-report-logged/$'), TemplateView.as_view(
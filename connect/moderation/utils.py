@@ -1,25 +1,222 @@
+import collections
+import csv
 import datetime
+import gzip
+import io
+import itertools
+import json
 import pytz
 
+from django.contrib.auth import get_user_model
+from django.core.urlresolvers import reverse
+from django.db import connection, connections, transaction
+from django.db.models import Count, Min, Q, Sum
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import ugettext as _
 
-from connect.moderation.models import ModerationLogMsg
+from connect.accounts.backends import invalidate_user
+from connect.accounts.models import AbuseReport
+from connect.moderation.models import (
+    ModerationLogArchive, ModerationLogMsg, ModerationStat,
+    ModeratorNotification
+)
+from connect.utils import send_connect_email, send_connect_emails
+
+
+User = get_user_model()
+
+DIGEST_PERIODS = {
+    User.HOURLY: datetime.timedelta(hours=1),
+    User.DAILY: datetime.timedelta(days=1),
+}
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=pytz.UTC)
+
+# Text search configuration of the index on ModerationLogMsg.comment
+LOG_SEARCH_CONFIG = 'english'
+
+# Notifications are kept for longer than the longest digest period, in case
+# a digest is sent a little late
+NOTIFICATION_RETENTION = datetime.timedelta(days=2)
 
 
 def log_moderator_event(msg_type, user, moderator, comment=''):
     """
-    Log a moderation event.
+    Log a moderation event, and count it in the moderation statistics.
+    Automatic actions are logged without a moderator, and not counted.
     """
-    message = ModerationLogMsg.objects.create(
-        msg_type=msg_type,
-        comment=comment,
-        pertains_to=user,
-        logged_by=moderator,
-    )
+    with transaction.atomic():
+        message = ModerationLogMsg.objects.create(
+            msg_type=msg_type,
+            comment=comment,
+            pertains_to=user,
+            logged_by=moderator,
+        )
+
+        if moderator is not None:
+            ModerationStat.objects.increment(
+                get_stat_day(message.msg_datetime), msg_type, moderator.id)
 
     return message
 
 
+def log_moderator_events(msg_type, users, moderator, comment=''):
+    """
+    Log the same moderation event about several users, with a single
+    insert, and count them in the moderation statistics.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        messages = ModerationLogMsg.objects.bulk_create([
+            ModerationLogMsg(msg_type=msg_type,
+                             comment=comment,
+                             pertains_to=user,
+                             logged_by=moderator,
+                             msg_datetime=now)
+            for user in users])
+
+        ModerationStat.objects.increment(get_stat_day(now), msg_type,
+                                         moderator.id, count=len(users))
+
+    return messages
+
+
+def uncount_logs(logs):
+    """
+    Remove logs that are about to be deleted (e.g. along with the user they
+    are about) from the moderation statistics, so that the statistics
+    still match the logs.
+    """
+    counts = collections.Counter(
+        (get_stat_day(msg_datetime), msg_type, logged_by_id)
+        for msg_datetime, msg_type, logged_by_id in logs.values_list(
+            'msg_datetime', 'msg_type', 'logged_by_id').iterator()
+        if logged_by_id is not None)
+
+    for (day, msg_type, moderator_id), count in counts.items():
+        ModerationStat.objects.decrement(day, msg_type, moderator_id, count)
+
+
+def get_stat_day(value):
+    """
+    Return the (UTC) day that an event is counted on in the statistics.
+    """
+    return value.astimezone(pytz.UTC).date()
+
+
+def rebuild_moderation_stats():
+    """
+    Recount the moderation statistics from the logs (including archived
+    logs), e.g. after they have been edited by hand. Return the number of
+    statistics rows.
+    """
+    counts = collections.Counter()
+    logs = ModerationLogMsg.objects.only('id', 'msg_datetime', 'msg_type',
+                                         'logged_by')
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Make events logged meanwhile wait to be counted until the
+            # statistics have been rebuilt
+            with connection.cursor() as cursor:
+                cursor.execute('LOCK TABLE {} IN EXCLUSIVE MODE'.format(
+                    connection.ops.quote_name(
+                        ModerationStat._meta.db_table)))
+
+        for log in iter_logs(logs):
+            counts[(get_stat_day(log.msg_datetime), log.msg_type,
+                    log.logged_by_id)] += 1
+
+        for archive in iter_log_archives(ModerationLogArchive.objects.all()):
+            for row in archive.iter_rows():
+                counts[(get_stat_day(parse_datetime(row['msg_datetime'])),
+                        row['msg_type'], row['logged_by_id'])] += 1
+
+        # Archived logs may have been logged by moderators deleted since
+        moderator_ids = set(User.objects.filter(
+            id__in=set(key[2] for key in counts if key[2] is not None)
+        ).values_list('id', flat=True))
+
+        ModerationStat.objects.all().delete()
+        ModerationStat.objects.bulk_create(
+            [ModerationStat(day=day, msg_type=msg_type,
+                            moderator_id=moderator_id, count=count)
+             for (day, msg_type, moderator_id), count in counts.items()
+             if moderator_id in moderator_ids],
+            batch_size=1000)
+
+    return ModerationStat.objects.count()
+
+
+STAT_TYPES = [
+    ModerationLogMsg.INVITATION,
+    ModerationLogMsg.REINVITATION,
+    ModerationLogMsg.APPROVAL,
+    ModerationLogMsg.REJECTION,
+    ModerationLogMsg.DISMISSAL,
+    ModerationLogMsg.WARNING,
+    ModerationLogMsg.BANNING,
+]
+
+
+def get_moderation_stats(start_day, end_day):
+    """
+    Return the number of events of each of STAT_TYPES per day (newest
+    first, including days without any events), and per moderator (by
+    name), between two days.
+    """
+    stats = ModerationStat.objects.filter(day__gte=start_day,
+                                          day__lte=end_day)
+
+    per_day = collections.defaultdict(collections.Counter)
+    for day, msg_type, count in stats.values_list(
+            'day', 'msg_type').annotate(total=Sum('count')):
+        per_day[day][msg_type] = count
+
+    per_moderator = collections.defaultdict(collections.Counter)
+    for moderator_id, msg_type, count in stats.values_list(
+            'moderator', 'msg_type').annotate(total=Sum('count')):
+        per_moderator[moderator_id][msg_type] = count
+
+    days = []
+    day = end_day
+    while day >= start_day:
+        days.append((day, [per_day[day][t] for t in STAT_TYPES]))
+        day -= datetime.timedelta(days=1)
+
+    moderators = [
+        (moderator, [per_moderator[moderator.id][t] for t in STAT_TYPES])
+        for moderator in User.objects.filter(
+            id__in=per_moderator).order_by('full_name')]
+
+    return days, moderators
+
+
+def search_logs(logs, search):
+    """
+    Filter logs to those whose comment matches all of the words in
+    `search`. On PostgreSQL this is a full-text search (so "warned" finds
+    "warning"), using the index on the comment's tsvector, which the
+    expression below must match. Elsewhere each word is searched for
+    in the comment, ignoring case.
+    """
+    if connections[logs.db].vendor == 'postgresql':
+        return logs.extra(
+            where=["to_tsvector('{config}', {table}.comment) @@ "
+                   "plainto_tsquery('{config}', %s)".format(
+                       config=LOG_SEARCH_CONFIG,
+                       table=connections[logs.db].ops.quote_name(
+                           ModerationLogMsg._meta.db_table))],
+            params=[search])
+
+    for word in search.split():
+        logs = logs.filter(comment__icontains=word)
+
+    return logs
+
+
 def get_date_limits(start_date, end_date=None):
     """
     Return first and last UTC moments of given date(s),
@@ -45,3 +242,543 @@ def get_date_limits(start_date, end_date=None):
     end_utc = end_local.astimezone(pytz.UTC)
 
     return (start_utc, end_utc)
+
+
+def encode_log_cursor(log):
+    """
+    Return a cursor pointing at a log message, for use with
+    get_logs_page().
+    """
+    microseconds = (log.msg_datetime - EPOCH) // datetime.timedelta(
+        microseconds=1)
+
+    return '{}_{}'.format(microseconds, log.id)
+
+
+def decode_log_cursor(cursor):
+    """
+    Return the (msg_datetime, id) a cursor points at, or None if it is
+    not a valid cursor.
+    """
+    try:
+        microseconds, log_id = (int(part) for part in cursor.split('_'))
+        msg_datetime = EPOCH + datetime.timedelta(microseconds=microseconds)
+    except (AttributeError, OverflowError, ValueError):
+        return None
+
+    return (msg_datetime, log_id)
+
+
+def get_logs_page(logs, cursor=None, per_page=50, archived_logs=None):
+    """
+    Return a page of log messages, newest first, starting after the
+    message `cursor` points at (or from the newest message), along with
+    the cursor of the next page (or None if this is the last page).
+
+    Pages are found by seeking on (msg_datetime, id) rather than with
+    an offset, so that later pages are as quick to load as the first.
+
+    `archived_logs` (see get_archived_logs) are merged into the pages,
+    reading only the archives of the months the page reaches into.
+    """
+    logs = logs.order_by('-msg_datetime', '-id')
+    position = decode_log_cursor(cursor) if cursor else None
+
+    if position:
+        msg_datetime, log_id = position
+        logs = logs.filter(Q(msg_datetime__lt=msg_datetime) |
+                           Q(msg_datetime=msg_datetime, id__lt=log_id))
+
+    page = list(logs[:per_page + 1])
+
+    if archived_logs is not None:
+        older = itertools.islice(archived_logs.iter_logs(position),
+                                 per_page + 1)
+        page = sorted(page + list(older),
+                      key=lambda log: (log.msg_datetime, log.id),
+                      reverse=True)[:per_page + 1]
+
+    if len(page) > per_page:
+        page = page[:per_page]
+        return page, encode_log_cursor(page[-1])
+
+    return page, None
+
+
+def iter_logs(logs, batch_size=1000, archived_logs=None):
+    """
+    Yield all of the logs, newest first, loading them a page at a time so
+    that memory use does not grow with the number of logs. Archived logs
+    (if given, newest first) are merged in as they are read.
+    """
+    if archived_logs is not None:
+        yield from merge_logs(iter_logs(logs, batch_size), archived_logs)
+        return
+
+    cursor = None
+
+    while True:
+        page, cursor = get_logs_page(logs, cursor, per_page=batch_size)
+
+        for log in page:
+            yield log
+
+        if cursor is None:
+            break
+
+
+def merge_logs(logs, other_logs):
+    """
+    Merge two iterables of logs sorted newest first, lazily.
+    (heapq.merge only takes a key from Python 3.5.)
+    """
+    def key(log):
+        return (log.msg_datetime, log.id)
+
+    logs, other_logs = iter(logs), iter(other_logs)
+    log, other_log = next(logs, None), next(other_logs, None)
+
+    while log is not None and other_log is not None:
+        if key(log) >= key(other_log):
+            yield log
+            log = next(logs, None)
+        else:
+            yield other_log
+            other_log = next(other_logs, None)
+
+    if log is not None:
+        yield log
+        yield from logs
+
+    if other_log is not None:
+        yield other_log
+        yield from other_logs
+
+
+LOG_EXPORT_FIELDS = ('id', 'msg_datetime', 'msg_type', 'comment',
+                     'pertains_to_id', 'pertains_to', 'logged_by_id',
+                     'logged_by')
+
+# Spreadsheets take cells starting with these for formulas
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def get_log_export_row(log):
+    return (log.id, log.msg_datetime.isoformat(), log.msg_type, log.comment,
+            log.pertains_to_id, log.pertains_to.get_full_name(),
+            log.logged_by_id,
+            log.logged_by.get_full_name() if log.logged_by else '')
+
+
+class Echo(object):
+    """
+    File-like object whose write() returns what is written, so that rows
+    formatted by csv.writer can be yielded one at a time.
+    """
+    def write(self, value):
+        return value
+
+
+def escape_csv_cell(value):
+    """
+    Prefix text that a spreadsheet would take for a formula with a quote,
+    so that names and comments in exported logs are never evaluated.
+    """
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+
+    return value
+
+
+def iter_logs_csv(logs, archived_logs=None):
+    """
+    Yield the logs as CSV lines, starting with a header.
+    """
+    writer = csv.writer(Echo())
+
+    yield writer.writerow(LOG_EXPORT_FIELDS)
+
+    for log in iter_logs(logs, archived_logs=archived_logs):
+        yield writer.writerow([escape_csv_cell(value)
+                               for value in get_log_export_row(log)])
+
+
+def iter_logs_jsonl(logs, archived_logs=None):
+    """
+    Yield the logs as JSON objects, one per line.
+    """
+    for log in iter_logs(logs, archived_logs=archived_logs):
+        yield encode_log(log) + '\n'
+
+
+def encode_log(log):
+    return json.dumps(dict(zip(LOG_EXPORT_FIELDS, get_log_export_row(log))))
+
+
+def get_month_start(value):
+    """
+    Return the first moment (UTC) of the month of a datetime.
+    """
+    value = value.astimezone(pytz.UTC)
+
+    return datetime.datetime(value.year, value.month, 1, tzinfo=pytz.UTC)
+
+
+def get_next_month_start(month_start):
+    return get_month_start(month_start + datetime.timedelta(days=32))
+
+
+def archive_logs(before):
+    """
+    Move logs from whole (UTC) months before `before` into compressed
+    monthly archives, one month and transaction at a time, and return
+    the number of logs archived.
+    """
+    cutoff = get_month_start(before)
+    archived = 0
+
+    while True:
+        oldest = (ModerationLogMsg.objects.filter(msg_datetime__lt=cutoff)
+                                          .order_by('msg_datetime')
+                                          .values_list('msg_datetime',
+                                                       flat=True)
+                                          .first())
+        if oldest is None:
+            return archived
+
+        archived += archive_log_month(get_month_start(oldest))
+
+
+def archive_log_month(month_start):
+    """
+    Move the logs of the month starting at `month_start` into its archive
+    (adding them to any logs archived from that month before), and return
+    the number of logs moved.
+    """
+    logs = ModerationLogMsg.objects.filter(
+        msg_datetime__gte=month_start,
+        msg_datetime__lt=get_next_month_start(month_start),
+    ).select_related('pertains_to', 'logged_by')
+
+    with transaction.atomic():
+        archive = (ModerationLogArchive.objects.select_for_update()
+                                       .filter(month=month_start.date())
+                                       .first())
+
+        if archive:
+            archived_logs = archive.iter_logs()
+            archived_count = archive.log_count
+        else:
+            archive = ModerationLogArchive(month=month_start.date())
+            archived_logs = []
+            archived_count = 0
+
+        buffer = io.BytesIO()
+        count = 0
+
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+            for log in iter_logs(logs, archived_logs=archived_logs):
+                f.write((encode_log(log) + '\n').encode('utf-8'))
+                count += 1
+
+        archive.data = buffer.getvalue()
+        archive.log_count = count
+        archive.save()
+
+        moved = count - archived_count
+        logs.delete()
+
+    return moved
+
+
+def iter_log_archives(archives):
+    """
+    Yield the archives one at a time, so that only one month of compressed
+    logs is held in memory at once.
+    """
+    for archive_id in archives.values_list('id', flat=True):
+        archive = ModerationLogArchive.objects.filter(id=archive_id).first()
+
+        if archive:
+            yield archive
+
+
+class ArchivedLogs(object):
+    """
+    The archived logs selected by get_archived_logs, read (newest first)
+    one month's archive at a time, only as far as they are needed.
+    """
+    def __init__(self, archives, matches):
+        self.archives = archives
+        self.matches = matches
+
+    def __iter__(self):
+        return self.iter_logs()
+
+    def iter_logs(self, position=None):
+        """
+        Yield the logs, newest first, starting after the (msg_datetime, id)
+        `position` (see decode_log_cursor) if given.
+        """
+        archives = self.archives.order_by('-month')
+
+        if position:
+            archives = archives.filter(
+                month__lte=position[0].astimezone(pytz.UTC).date())
+
+        for archive in iter_log_archives(archives):
+            for log in archive.iter_logs():
+                if position and (log.msg_datetime, log.id) >= position:
+                    continue
+
+                if self.matches(log):
+                    yield log
+
+
+def get_archived_logs(start=None, end=None, msg_type=None,
+                      exclude_user=None, search=None):
+    """
+    Return the archived logs (see ArchivedLogs), only reading the archives
+    of the months between `start` and `end` (if given).
+
+    Archived comments are searched for each of the words in `search`,
+    ignoring case (without the stemming used by search_logs).
+    """
+    words = search.casefold().split() if search else []
+
+    archives = ModerationLogArchive.objects.all()
+
+    if start:
+        archives = archives.filter(month__gte=get_month_start(start).date())
+
+    if end:
+        archives = archives.filter(month__lte=end.astimezone(pytz.UTC).date())
+
+    def matches(log):
+        return ((not start or log.msg_datetime >= start) and
+                (not end or log.msg_datetime <= end) and
+                (not msg_type or log.msg_type == msg_type) and
+                (not exclude_user or log.pertains_to_id != exclude_user.id or
+                 log.msg_type == ModerationLogMsg.EXPIRY) and
+                all(word in log.comment.casefold() for word in words))
+
+    return ArchivedLogs(archives, matches)
+
+
+def get_abuse_queue(moderator):
+    """
+    Return the undecided abuse reports that a moderator may review, grouped
+    by reported user, oldest first, with the number of reports and the
+    date of the oldest report of each user.
+
+    Reports about inactive (e.g. banned) users, about the moderator or
+    made by the moderator are left out.
+    """
+    return (AbuseReport.objects.filter(decision_datetime=None,
+                                       logged_against__is_active=True)
+                               .exclude(logged_against=moderator)
+                               .exclude(logged_by=moderator)
+                               .values('logged_against')
+                               .annotate(report_count=Count('id'),
+                                         oldest=Min('logged_datetime'))
+                               .order_by('oldest', 'logged_against'))
+
+
+def get_reported_users(groups, moderator):
+    """
+    Return the users of a page of the abuse queue (see get_abuse_queue),
+    with their undecided reports, number of reports and number of prior
+    warnings attached.
+    """
+    counts = {group['logged_against']: group['report_count']
+              for group in groups}
+
+    users = User.objects.in_bulk(list(counts))
+
+    warning_counts = dict(
+        AbuseReport.objects.filter(logged_against__in=list(counts),
+                                   moderator_decision=AbuseReport.WARN)
+                           .values_list('logged_against')
+                           .annotate(count=Count('id'))
+                           .order_by())
+
+    reports = (AbuseReport.objects.filter(logged_against__in=list(counts),
+                                          decision_datetime=None)
+                                  .exclude(logged_by=moderator)
+                                  .select_related('logged_by')
+                                  .order_by('logged_datetime', 'id'))
+
+    for user in users.values():
+        user.report_count = counts[user.id]
+        user.prior_warning_count = warning_counts.get(user.id, 0)
+        user.undecided_reports = []
+
+    for report in reports:
+        report.logged_against = users[report.logged_against_id]
+        report.logged_against.undecided_reports.append(report)
+
+    return [users[group['logged_against']] for group in groups]
+
+
+def sweep_unactivated_users(before, batch_size=100, dry_run=False):
+    """
+    Delete users who were invited or approved before `before` but never
+    activated their account (along with their tokens and logs), a batch
+    at a time, each in a short transaction. Each batch is logged, as an
+    automatic action, once for each moderator who invited or approved the
+    users removed, with the number of users only.
+
+    Return the number of users deleted, or that would be with `dry_run`.
+    """
+    unactivated = User.objects.unactivated(before)
+
+    if dry_run:
+        return unactivated.count()
+
+    deleted = 0
+
+    while True:
+        with transaction.atomic():
+            users = list(unactivated.select_for_update()
+                                    .order_by('decision_datetime', 'id')
+                                    .only('id', 'moderator')[:batch_size])
+
+            if not users:
+                return deleted
+
+            user_ids = [user.id for user in users]
+            removed = collections.Counter(user.moderator_id for user in users)
+
+            # The logs about the users are deleted with them
+            uncount_logs(ModerationLogMsg.objects.filter(
+                pertains_to__in=user_ids))
+
+            User.objects.filter(id__in=user_ids).delete()
+
+            moderators = User.objects.in_bulk(
+                [moderator_id for moderator_id in removed if moderator_id])
+
+            for moderator_id, count in removed.items():
+                if moderator_id not in moderators:
+                    continue
+
+                comment = _(
+                    'Removed {} account(s) invited or approved before {} '
+                    'that were never activated').format(
+                        count, before.strftime('%b %d, %Y'))
+
+                log_moderator_event(msg_type=ModerationLogMsg.EXPIRY,
+                                    user=moderators[moderator_id],
+                                    moderator=None,
+                                    comment=comment)
+
+        deleted += len(users)
+
+
+def notify_moderators(event_type, pertains_to, subject, template, site, url):
+    """
+    Record an event moderators should know about, and email the moderators
+    who want to be told immediately. Other moderators are told about it in
+    their next digest (see send_moderator_digests).
+
+    Moderators are not notified about events that pertain to themselves.
+    """
+    ModeratorNotification.objects.create(event_type=event_type,
+                                         pertains_to=pertains_to)
+
+    moderators = (User.objects.filter(
+                      is_moderator=True, is_active=True,
+                      notification_frequency=User.IMMEDIATELY)
+                  .exclude(id=pertains_to.id)
+                  .only('email', 'full_name'))
+
+    send_connect_emails(subject=subject,
+                        template=template,
+                        recipients=moderators,
+                        site=site,
+                        url=url)
+
+
+def get_digest_counts(frequency, since, until):
+    """
+    Count the notifications each active moderator receiving `frequency`
+    digests has not been sent yet, up to `until`, with a single grouped
+    query. Moderators who have never been sent a digest are counted from
+    `since`.
+
+    Returns {moderator_id: {event_type: count}}.
+    """
+    qn = connection.ops.quote_name
+
+    sql = (
+        'SELECT u.id, n.event_type, COUNT(*) '
+        'FROM {users} u JOIN {notifications} n '
+        'ON n.pertains_to_id <> u.id '
+        'AND n.created_datetime > COALESCE(u.last_digest_datetime, %s) '
+        'AND n.created_datetime <= %s '
+        'WHERE u.is_moderator = %s AND u.is_active = %s '
+        'AND u.notification_frequency = %s '
+        'GROUP BY u.id, n.event_type'
+    ).format(users=qn(User._meta.db_table),
+             notifications=qn(ModeratorNotification._meta.db_table))
+
+    counts = {}
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [since, until, True, True, frequency])
+
+        for moderator_id, event_type, count in cursor.fetchall():
+            counts.setdefault(moderator_id, {})[event_type] = count
+
+    return counts
+
+
+def send_moderator_digests(frequency, site):
+    """
+    Send one email to each moderator receiving `frequency` digests,
+    summarising the applications and abuse reports since their last digest,
+    and return the number of digests sent.
+    """
+    now = timezone.now()
+    base_url = 'http://{}'.format(site.domain)
+
+    with transaction.atomic():
+        counts = get_digest_counts(frequency,
+                                   since=now - DIGEST_PERIODS[frequency],
+                                   until=now)
+
+        moderators = (User.objects.filter(id__in=counts)
+                                  .only('email', 'full_name'))
+
+        for moderator in moderators:
+            moderator_counts = counts[moderator.id]
+
+            send_connect_email(
+                subject=_('Your {} moderation digest'.format(site.name)),
+                template='moderation/emails/moderator_digest.html',
+                recipient=moderator,
+                site=site,
+                context={
+                    'applications': moderator_counts.get(
+                        ModeratorNotification.APPLICATION, 0),
+                    'abuse_reports': moderator_counts.get(
+                        ModeratorNotification.ABUSE_REPORT, 0),
+                    'applications_url': base_url + reverse(
+                        'moderation:review-applications'),
+                    'abuse_reports_url': base_url + reverse(
+                        'moderation:review-abuse'),
+                })
+
+        digest_moderators = User.objects.filter(
+            is_moderator=True, notification_frequency=frequency)
+        moderator_ids = list(digest_moderators.values_list('id', flat=True))
+        digest_moderators.update(last_digest_datetime=now)
+
+        ModeratorNotification.objects.filter(
+            created_datetime__lt=now - NOTIFICATION_RETENTION).delete()
+
+    # update() does not send post_save, which would normally do this
+    for moderator_id in moderator_ids:
+        invalidate_user(moderator_id)
+
+    return len(counts)
@@ -3,25 +3,38 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.exceptions import PermissionDenied
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.core.urlresolvers import reverse
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
-from django.utils.translation import ugettext as _
+from django.utils.translation import ugettext as _, ungettext
 from django.views.decorators.http import require_POST
 
 from connect.accounts.models import AbuseReport
-from connect.utils import send_connect_email
+from connect.utils import send_connect_email, send_connect_emails
 from connect.moderation.forms import (
-    FilterLogsForm, InviteMemberForm, ModerateApplicationForm,
-    ModerateAbuseForm, ReInviteMemberForm,
-    ReportAbuseForm, RevokeInvitationForm
+    BulkInviteMembersForm, BulkModerateApplicationsForm, FilterLogsForm,
+    InviteMemberForm, ModerateApplicationForm, ModerateAbuseForm,
+    ReInviteMemberForm, ReportAbuseForm, RevokeInvitationForm,
+    StatsPeriodForm
+)
+from connect.moderation.models import ModerationLogMsg, ModeratorNotification
+from connect.moderation.utils import (
+    STAT_TYPES, get_abuse_queue, get_archived_logs, get_date_limits,
+    get_logs_page, get_moderation_stats, get_reported_users, get_stat_day,
+    iter_logs_csv, iter_logs_jsonl, log_moderator_event,
+    log_moderator_events, notify_moderators, search_logs
 )
-from connect.moderation.models import ModerationLogMsg
-from connect.moderation.utils import get_date_limits, log_moderator_event
 
 
 User = get_user_model()
 
+# Number of reported users shown per page of the abuse review queue
+ABUSE_QUEUE_PAGE_SIZE = 20
+
 
 @login_required
 @permission_required(['accounts.access_moderators_section',
@@ -30,10 +43,12 @@ User = get_user_model()
 def moderation_home(request,
                     invitation_form=None,
                     reinvitation_form=None,
-                    revocation_form=None):
+                    revocation_form=None,
+                    bulk_invitation_form=None):
     """
     Show forms that allow  a moderator to:
      - Issue a membership invitation
+     - Invite members listed in a CSV file
      - Resend a membership invitation
      - Revoke a membership invitation
     """
@@ -52,10 +67,14 @@ def moderation_home(request,
     if not revocation_form:
         revocation_form = RevokeInvitationForm()
 
+    if not bulk_invitation_form:
+        bulk_invitation_form = BulkInviteMembersForm()
+
     context = {
         'invitation_form': invitation_form,
         'reinvitation_form': reinvitation_form,
         'revocation_form': revocation_form,
+        'bulk_invitation_form': bulk_invitation_form,
         'pending': pending,
     }
 
@@ -66,6 +85,7 @@ def moderation_home(request,
 @login_required
 @permission_required(['accounts.access_moderators_section',
                       'accounts.invite_user'])
+@transaction.atomic
 def invite_user(request):
     """
     Invite a new user
@@ -117,6 +137,67 @@ def invite_user(request):
 @login_required
 @permission_required(['accounts.access_moderators_section',
                       'accounts.invite_user'])
+@transaction.atomic
+def bulk_invite_users(request):
+    """
+    Invite the members listed in an uploaded CSV file, and show which
+    lines were invited and why the others were not.
+    """
+    moderator = request.user
+    site = get_current_site(request)
+
+    form = BulkInviteMembersForm(request.POST, request.FILES)
+
+    if not form.is_valid():
+        return moderation_home(request, bulk_invitation_form=form)
+
+    rows = form.cleaned_data['rows']
+    valid_rows = [row for row in rows if not row['error']]
+
+    try:
+        with transaction.atomic():
+            new_users = moderator.invite_new_users(
+                [(row['email'], row['full_name']) for row in valid_rows])
+    except IntegrityError:
+        # Someone registered one of the addresses meanwhile
+        form.add_error('csv_file', _('Some of these email addresses have '
+                                     'just been registered, please try '
+                                     'again.'))
+        return moderation_home(request, bulk_invitation_form=form)
+
+    if new_users:
+        log_moderator_events(
+            msg_type=ModerationLogMsg.INVITATION,
+            users=new_users,
+            moderator=moderator,
+            comment=_('{} invited {} members from a CSV file'.format(
+                moderator.get_full_name(), len(new_users))))
+
+        urls = {user.id: request.build_absolute_uri(
+                    reverse('accounts:activate-account',
+                            args=[user.auth_token]))
+                for user in new_users}
+        send_connect_emails(subject=_('Welcome to {}'.format(site.name)),
+                            template='moderation/emails/invite_new_user.html',
+                            recipients=new_users,
+                            sender=moderator,
+                            site=site,
+                            urls=urls)
+
+    context = {
+        'rows': rows,
+        'invited_count': len(new_users),
+        'error_count': len(rows) - len(new_users),
+    }
+
+    return render(request, 'moderation/bulk_invite_results.html', context)
+
+
+@require_POST
+@login_required
+@permission_required(['accounts.access_moderators_section',
+                      'accounts.invite_user'])
+@transaction.atomic
 def reinvite_user(request):
     """
     Reinvite a user.
@@ -216,7 +297,8 @@ def revoke_invitation(request):
 @permission_required(['accounts.access_moderators_section',
                       'accounts.approve_user_application',
                       'accounts.reject_user_application'])
-def review_applications(request):
+@transaction.atomic
+def review_applications(request, bulk_form=None):
     """
     Review all pending applications.
     """
@@ -229,7 +311,7 @@ def review_applications(request):
 
     form = ModerateApplicationForm()
 
-    if request.method == 'POST':
+    if request.method == 'POST' and not bulk_form:
 
         form = ModerateApplicationForm(request.POST)
         user = get_object_or_404(User, id=request.POST['user_id'])
@@ -286,15 +368,89 @@ def review_applications(request):
 
             return redirect('moderation:review-applications')
 
+    if not bulk_form:
+        bulk_form = BulkModerateApplicationsForm(prefix='bulk')
+
     context = {
         'pending': pending,
         'form': form,
+        'bulk_form': bulk_form,
     }
 
     return render(request, 'moderation/review_applications.html', context)
 
 
 @login_required
+@permission_required(['accounts.access_moderators_section',
+                      'accounts.approve_user_application',
+                      'accounts.reject_user_application'])
+@require_POST
+@transaction.atomic
+def bulk_review_applications(request):
+    """
+    Approve or reject several pending applications at once.
+    """
+    moderator = request.user
+    site = get_current_site(request)
+
+    form = BulkModerateApplicationsForm(request.POST, prefix='bulk')
+
+    if not form.is_valid():
+        return review_applications(request, bulk_form=form)
+
+    users = list(form.cleaned_data['users'])
+    decision = form.cleaned_data['decision']
+    comments = form.cleaned_data['comments']
+
+    if decision == User.APPROVED:
+        moderator.approve_user_applications(users)
+
+        msg_type = ModerationLogMsg.APPROVAL
+        urls = {user.id: request.build_absolute_uri(
+                    reverse('accounts:activate-account',
+                            args=[user.auth_token]))
+                for user in users}
+        send_connect_emails(subject=_('Welcome to {}'.format(site.name)),
+                            template='moderation/emails/approve_user.html',
+                            recipients=users,
+                            sender=moderator,
+                            site=site,
+                            urls=urls)
+
+        confirmation_message = ungettext(
+            '{} account application has been approved.',
+            '{} account applications have been approved.',
+            len(users)).format(len(users))
+
+    else:
+        moderator.reject_user_applications(users)
+
+        msg_type = ModerationLogMsg.REJECTION
+        send_connect_emails(subject=_(('Unfortunately, your application to '
+                                       '{} was not successful').format(
+                                           site.name)),
+                            template='moderation/emails/reject_user.html',
+                            recipients=users,
+                            sender=moderator,
+                            site=site)
+
+        confirmation_message = ungettext(
+            '{} account application has been rejected.',
+            '{} account applications have been rejected.',
+            len(users)).format(len(users))
+
+    log_moderator_events(msg_type=msg_type,
+                         users=users,
+                         moderator=moderator,
+                         comment=comments)
+
+    messages.success(request, confirmation_message)
+
+    return redirect('moderation:review-applications')
+
+
+@login_required
+@transaction.atomic
 def report_abuse(request, user_id):
     """
     Allow any user to report another user for abusive behaviour.
@@ -313,12 +469,8 @@ def report_abuse(request, user_id):
                 abuse_comment=abuse_comment,
             )
 
-            # Send email(s) to moderator(s) alerting them of new report.
-            # Do not nofity moderators where the report is logged against them
-            moderators = (User.objects.filter(is_moderator=True,
-                                              is_active=True)
-                                      .exclude(id=logged_against.id))
-
+            # Alert moderators to the new report. Do not notify moderators
+            # where the report is logged against them
             site = get_current_site(request)
 
             url = request.build_absolute_uri(
@@ -329,12 +481,12 @@ def report_abuse(request, user_id):
                 'moderation/emails/notify_moderators_of_abuse_report.html'
             )
 
-            for moderator in moderators:
-                send_connect_email(subject=subject,
-                                   template=template,
-                                   recipient=moderator,
-                                   site=site,
-                                   url=url)
+            notify_moderators(event_type=ModeratorNotification.ABUSE_REPORT,
+                              pertains_to=logged_against,
+                              subject=subject,
+                              template=template,
+                              site=site,
+                              url=url)
 
             return redirect('moderation:abuse-report-logged')
 
@@ -355,41 +507,19 @@ def report_abuse(request, user_id):
                       'accounts.dismiss_abuse_report',
                       'accounts.warn_user',
                       'accounts.ban_user'])
+@transaction.atomic
 def review_abuse(request):
     """
-    Show a list of abuse reports to moderators.
+    Show moderators a page of reported users, with their undecided abuse
+    reports and the number of warnings they have been given.
     Allow them to:
     - Dismiss an abuse report
     - Warn a user
     - Remove a user
     """
     site = get_current_site(request)
-
-    # Exclude reports where:
-    # - the user is not active
-    # - the accused is the logged in user
-    # - the accusor is the logged in user
-    undecided_reports = (AbuseReport.objects.filter(decision_datetime=None)
-                         .exclude(logged_against__is_active=False)
-                         .exclude(logged_against=request.user)
-                         .exclude(logged_by=request.user)
-                         .select_related('logged_against', 'logged_by'))
-
-    reported_users = set([report.logged_against
-                          for report in undecided_reports])
-
-    warnings = AbuseReport.objects.filter(
-        logged_against__in=reported_users,
-        moderator_decision='WARN'
-    ).select_related('logged_against', 'logged_by', 'moderator')
-
     form = ModerateAbuseForm()
 
-    for report in undecided_reports:
-        accused_user = report.logged_against
-        report.prior_warnings = [warning for warning in warnings
-                                 if warning.logged_against == accused_user]
-
     if request.POST:
 
         abuse_report = get_object_or_404(AbuseReport,
@@ -498,8 +628,20 @@ def review_abuse(request):
             messages.success(request, confirmation_message)
             return redirect('moderation:review-abuse')
 
+    # Show a page of reported users, with their undecided reports
+    paginator = Paginator(get_abuse_queue(request.user),
+                          ABUSE_QUEUE_PAGE_SIZE)
+
+    try:
+        page = paginator.page(request.GET.get('page', 1))
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+
     context = {
-        'reports': undecided_reports,
+        'reported_users': get_reported_users(page.object_list, request.user),
+        'page': page,
         'form': form,
     }
 
@@ -507,20 +649,47 @@ def review_abuse(request):
 
 
 @login_required
-@permission_required('accounts.access_moderators_section')
-def view_logs(request):
+@permission_required(['accounts.access_moderators_section',
+                      'accounts.dismiss_abuse_report',
+                      'accounts.warn_user',
+                      'accounts.ban_user'])
+def abuse_warnings(request, user_id):
+    """
+    Show the warnings previously issued to a user, for the abuse review
+    queue to load when a moderator asks for them.
+    """
+    user = get_object_or_404(User, id=user_id)
+    warnings = (AbuseReport.objects.filter(logged_against=user,
+                                           moderator_decision=AbuseReport.WARN)
+                                   .select_related('logged_by', 'moderator')
+                                   .order_by('decision_datetime'))
+
+    context = {
+        'reported_user': user,
+        'warnings': warnings,
+    }
+
+    return render(request, 'moderation/abuse_warnings.html', context)
 
+
+def filter_logs(request):
+    """
+    Return the FilterLogsForm bound to the request's query (unbound, and
+    selecting all logs, if no filters were submitted), the logs it selects
+    (excluding logs about the logged in moderator, other than the removal
+    of the accounts they invited) and, if asked for, the archived logs it
+    selects.
+    """
     # Exclude logs about the logged in user (moderator)
     logs = ModerationLogMsg.objects.exclude(
-        pertains_to=request.user
-    ).order_by(
-        '-msg_datetime'
+        Q(pertains_to=request.user) & ~Q(msg_type=ModerationLogMsg.EXPIRY)
     ).select_related(
         'pertains_to',
         'logged_by',
     )
 
-    form = FilterLogsForm()
+    submitted = any(name in request.GET for name in FilterLogsForm.base_fields)
+    form = FilterLogsForm(request.GET if submitted else None)
 
     # TODO: Get logged in user's timezone
     # TODO: Apply activate() to logged in user's timezone
@@ -528,45 +697,138 @@ def view_logs(request):
 
     local_tz = timezone.get_current_timezone()
     today = timezone.now().astimezone(local_tz)
+    archived_logs = None
 
-    if request.method == 'GET':
-        form = FilterLogsForm(request.GET)
+    if form.is_valid():
 
-        if form.is_valid():
+        msg_type = form.cleaned_data['msg_type']
+        period = form.cleaned_data['period']
+        search = form.cleaned_data['search'].strip()
 
-            msg_type = form.cleaned_data['msg_type']
-            period = form.cleaned_data['period']
+        if period == 'TODAY':
+            start, end = get_date_limits(start_date=today)
 
-            if period == 'TODAY':
-                start, end = get_date_limits(start_date=today)
+        elif period == 'YESTERDAY':
+            yesterday = today - timezone.timedelta(days=1)
+            start, end = get_date_limits(start_date=yesterday)
 
-            elif period == 'YESTERDAY':
-                yesterday = today - timezone.timedelta(days=1)
-                start, end = get_date_limits(start_date=yesterday)
+        elif period == 'THIS_WEEK':
+            start_date = today - timezone.timedelta(days=7)
+            end_date = today
 
-            elif period == 'THIS_WEEK':
-                start_date = today - timezone.timedelta(days=7)
-                end_date = today
+            start, end = get_date_limits(start_date, end_date)
 
-                start, end = get_date_limits(start_date, end_date)
+        elif period == 'CUSTOM':
+            start_date = form.cleaned_data['start_date']
+            end_date = form.cleaned_data['end_date']
 
-            elif period == 'CUSTOM':
-                start_date = form.cleaned_data['start_date']
-                end_date = form.cleaned_data['end_date']
+            start, end = get_date_limits(start_date, end_date)
+
+        # Filter Logs
+        if msg_type != 'ALL':
+            logs = logs.filter(msg_type=msg_type)
+
+        if period != 'ALL':
+            logs = logs.filter(msg_datetime__gte=start,
+                               msg_datetime__lte=end)
+        else:
+            start = end = None
+
+        if search:
+            logs = search_logs(logs, search)
+
+        if form.cleaned_data['include_archived']:
+            archived_logs = get_archived_logs(
+                start, end,
+                msg_type=msg_type if msg_type != 'ALL' else None,
+                exclude_user=request.user,
+                search=search)
+
+    return form, logs, archived_logs
+
+
+@login_required
+@permission_required('accounts.access_moderators_section')
+def view_logs(request):
+    form, logs, archived_logs = filter_logs(request)
 
-                start, end = get_date_limits(start_date, end_date)
+    cursor = request.GET.get('before')
+    logs, next_cursor = get_logs_page(logs, cursor,
+                                      archived_logs=archived_logs)
 
-            # Filter Logs
-            if msg_type != 'ALL':
-                logs = logs.filter(msg_type=msg_type)
+    query = request.GET.copy()
+    query.pop('before', None)
+    filter_query = query.urlencode()
 
-            if period != 'ALL':
-                logs = logs.filter(msg_datetime__gte=start,
-                                   msg_datetime__lte=end)
+    if next_cursor:
+        query['before'] = next_cursor
+        next_page_query = query.urlencode()
+    else:
+        next_page_query = None
 
     context = {
         'form': form,
         'logs': logs,
+        'next_page_query': next_page_query,
+        'first_page_query': filter_query if cursor else None,
+        'filter_query': filter_query,
     }
 
     return render(request, 'moderation/logs.html', context)
+
+
+@login_required
+@permission_required('accounts.access_moderators_section')
+def export_logs(request):
+    """
+    Download the logs selected by the filter form, as CSV or JSON lines
+    (?format=jsonl), streamed rather than loaded in full. If the filters
+    are not valid, go back to the logs page to show the form's errors.
+    """
+    form, logs, archived_logs = filter_logs(request)
+
+    if form.errors:
+        query = request.GET.copy()
+        query.pop('format', None)
+        return redirect(reverse('moderation:logs') + '?' + query.urlencode())
+
+    if request.GET.get('format') == 'jsonl':
+        response = StreamingHttpResponse(iter_logs_jsonl(logs, archived_logs),
+                                         content_type='application/x-ndjson')
+        filename = 'moderation-logs.jsonl'
+    else:
+        response = StreamingHttpResponse(iter_logs_csv(logs, archived_logs),
+                                         content_type='text/csv')
+        filename = 'moderation-logs.csv'
+
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+        filename)
+
+    return response
+
+
+@login_required
+@permission_required('accounts.access_moderators_section')
+def view_stats(request):
+    """
+    Show the number of moderation events of each type per day and per
+    moderator, over the chosen number of days.
+    """
+    form = StatsPeriodForm(request.GET)
+    days = form.cleaned_data['days'] if form.is_valid() else 30
+
+    end_day = get_stat_day(timezone.now())
+    start_day = end_day - timezone.timedelta(days=days - 1)
+
+    stats_per_day, stats_per_moderator = get_moderation_stats(start_day,
+                                                              end_day)
+    msg_types = dict(ModerationLogMsg.MSG_TYPE_CHOICES)
+
+    context = {
+        'form': form,
+        'msg_types': [msg_types[msg_type] for msg_type in STAT_TYPES],
+        'stats_per_day': stats_per_day,
+        'stats_per_moderator': stats_per_moderator,
+    }
+
+    return render(request, 'moderation/stats.html', context)
@@ -0,0 +1,44 @@
+"""
+Cached sessions, with deferred writes to the database.
+
+Use by setting SESSION_ENGINE = 'connect.sessions'.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+
+class SessionStore(cached_db.SessionStore):
+    """
+    Sessions are read from and written to the cache (which should be shared
+    by all worker processes). Unlike Django's cached_db backend, a change is
+    only written through to the database if the session has not been saved
+    there for SESSION_DB_WRITE_INTERVAL seconds, so most requests that
+    change the session do not touch the database.
+
+    New sessions (including those created on login) are always written to
+    the database; later changes may be lost if the cache entry is evicted
+    before they are written through.
+    """
+
+    @property
+    def db_marker_key(self):
+        return self.cache_key + ':saved'
+
+    def save(self, must_create=False):
+        if must_create or self.session_key is None \
+           or self.db_marker_key not in self._cache:
+            super(SessionStore, self).save(must_create)
+            self._cache.set(self.db_marker_key, True,
+                            settings.SESSION_DB_WRITE_INTERVAL)
+        else:
+            self._cache.set(self.cache_key, self._get_session(),
+                            self.get_expiry_age())
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+
+        super(SessionStore, self).delete(session_key)
+
+        if session_key is not None:
+            self._cache.delete(cached_db.KEY_PREFIX + session_key + ':saved')
@@ -1,6 +1,7 @@
 import os
 import cbs
 from cbs import BaseSettings as DefaultSettings
+from django.core.exceptions import ImproperlyConfigured
 from django.utils.translation import ugettext_lazy as _
 
 
@@ -95,21 +96,97 @@ class BaseSettings(DefaultSettings):
 
     # AUTH
     AUTH_USER_MODEL = 'accounts.CustomUser'
+    AUTHENTICATION_BACKENDS = (
+        'connect.accounts.backends.CachedUserBackend',
+    )
     LOGIN_REDIRECT_URL = '/'
 
+    # Cache that logged in users are loaded from on each request. It must
+    # be shared by all worker processes on all hosts, so that a change to a
+    # user (e.g. a ban) is seen by all of them at once (see CACHES).
+    USER_CACHE_ALIAS = 'sessions'
+
+    # Days after which an activation link (invitation, reinvitation,
+    # approval or reactivation) expires
+    ACTIVATION_TOKEN_EXPIRY_DAYS = 30
+    # Days after which invited or approved users who have not activated
+    # their account are deleted by the sweep_unactivated_users command
+    UNACTIVATED_USER_EXPIRY_DAYS = 90
+    # Lookups each client may make of the (unauthenticated) email
+    # availability endpoint per EMAIL_AVAILABILITY_RATE_PERIOD seconds, so
+    # that it cannot be used to enumerate registered members
+    EMAIL_AVAILABILITY_RATE_LIMIT = 20
+    EMAIL_AVAILABILITY_RATE_PERIOD = 60
+
     # EMAIL
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
     DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
+    # Queued emails that cannot be sent are retried up to EMAIL_MAX_ATTEMPTS
+    # times, EMAIL_RETRY_DELAY seconds later, doubling the delay each time
+    EMAIL_MAX_ATTEMPTS = 5
+    EMAIL_RETRY_DELAY = 60
 
     # CACHING
     # Do this here because thanks to django-pylibmc-sasl and pylibmc
     # memcacheify (used on heroku) is painful to install on windows.
-    CACHES = {
-        'default': {
-            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-            'LOCATION': ''
+    # The 'sessions' cache must be shared by all worker processes on all
+    # hosts, so it is only set up when SESSION_CACHE_DIR points at storage
+    # that they all share (and that only they can read). Without it, the
+    # cache is a dummy, so sessions are kept in the database and users and
+    # permissions are not cached across requests.
+    SESSION_CACHE_DIR = os.getenv('SESSION_CACHE_DIR')
+
+    @property
+    def CACHES(self):
+        if self.SESSION_CACHE_DIR:
+            sessions = {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': self.SESSION_CACHE_DIR,
+                'TIMEOUT': None,
+                'OPTIONS': {
+                    'MAX_ENTRIES': 100000,
+                },
+            }
+        else:
+            sessions = {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+            }
+
+        return {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': ''
+            },
+            'sessions': sessions,
         }
-    }
+
+    # SESSIONS
+    # SESSION_MODE is one of:
+    #  - 'cached_db': sessions are kept in the 'sessions' cache, and written
+    #    through to the database at most every SESSION_DB_WRITE_INTERVAL
+    #    seconds (and whenever a session is created, e.g. on login). This
+    #    is the default when SESSION_CACHE_DIR is set.
+    #  - 'signed_cookies': session data is kept in a signed cookie
+    #  - 'db': sessions are read from and written to the database (the
+    #    default otherwise)
+    SESSION_MODE = os.getenv('SESSION_MODE',
+                             'cached_db' if SESSION_CACHE_DIR else 'db')
+    SESSION_DB_WRITE_INTERVAL = 300
+    SESSION_CACHE_ALIAS = 'sessions'
+
+    @property
+    def SESSION_ENGINE(self):
+        if self.SESSION_MODE == 'cached_db' and not self.SESSION_CACHE_DIR:
+            raise ImproperlyConfigured(
+                "SESSION_MODE 'cached_db' requires SESSION_CACHE_DIR.")
+
+        return {
+            'cached_db': 'connect.sessions',
+            'signed_cookies': 'django.contrib.sessions.backends.'
+                              'signed_cookies',
+            'db': 'django.contrib.sessions.backends.db',
+        }[self.SESSION_MODE]
 
     # LOGGING
     # See: https://docs.djangoproject.com/en/dev/ref/settings/#logging
@@ -93,6 +93,32 @@ $(document).ready(function(){
     });
 
 
+    // -----------------------------
+    // FORMS - EMAIL AVAILABILITY
+    // -----------------------------
+
+    // Warn as soon as an email address that is already registered is
+    // entered, rather than after the form is submitted
+    $('input[data-availability-url]').change(function(){
+        var $input = $(this);
+        var field = $input.parsley();
+        var email = $.trim($input.val());
+        var current = String($input.data('current') || '');
+
+        window.ParsleyUI.removeError(field, 'availability');
+
+        if (!email || email.toLowerCase() == current.toLowerCase()) {
+            return;
+        }
+
+        $.getJSON($input.data('availability-url'), {email: email}, function(data){
+            if (!data.available) {
+                window.ParsleyUI.addError(field, 'availability', data.message);
+            }
+        });
+    });
+
+
     // ----------------------
     // MODERATION - UNIVERSAL
     // ----------------------
@@ -159,7 +185,7 @@ $(document).ready(function(){
         email = $(this).data('email');
         $('#reinvite-member-dialog').dialog('open');
         $('.reinvite-member-form #id_user_id').val(user);
-        $('.reinvite-member-form #id_email').val(email);
+        $('.reinvite-member-form #id_email').val(email).data('current', email);
     });
 
     var name;
@@ -214,6 +240,34 @@ $(document).ready(function(){
         $('.review-application-form .button').val(title);
     });
 
+    $('#bulk-review-dialog').dialog({
+        autoOpen: false,
+        modal: true,
+        width: 400,
+        open: function( event, ui ) {
+            $(this).closest('.ui-dialog').addClass('active');
+        },
+        close: function( event, ui ) {
+            $(this).find('form').parsley().reset();
+            $(this).closest('.ui-dialog').removeClass('active');
+        }
+    });
+
+    $('.review-app-table .select-all').change(function(){
+        $('.review-app-table td.select input').prop('checked', this.checked);
+    });
+
+    $('.bulk-decision-link').click(function(e){
+        e.preventDefault();
+
+        title = $(this).html();
+
+        $('#bulk-review-dialog').dialog('option', 'title', title)
+                                .dialog('open');
+        $('.bulk-review-form #id_bulk-decision').val($(this).data('decision'));
+        $('.bulk-review-form .button').val(title);
+    });
+
 
     // ---------------------------------
     // MODERATION - REVIEW ABUSE REPORTS
@@ -238,7 +292,16 @@ $(document).ready(function(){
         e.preventDefault();
 
         user = $(this).data('user');
-        $('#dialog'+ user).dialog('open');
+        var dialog = $('#dialog'+ user);
+
+        // Warnings are loaded the first time they are shown
+        if (dialog.children().length){
+            dialog.dialog('open');
+        } else {
+            dialog.load(dialog.data('url'), function(){
+                dialog.dialog('open');
+            });
+        }
     });
 
 
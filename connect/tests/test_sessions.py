@@ -0,0 +1,58 @@
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from connect.sessions import SessionStore
+
+
+@override_settings(SESSION_CACHE_ALIAS='default')
+class SessionStoreTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+        self.session = SessionStore()
+        self.session['key'] = 'first'
+        self.session.save()
+
+    def get_db_data(self):
+        return Session.objects.get(
+            session_key=self.session.session_key).get_decoded()
+
+    def test_new_session_is_written_to_db(self):
+        self.assertEqual(self.get_db_data(), {'key': 'first'})
+
+    def test_changes_are_cached_without_db_write(self):
+        self.session['key'] = 'second'
+
+        with self.assertNumQueries(0):
+            self.session.save()
+            loaded = SessionStore(self.session.session_key)
+            self.assertEqual(loaded['key'], 'second')
+
+        self.assertEqual(self.get_db_data(), {'key': 'first'})
+
+    def test_changes_are_written_through_after_interval(self):
+        caches['default'].delete(self.session.db_marker_key)
+        self.session['key'] = 'second'
+        self.session.save()
+
+        self.assertEqual(self.get_db_data(), {'key': 'second'})
+
+    def test_cycled_key_is_written_to_db(self):
+        self.session.cycle_key()
+
+        self.assertEqual(self.get_db_data(), {'key': 'first'})
+
+    def test_falls_back_to_db(self):
+        caches['default'].clear()
+
+        loaded = SessionStore(self.session.session_key)
+        self.assertEqual(loaded['key'], 'first')
+
+    def test_delete(self):
+        session_key = self.session.session_key
+        self.session.delete()
+
+        self.assertFalse(Session.objects.filter(
+            session_key=session_key).exists())
+        self.assertFalse(SessionStore().exists(session_key))
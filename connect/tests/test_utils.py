@@ -1,10 +1,26 @@
+import datetime
+
 from django.contrib.sites.shortcuts import get_current_site
 from django.core import mail
-from django.test import TestCase
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.six import StringIO
 
 from connect.accounts.factories import UserFactory
 from connect.config.factories import SiteFactory, SiteConfigFactory
-from connect.utils import generate_unique_id, send_connect_email
+from connect.models import QueuedEmail
+from connect.utils import (
+    generate_unique_id, send_connect_email, send_connect_emails,
+    send_queued_emails
+)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise IOError('Mail server unavailable')
 
 
 class UtilsTest(TestCase):
@@ -31,4 +47,114 @@ class UtilsTest(TestCase):
         email = send_connect_email(subject, template, recipient, site, sender,
                                    url, comments, logged_against)
 
-        self.assertEqual(email, 1) # send_email returns no. of emails sent
+        self.assertEqual(email.recipient, 'recipient@test.test')
+        self.assertEqual(email.status, QueuedEmail.PENDING)
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(send_queued_emails(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Test email')
+        self.assertEqual(mail.outbox[0].to, ['recipient@test.test'])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertFalse(QueuedEmail.objects.exists())
+
+    def test_can_send_connect_emails(self):
+        site = SiteFactory(domain='mydomain.com')
+        site.config = SiteConfigFactory(site=site)
+        recipients = [UserFactory(full_name='First Moderator'),
+                      UserFactory(full_name='Second Moderator')]
+
+        with self.assertNumQueries(1):
+            send_connect_emails('Test email', 'emails/email_base.html',
+                                recipients, site)
+
+        send_queued_emails()
+
+        self.assertEqual(len(mail.outbox), 2)
+        for recipient, email in zip(recipients, mail.outbox):
+            self.assertEqual(email.to, [recipient.email])
+            self.assertIn('Hi {},'.format(recipient.full_name), email.body)
+            self.assertIn('Hi {},'.format(recipient.full_name),
+                          email.alternatives[0][0])
+
+    def test_recipient_names_are_escaped_in_html(self):
+        site = SiteFactory(domain='mydomain.com')
+        site.config = SiteConfigFactory(site=site)
+        recipient = UserFactory(full_name='<b>Bold</b> & Co')
+
+        email, = send_connect_emails('Test email', 'emails/email_base.html',
+                                     [recipient], site)
+
+        self.assertIn('Hi &lt;b&gt;Bold&lt;/b&gt; &amp; Co,', email.html_body)
+        self.assertNotIn('<b>Bold</b>', email.html_body)
+        self.assertIn('Hi <b>Bold</b> & Co,', email.body)
+
+
+class QueuedEmailTest(TestCase):
+
+    def queue_email(self, **kwargs):
+        fields = {
+            'subject': 'Test email',
+            'body': 'Body',
+            'from_email': 'site@test.test',
+            'recipient': 'recipient@test.test',
+        }
+        fields.update(kwargs)
+
+        return QueuedEmail.objects.create(**fields)
+
+    def test_emails_are_sent_in_order(self):
+        for i in range(3):
+            self.queue_email(body=str(i))
+
+        self.assertEqual(send_queued_emails(batch_size=2), 2)
+        self.assertEqual(send_queued_emails(batch_size=2), 1)
+        self.assertEqual(send_queued_emails(batch_size=2), 0)
+
+        self.assertEqual([message.body for message in mail.outbox],
+                         ['0', '1', '2'])
+
+    def test_emails_not_due_are_not_sent(self):
+        self.queue_email(
+            send_after=timezone.now() + datetime.timedelta(minutes=1))
+
+        self.assertEqual(send_queued_emails(), 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(
+        EMAIL_BACKEND='connect.tests.test_utils.FailingEmailBackend',
+        EMAIL_MAX_ATTEMPTS=2, EMAIL_RETRY_DELAY=60)
+    def test_failed_emails_are_retried_later(self):
+        email = self.queue_email()
+
+        self.assertEqual(send_queued_emails(), 0)
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, QueuedEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.last_error, 'Mail server unavailable')
+        self.assertGreater(email.send_after,
+                           timezone.now() + datetime.timedelta(seconds=50))
+
+        # Not retried until the delay has passed
+        self.assertEqual(send_queued_emails(), 0)
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+
+        email.send_after = timezone.now()
+        email.save()
+        send_queued_emails()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, QueuedEmail.FAILED)
+        self.assertEqual(email.attempts, 2)
+
+    def test_send_queued_emails_command(self):
+        self.queue_email()
+        self.queue_email()
+        out = StringIO()
+
+        call_command('send_queued_emails', batch_size=1, stdout=out)
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('Sent 2 email(s).', out.getvalue())
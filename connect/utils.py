@@ -1,22 +1,49 @@
 import re
 import uuid
 
-from django.core.mail import send_mail
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.mail import get_connection
+from django.db import transaction
 from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.utils.html import escape, strip_tags
+
+from connect.models import QueuedEmail
 
 
 def generate_unique_id():
     return str(uuid.uuid4()).replace('-', '')[:30]
 
 
-def send_connect_email(subject, template, recipient, site, sender='',
-                       url='', comments='', logged_against=''):
+def get_version_stamp(key, using=DEFAULT_CACHE_ALIAS):
     """
-    Sends an email to notify users and moderators of relevant events.
-    Generates a plain text email from html template counterpart.
+    Return the version stamp stored in the cache under `key`, creating
+    one if there is none. Processes keeping their own copy of some data
+    compare stamps to tell whether it has changed.
     """
+    cache = caches[using]
+    version = cache.get(key)
+
+    if version is None:
+        cache.add(key, generate_unique_id(), None)
+        version = cache.get(key)
+
+    return version
+
 
+def bump_version_stamp(key, using=DEFAULT_CACHE_ALIAS):
+    """
+    Replace the version stamp stored under `key`, so that every process
+    notices that its copy of the data is out of date.
+    """
+    caches[using].set(key, generate_unique_id(), None)
+
+
+def render_connect_email(template, recipient, site, sender='', url='',
+                         comments='', logged_against='', context=None):
+    """
+    Render an email template, returning its HTML and a plain text version
+    generated from it. `context` holds any further template variables.
+    """
     email_header_url = site.config.email_header.url
     email_header = ''.join(['http://', site.domain, email_header_url])
 
@@ -32,6 +59,7 @@ def send_connect_email(subject, template, recipient, site, sender='',
         # TODO: dynamically retrieve color from CSS
         'link_color': 'e51e41'
     }
+    template_vars.update(context or {})
 
     # Render HTML email:
     html_body = render_to_string(template, template_vars)
@@ -49,10 +77,107 @@ def send_connect_email(subject, template, recipient, site, sender='',
     p = re.compile('(\r|\n)(\r|\n)+')
     text_body = p.sub('\n\n', text_body)
 
-    email = send_mail(subject=subject,
-                      message=text_body,
-                      from_email=site.config.email,
-                      recipient_list=[recipient.email],
-                      html_message=html_body)
+    return html_body, text_body
+
+
+def send_connect_email(subject, template, recipient, site, sender='',
+                       url='', comments='', logged_against='', context=None):
+    """
+    Queues an email to notify users and moderators of relevant events.
+    Generates a plain text email from html template counterpart.
+
+    The email is stored in the database (in the caller's transaction, if
+    any) and sent later by the send_queued_emails command.
+    """
+    html_body, text_body = render_connect_email(
+        template, recipient, site, sender=sender, url=url,
+        comments=comments, logged_against=logged_against, context=context)
+
+    return QueuedEmail.objects.create(subject=subject,
+                                      body=text_body,
+                                      html_body=html_body,
+                                      from_email=site.config.email,
+                                      recipient=recipient.email)
+
+
+def send_connect_emails(subject, template, recipients, site, sender='',
+                        url='', comments='', logged_against='', urls=None):
+    """
+    Queues the same email to several users (e.g. all moderators).
+
+    The template is rendered once, with a placeholder for the recipient's
+    name which is then replaced for each recipient (escaped in the HTML
+    body), and the emails are queued with a single insert. `urls` may map
+    recipients' ids to a URL of their own (e.g. with their activation
+    token), used instead of `url`.
+    """
+    placeholder = 'recipient' + generate_unique_id()
+    url_placeholder = 'url' + generate_unique_id()
+
+    html_body, text_body = render_connect_email(
+        template, {'full_name': placeholder}, site, sender=sender,
+        url=url_placeholder if urls else url,
+        comments=comments, logged_against=logged_against)
+
+    def personalize(body, recipient, html=False):
+        escape_html = escape if html else str
+
+        body = body.replace(placeholder, escape_html(recipient.full_name))
+
+        if urls:
+            body = body.replace(url_placeholder,
+                                escape_html(urls[recipient.id]))
+
+        return body
+
+    emails = [
+        QueuedEmail(subject=subject,
+                    body=personalize(text_body, recipient),
+                    html_body=personalize(html_body, recipient, html=True),
+                    from_email=site.config.email,
+                    recipient=recipient.email)
+        for recipient in recipients
+    ]
+
+    QueuedEmail.objects.bulk_create(emails)
+
+    return emails
+
+
+def send_queued_emails(batch_size=100):
+    """
+    Send a batch of the queued emails that are due, over one connection
+    to the mail backend, and return the number sent. Sent emails are
+    deleted; those that could not be sent are retried later.
+    """
+    with transaction.atomic():
+        emails = QueuedEmail.objects.claim(batch_size)
+
+        if not emails:
+            return 0
+
+        connection = get_connection()
+
+        try:
+            connection.open()
+        except Exception as error:
+            for email in emails:
+                email.retry_later(error)
+            return 0
+
+        sent = []
+
+        try:
+            for email in emails:
+                try:
+                    connection.send_messages([email.as_message(connection)])
+                except Exception as error:
+                    email.retry_later(error)
+                else:
+                    sent.append(email.id)
+        finally:
+            connection.close()
+
+        QueuedEmail.objects.filter(id__in=sent).delete()
 
-    return email
+    return len(sent)
@@ -41,7 +41,6 @@ setup(name='django-mentor-connect',
       classifiers=[
           "Programming Language :: Python",
           "Topic :: Internet :: WWW/HTTP :: WSGI :: Application",
-          "Framework :: Django :: 1.7",
           "Framework :: Django :: 1.8",
           "Intended Audience :: Developers",
           "Intended Audience :: Education",